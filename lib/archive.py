@@ -0,0 +1,473 @@
+#!/usr/bin/env python
+
+"""Archive module
+
+Stores path data in a compressed columnar format. The rows are split into
+fixed-size chunks and each column of each chunk is encoded on its own with
+whichever of the following encodings is smallest:
+    runs - Runs of repeated values. Constant gate columns of a static
+        layout reduce to a single run.
+    delta - Differences of the bit patterns of consecutive values,
+        compressed. Ramps and slowly moving columns (time, tooltip) reduce
+        to small differences.
+    raw - The values, compressed.
+
+The value bytes are shuffled (all first bytes, then all second bytes, ...)
+before compression, which groups the slowly changing sign and exponent
+bytes together. Every encoding is lossless.
+
+The file starts with a header and an index of the offset and encoding of
+every column block, so any range of rows and columns is read without
+decoding the rest of the file.
+
+Author:
+    Evan Sneath - evansneath@gmail.com
+
+License:
+    Open Software License v3.0
+
+Classes:
+    ArchiveReader: Reads rows and columns of an archive file.
+
+Functions:
+    store: Writes path data to an archive file.
+    retrieve: Returns all path data of an archive file.
+    is_archive: Determines if a file is an archive file.
+"""
+
+import zlib
+import struct
+
+import numpy as np
+
+import surgicalsim.lib.constants as constants
+
+
+# Increment with any change to the file layout
+_VERSION = 1
+
+_MAGIC = b'SSARCHV\x00'
+
+# Header: magic, version, rows, columns, chunk rows, number of chunks
+_HEADER = struct.Struct('<8sHQIII')
+
+# Index entry of each column block: offset, size, encoding
+_INDEX_ENTRY = struct.Struct('<QIB')
+
+# Column block encodings
+RUNS = 0
+DELTA = 1
+RAW = 2
+
+_VALUE_DTYPE = np.dtype('<f8')
+_BITS_DTYPE = np.dtype('<i8')
+_LENGTH_DTYPE = np.dtype('<u4')
+
+
+def store(data, filename, chunk_rows=constants.G_ARCHIVE_CHUNK_ROWS,
+        level=constants.G_ARCHIVE_COMPRESSION_LEVEL):
+    """Store
+
+    Writes path data to an archive file.
+
+    Arguments:
+        data: The numpy array of size (T, columns) of path data.
+        filename: The archive filename.
+        chunk_rows: The number of rows of each chunk.
+            (Default: G_ARCHIVE_CHUNK_ROWS)
+        level: The zlib compression level (1 to 9).
+            (Default: G_ARCHIVE_COMPRESSION_LEVEL)
+    """
+    data = np.asarray(data)
+
+    if data.ndim != 2:
+        raise ValueError('Only two dimensional arrays can be archived')
+
+    if data.dtype.kind not in 'fiu':
+        raise ValueError('Only numeric arrays can be archived')
+
+    data = data.astype(_VALUE_DTYPE)
+
+    num_rows, num_cols = data.shape
+    num_chunks = (num_rows + chunk_rows - 1) // chunk_rows
+
+    blocks = []
+    index = []
+
+    offset = _HEADER.size + num_chunks * num_cols * _INDEX_ENTRY.size
+
+    for chunk_start in range(0, num_rows, chunk_rows):
+        chunk = data[chunk_start:chunk_start+chunk_rows]
+
+        for col in range(num_cols):
+            encoding, block = _encode_column(chunk[:,col], level)
+
+            index.append(_INDEX_ENTRY.pack(offset, len(block), encoding))
+            blocks.append(block)
+
+            offset += len(block)
+
+    with open(filename, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, num_rows, num_cols,
+                chunk_rows, num_chunks))
+        f.write(b''.join(index))
+        f.write(b''.join(blocks))
+
+    return
+
+
+def retrieve(filename):
+    """Retrieve
+
+    Reads all path data of an archive file.
+
+    Arguments:
+        filename: The archive filename.
+
+    Returns:
+        The numpy array of size (T, columns) of path data.
+    """
+    with ArchiveReader(filename) as reader:
+        data = reader.read()
+
+    return data
+
+
+def is_archive(filename):
+    """Is Archive
+
+    Arguments:
+        filename: The filename to check.
+
+    Returns:
+        True if the file starts with the archive magic, False otherwise.
+    """
+    with open(filename, 'rb') as f:
+        return f.read(len(_MAGIC)) == _MAGIC
+
+
+class ArchiveReader(object):
+    """ArchiveReader class
+
+    Reads ranges of rows and columns of an archive file. Only the column
+    blocks of the chunks which hold the requested rows are read and
+    decoded.
+
+    Attributes:
+        shape: The (rows, columns) shape of the archived data.
+        chunk_rows: The number of rows of each chunk.
+
+    Methods:
+        read: Returns a range of rows and a set of columns.
+        close: Closes the archive file.
+    """
+    def __init__(self, filename):
+        """Initialize
+
+        Opens an archive file and reads its index.
+
+        Arguments:
+            filename: The archive filename.
+        """
+        super(ArchiveReader, self).__init__()
+
+        self._file = None
+        self._file = open(filename, 'rb')
+
+        magic, version, num_rows, num_cols, chunk_rows, num_chunks = \
+                _HEADER.unpack(self._file.read(_HEADER.size))
+
+        if magic != _MAGIC:
+            self.close()
+            raise ValueError('%s is not an archive file' % filename)
+
+        if version != _VERSION:
+            self.close()
+            raise ValueError('%s has unsupported archive version %d' %
+                    (filename, version))
+
+        self.shape = (num_rows, num_cols)
+        self.chunk_rows = chunk_rows
+
+        index = self._file.read(num_chunks * num_cols * _INDEX_ENTRY.size)
+
+        # The (offset, size, encoding) of each column block by chunk
+        self._index = [[_INDEX_ENTRY.unpack_from(index,
+                (chunk * num_cols + col) * _INDEX_ENTRY.size)
+                for col in range(num_cols)] for chunk in range(num_chunks)]
+
+        return
+
+    def read(self, start=0, stop=None, columns=None):
+        """Read
+
+        Reads a range of rows of a set of columns.
+
+        Arguments:
+            start: The first row. (Default: 0)
+            stop: The row after the last row. If None, rows are read to the
+                end. (Default: None)
+            columns: A list of column indices. If None, all columns are
+                read. (Default: None)
+
+        Returns:
+            The numpy array of size (stop - start, len(columns)).
+        """
+        num_rows, num_cols = self.shape
+
+        start, stop, _ = slice(start, stop).indices(num_rows)
+        stop = max(start, stop)
+
+        if columns is None:
+            columns = range(num_cols)
+
+        columns = list(columns)
+
+        data = np.empty((stop - start, len(columns)))
+
+        if stop == start:
+            return data
+
+        first_chunk = start // self.chunk_rows
+        last_chunk = (stop - 1) // self.chunk_rows
+
+        for chunk in range(first_chunk, last_chunk + 1):
+            chunk_start = chunk * self.chunk_rows
+            chunk_len = min(self.chunk_rows, num_rows - chunk_start)
+
+            # The requested rows within this chunk
+            lo = max(start, chunk_start) - chunk_start
+            hi = min(stop, chunk_start + chunk_len) - chunk_start
+
+            out_rows = slice(chunk_start + lo - start, chunk_start + hi - start)
+
+            for out_col, col in enumerate(columns):
+                offset, size, encoding = self._index[chunk][col]
+
+                self._file.seek(offset)
+                values = _decode_column(self._file.read(size), encoding,
+                        chunk_len)
+
+                data[out_rows,out_col] = values[lo:hi]
+
+        return data
+
+    def close(self):
+        """Close
+
+        Closes the archive file.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+        return False
+
+    def __del__(self):
+        self.close()
+
+        return
+
+
+def _encode_column(values, level):
+    """Encode Column
+
+    Encodes a column block with the smallest encoding.
+
+    Arguments:
+        values: The numpy array of column values.
+        level: The zlib compression level.
+
+    Returns:
+        A tuple of the encoding and the encoded block string.
+    """
+    bits = values.view(_BITS_DTYPE)
+
+    # Runs are compared by bit pattern, so every value (including NaN and
+    # signed zero) is restored exactly
+    run_starts = np.flatnonzero(np.hstack(([True], bits[1:] != bits[:-1])))
+
+    # Few runs are always smallest stored as runs
+    if len(run_starts) * 4 <= len(values):
+        run_lengths = np.diff(np.hstack((run_starts, [len(values)])))
+
+        block = zlib.compress(
+                values[run_starts].astype(_VALUE_DTYPE).tobytes() +
+                run_lengths.astype(_LENGTH_DTYPE).tobytes(), level)
+
+        return RUNS, block
+
+    # Bit pattern differences wrap around, so they are always reversible
+    deltas = np.diff(np.hstack(([0], bits)).astype(_BITS_DTYPE))
+
+    candidates = [
+        (DELTA, zlib.compress(_shuffle(deltas), level)),
+        (RAW, zlib.compress(_shuffle(bits), level)),
+    ]
+
+    return min(candidates, key=lambda candidate: len(candidate[1]))
+
+
+def _decode_column(block, encoding, num_values):
+    """Decode Column
+
+    Decodes a column block.
+
+    Arguments:
+        block: The encoded block string.
+        encoding: The encoding of the block.
+        num_values: The number of values of the block.
+
+    Returns:
+        The numpy array of column values.
+    """
+    block = zlib.decompress(block)
+
+    if encoding == RUNS:
+        num_runs = len(block) // (_VALUE_DTYPE.itemsize +
+                _LENGTH_DTYPE.itemsize)
+        split = num_runs * _VALUE_DTYPE.itemsize
+
+        run_values = np.frombuffer(block[:split], dtype=_VALUE_DTYPE)
+        run_lengths = np.frombuffer(block[split:], dtype=_LENGTH_DTYPE)
+
+        return np.repeat(run_values, run_lengths)
+
+    bits = _unshuffle(block, num_values)
+
+    if encoding == DELTA:
+        bits = np.cumsum(bits, dtype=_BITS_DTYPE)
+    elif encoding != RAW:
+        raise ValueError('Unknown archive block encoding %d' % encoding)
+
+    return bits.view(_VALUE_DTYPE)
+
+
+def _shuffle(bits):
+    """Shuffle
+
+    Arguments:
+        bits: The numpy array of 8 byte values.
+
+    Returns:
+        The string of all first bytes of the values, then all second bytes,
+        and so on.
+    """
+    return np.ascontiguousarray(bits.astype(_BITS_DTYPE).view(np.uint8)
+            .reshape(-1, _BITS_DTYPE.itemsize).T).tobytes()
+
+
+def _unshuffle(block, num_values):
+    """Unshuffle
+
+    Reverses _shuffle().
+
+    Arguments:
+        block: The shuffled string.
+        num_values: The number of values of the string.
+
+    Returns:
+        The numpy array of 8 byte values.
+    """
+    shuffled = np.frombuffer(block, dtype=np.uint8).reshape(
+            _BITS_DTYPE.itemsize, num_values)
+
+    return np.ascontiguousarray(shuffled.T).view(_BITS_DTYPE).ravel()
+
+
+if __name__ == '__main__':
+    """Main
+
+    If the module is directly called, the given path data files are
+    converted to archive files. Each archive is read back and compared
+    against the original data before it is written.
+
+    By default, each archive is written beside its path file with the
+    G_ARCHIVE_FILE_EXT extension. The path files are only replaced with
+    --in-place.
+
+    Usage:
+        ./archive.py [-h] [-o OUT_DIR | --in-place] files [files ...]
+    """
+    import os
+    import argparse
+
+    import surgicalsim.lib.datastore as datastore
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('files', nargs='+',
+                        help='file(s) containing path data')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('-o', '--out-dir',
+                        help='directory of the archive files, named as the '
+                             'path files (default: beside each file with '
+                             'the %s extension)' %
+                             constants.G_ARCHIVE_FILE_EXT,
+                        action='store',
+                        default=None)
+    group.add_argument('--in-place',
+                        help='replace each path file with its archive',
+                        action='store_true',
+                        default=False)
+    args = parser.parse_args()
+
+    if args.out_dir is not None and not os.path.isdir(args.out_dir):
+        os.makedirs(args.out_dir)
+
+    total_size = 0
+    total_archive_size = 0
+
+    for filename in args.files:
+        data = datastore.retrieve(filename)
+
+        if args.in_place:
+            out_filename = filename
+        elif args.out_dir is None:
+            out_filename = os.path.splitext(filename)[0] + \
+                    constants.G_ARCHIVE_FILE_EXT
+        else:
+            out_filename = os.path.join(args.out_dir,
+                    os.path.basename(filename))
+
+        # Path files are only replaced when asked to
+        if not args.in_place and os.path.exists(out_filename) and \
+                os.path.samefile(out_filename, filename):
+            print('%s: would replace the path file (use --in-place), '
+                    'skipped' % filename)
+            continue
+
+        # The archive is written beside its target and only replaces it
+        # once it is known to read back exactly
+        temp_filename = out_filename + '.tmp'
+
+        store(data, temp_filename)
+
+        restored = retrieve(temp_filename)
+
+        if restored.shape != data.shape or \
+                restored.tobytes() != data.astype(_VALUE_DTYPE).tobytes():
+            os.remove(temp_filename)
+            print('%s: archive does not match, skipped' % filename)
+            continue
+
+        size = os.path.getsize(filename)
+        archive_size = os.path.getsize(temp_filename)
+
+        os.rename(temp_filename, out_filename)
+
+        total_size += size
+        total_archive_size += archive_size
+
+        print('%s: %d -> %d bytes' % (filename, size, archive_size))
+
+    print('Total: %d -> %d bytes' % (total_size, total_archive_size))
+
+    exit()
@@ -0,0 +1,336 @@
+#!/usr/bin/env python
+
+"""Broadcast module
+
+Encodes the body information sent from the environment to the viewer in a
+compact binary format. Only bodies which moved since the last broadcast are
+sent between periodic keyframes.
+
+A packet starts with a header of (kind, keyframe id, body count). Keyframe
+packets describe the shape, color, and pose of each body. Delta packets hold
+the pose of each moved body. Every body record starts with the body index,
+so a broadcast may be split over any number of packets.
+
+Author:
+    Evan Sneath - evansneath@gmail.com
+
+License:
+    Open Software License v3.0
+
+Classes:
+    BroadcastEncoder: Packs the environment bodies into broadcast packets.
+    BroadcastDecoder: Unpacks broadcast packets into viewer messages.
+"""
+
+import struct
+
+import numpy as np
+
+import surgicalsim.lib.constants as constants
+
+
+# Packet kinds
+KEYFRAME = 0
+DELTA = 1
+
+# Packet header: kind, keyframe id, total number of bodies
+_HEADER = struct.Struct('!BHH')
+
+# Keyframe record: index, geom type, color flag, shape params, color, pose
+_KEYFRAME_RECORD = struct.Struct('!HBB4f4f12f')
+
+# Delta record: index, pose
+_DELTA_RECORD = struct.Struct('!H12f')
+
+# Geom types in the order of their type codes
+_GEOM_TYPES = (
+    'GeomBox',
+    'GeomSphere',
+    'GeomCCylinder',
+    'GeomCylinder',
+    'GeomPlane',
+)
+
+
+class BroadcastEncoder(object):
+    """BroadcastEncoder class
+
+    Packs the bodies of an ODE environment into keyframe and delta broadcast
+    packets. The pose of each body is compared against the pose last
+    broadcast to detect movement.
+
+    Attributes:
+        epsilon: The smallest change in any position [m] or rotation matrix
+            element which marks a body as moved.
+        packet_size: The largest packet size in bytes.
+        keyframe_id: The id of the most recent keyframe.
+
+    Methods:
+        encode: Returns the packets for the current body poses.
+    """
+    def __init__(self, body_geom, epsilon=constants.G_VIEWER_EPSILON,
+            packet_size=constants.G_VIEWER_PACKET_SIZE):
+        """Initialize
+
+        Creates a new BroadcastEncoder object for the given bodies.
+
+        Arguments:
+            body_geom: The list of (body, geom) tuples of the environment.
+            epsilon: The smallest pose change which marks a body as moved.
+                (Default: G_VIEWER_EPSILON)
+            packet_size: The largest packet size in bytes.
+                (Default: G_VIEWER_PACKET_SIZE)
+        """
+        super(BroadcastEncoder, self).__init__()
+
+        self.epsilon = epsilon
+        self.packet_size = packet_size
+        self.keyframe_id = 0
+
+        # Only geometries the viewer can draw are broadcast. Planes have no
+        # body and never move
+        self._items = []
+
+        for body, geom in body_geom:
+            geom_type = type(geom).__name__
+
+            if geom_type not in _GEOM_TYPES:
+                continue
+
+            if body is None and geom_type != 'GeomPlane':
+                continue
+
+            self._items.append((body, geom, _GEOM_TYPES.index(geom_type)))
+
+        self._bodies = [(idx, body) for idx, (body, _, _) in
+                enumerate(self._items) if body is not None]
+
+        # The pose of each item as last broadcast (position, rotation)
+        self._poses = np.zeros((len(self._items), 12))
+
+        # The pose of each item read for the current broadcast
+        self._current = np.zeros((len(self._items), 12))
+
+        return
+
+    def encode(self, keyframe=False):
+        """Encode
+
+        Reads the current body poses and packs every moved body.
+
+        Arguments:
+            keyframe: If True, every body is packed with its shape and color
+                information. (Default: False)
+
+        Returns:
+            A list of packet strings. Empty if no body moved.
+        """
+        current = self._current
+
+        for idx, body in self._bodies:
+            current[idx, 0:3] = body.getPosition()
+            current[idx, 3:12] = body.getRotation()
+
+        if keyframe:
+            self.keyframe_id = (self.keyframe_id + 1) % 0x10000
+            self._poses[:] = current
+
+            records = [self._pack_keyframe_record(idx)
+                    for idx in range(len(self._items))]
+
+            return self._packetize(KEYFRAME, records, _KEYFRAME_RECORD.size)
+
+        moved = np.flatnonzero(np.any(
+                np.abs(current - self._poses) > self.epsilon, axis=1))
+
+        if not len(moved):
+            return []
+
+        self._poses[moved] = current[moved]
+
+        records = [_DELTA_RECORD.pack(idx, *current[idx]) for idx in moved]
+
+        return self._packetize(DELTA, records, _DELTA_RECORD.size)
+
+    def _pack_keyframe_record(self, idx):
+        """Pack Keyframe Record
+
+        Packs the shape, color, and pose of a single item.
+
+        Arguments:
+            idx: The index of the item.
+
+        Returns:
+            The packed record string.
+        """
+        body, geom, type_code = self._items[idx]
+
+        params = [0.0, 0.0, 0.0, 0.0]
+        color = [0.0, 0.0, 0.0, 0.0]
+        has_color = 0
+
+        if type_code == _GEOM_TYPES.index('GeomBox'):
+            params[0:3] = geom.getLengths()
+        elif type_code == _GEOM_TYPES.index('GeomSphere'):
+            params[0] = geom.getRadius()
+        elif type_code == _GEOM_TYPES.index('GeomCCylinder'):
+            radius, length = geom.getParams()
+            params[0:2] = radius, length - 2.0 * radius
+        elif type_code == _GEOM_TYPES.index('GeomCylinder'):
+            params[0:2] = geom.getParams()
+        else:
+            normal, distance = geom.getParams()
+            params[0:3] = normal
+            params[3] = distance
+
+        if body is not None and hasattr(body, 'color'):
+            color = list(body.color)
+            has_color = 1
+
+        return _KEYFRAME_RECORD.pack(idx, type_code, has_color,
+                *(params + color + list(self._poses[idx])))
+
+    def _packetize(self, kind, records, record_size):
+        """Packetize
+
+        Splits records over as few packets as the packet size allows.
+
+        Arguments:
+            kind: The packet kind.
+            records: A list of packed record strings.
+            record_size: The size of each record in bytes.
+
+        Returns:
+            A list of packet strings.
+        """
+        per_packet = max(1, (self.packet_size - _HEADER.size) // record_size)
+        header = _HEADER.pack(kind, self.keyframe_id, len(self._items))
+
+        return [header + b''.join(records[start:start+per_packet])
+                for start in range(0, len(records), per_packet)]
+
+
+class BroadcastDecoder(object):
+    """BroadcastDecoder class
+
+    Unpacks broadcast packets into the list of body dictionaries drawn by
+    the PyBrain ODE viewer. Delta packets received before their keyframe are
+    ignored.
+
+    Attributes:
+        message: The list of body dictionaries of every body received.
+
+    Methods:
+        decode: Applies a broadcast packet to the message.
+    """
+    def __init__(self):
+        """Initialize
+
+        Creates a new BroadcastDecoder object with an empty message.
+        """
+        super(BroadcastDecoder, self).__init__()
+
+        self.message = []
+
+        self._items = []
+        self._keyframe_id = None
+
+        return
+
+    def decode(self, packet):
+        """Decode
+
+        Applies a single broadcast packet to the message.
+
+        Arguments:
+            packet: The received packet string.
+
+        Returns:
+            True if the message changed, False otherwise.
+        """
+        if len(packet) < _HEADER.size:
+            return False
+
+        kind, keyframe_id, num_items = _HEADER.unpack_from(packet)
+
+        if kind == KEYFRAME:
+            if keyframe_id != self._keyframe_id:
+                # A new keyframe replaces all bodies
+                self._keyframe_id = keyframe_id
+                self._items = [None] * num_items
+
+            record = _KEYFRAME_RECORD
+            apply_record = self._apply_keyframe_record
+        elif kind == DELTA and keyframe_id == self._keyframe_id:
+            record = _DELTA_RECORD
+            apply_record = self._apply_delta_record
+        else:
+            return False
+
+        for offset in range(_HEADER.size, len(packet) - record.size + 1,
+                record.size):
+            values = record.unpack_from(packet, offset)
+
+            if values[0] < len(self._items):
+                apply_record(values)
+
+        self.message = [item for item in self._items if item is not None]
+
+        return True
+
+    def _apply_keyframe_record(self, values):
+        """Apply Keyframe Record
+
+        Creates the body dictionary of an unpacked keyframe record.
+
+        Arguments:
+            values: The unpacked record values.
+        """
+        idx, type_code, has_color = values[0:3]
+        params = values[3:7]
+        color = values[7:11]
+        pose = values[11:23]
+
+        item = {'type': _GEOM_TYPES[type_code]}
+
+        if item['type'] == 'GeomPlane':
+            item['normal'] = params[0:3]
+            item['distance'] = params[3]
+        else:
+            item['position'] = pose[0:3]
+            item['rotation'] = pose[3:12]
+
+            if has_color:
+                item['color'] = color
+
+            if item['type'] == 'GeomBox':
+                item['scale'] = params[0:3]
+            elif item['type'] == 'GeomSphere':
+                item['radius'] = params[0]
+            else:
+                item['radius'] = params[0]
+                item['length'] = params[1]
+
+        self._items[idx] = item
+
+        return
+
+    def _apply_delta_record(self, values):
+        """Apply Delta Record
+
+        Updates the pose of a body from an unpacked delta record.
+
+        Arguments:
+            values: The unpacked record values.
+        """
+        item = self._items[values[0]]
+
+        if item is not None:
+            item['position'] = values[1:4]
+            item['rotation'] = values[4:13]
+
+        return
+
+
+if __name__ == '__main__':
+    pass
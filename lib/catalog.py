@@ -0,0 +1,452 @@
+#!/usr/bin/env python
+
+"""Catalog module
+
+Keeps an SQLite catalog of path data files and a summary of their contents,
+so sets of files can be selected without opening each one. The catalog is
+updated by an incremental scan which only reads new and changed files.
+
+Each file has one row in the 'files' table:
+    filename - The absolute filename.
+    directory - The absolute directory of the file.
+    mtime, size - The modification time and size of the file when read.
+    num_samples, num_cols - The shape of the path data.
+    duration - The time span of the path in [s].
+    has_rating - 1 if the path has a rating column, else 0.
+    rating_mean, rating_min, rating_max - The normalized (0.0 to 1.0)
+        ratings of the path. NULL without a rating column.
+    path_length - The tooltip path length in [m].
+    accuracy_mean - The mean closest approach to the gates in [m].
+    gates_randomized - 1 if the starting gate layout differs from the
+        standard layout, else 0.
+    gates_moving - 1 if any gate moves during the path, else 0.
+    gate_layout - A hash of the starting gate layout. Paths with the same
+        layout have the same hash.
+    source - A free label of where the file came from (e.g. 'capture').
+    network - The neural network which generated the path, if any.
+    error - The error message if the file could not be read, else NULL.
+
+Files which are not in the current path data layout only have their shape
+and duration recorded.
+
+Author:
+    Evan Sneath - evansneath@gmail.com
+
+License:
+    Open Software License v3.0
+
+Classes:
+    Catalog: An SQLite catalog of path data files.
+"""
+
+import os
+import hashlib
+import sqlite3
+import multiprocessing
+
+import numpy as np
+
+import surgicalsim.lib.constants as constants
+import surgicalsim.lib.datastore as datastore
+import surgicalsim.lib.models as models
+import surgicalsim.lib.pathutils as pathutils
+
+
+# Increment with any change to the table or the summary values. Catalogs of
+# an older version are rebuilt
+_VERSION = 1
+
+# Summary columns extracted from each file, in table order
+_SUMMARY_COLUMNS = (
+    ('num_samples', 'INTEGER'),
+    ('num_cols', 'INTEGER'),
+    ('duration', 'REAL'),
+    ('has_rating', 'INTEGER'),
+    ('rating_mean', 'REAL'),
+    ('rating_min', 'REAL'),
+    ('rating_max', 'REAL'),
+    ('path_length', 'REAL'),
+    ('accuracy_mean', 'REAL'),
+    ('gates_randomized', 'INTEGER'),
+    ('gates_moving', 'INTEGER'),
+    ('gate_layout', 'TEXT'),
+    ('error', 'TEXT'),
+)
+
+
+class Catalog(object):
+    """Catalog class
+
+    An SQLite catalog of path data files. The catalog is filled by scanning
+    directories and queried with SQL conditions on the file summaries.
+
+    Attributes:
+        filename: The catalog database filename.
+
+    Methods:
+        scan: Updates the catalog with the files of a set of directories.
+        label: Sets the source and network labels of a set of files.
+        select: Returns the filenames matching a condition.
+        query: Returns the rows matching a condition.
+        close: Closes the catalog database.
+    """
+    def __init__(self, filename=constants.G_CATALOG_FILE):
+        """Initialize
+
+        Opens the catalog database, creating it if it does not exist.
+
+        Arguments:
+            filename: The catalog database filename.
+                (Default: G_CATALOG_FILE)
+        """
+        super(Catalog, self).__init__()
+
+        self.filename = filename
+
+        catalog_dir = os.path.dirname(os.path.abspath(filename))
+
+        if not os.path.isdir(catalog_dir):
+            os.makedirs(catalog_dir)
+
+        self._db = sqlite3.connect(filename)
+        self._db.row_factory = sqlite3.Row
+
+        version = self._db.execute('PRAGMA user_version').fetchone()[0]
+
+        if version != _VERSION:
+            # Summaries of an older version are extracted again on the next
+            # scan of each directory
+            self._db.execute('DROP TABLE IF EXISTS files')
+
+        summary = ', '.join('%s %s' % column for column in _SUMMARY_COLUMNS)
+
+        self._db.execute('CREATE TABLE IF NOT EXISTS files ('
+                'filename TEXT PRIMARY KEY, directory TEXT, mtime REAL, '
+                'size INTEGER, %s, source TEXT, network TEXT)' % summary)
+        self._db.execute('CREATE INDEX IF NOT EXISTS files_directory '
+                'ON files (directory)')
+        self._db.execute('PRAGMA user_version = %d' % _VERSION)
+        self._db.commit()
+
+        return
+
+    def scan(self, dirs, source=None, network=None, processes=None):
+        """Scan
+
+        Updates the catalog with the .dat files of a set of directories.
+        Only files which are new, or whose modification time or size
+        changed, are read. Files which no longer exist are removed.
+
+        Arguments:
+            dirs: A list of directories.
+            source: The source label of every scanned file. If None,
+                labels are kept. (Default: None)
+            network: The network label of every scanned file. If None,
+                labels are kept. (Default: None)
+            processes: The number of worker processes which read files. If
+                None, one per CPU is used. (Default: None)
+
+        Returns:
+            A tuple of the number of files added or updated, unchanged, and
+            removed.
+        """
+        if isinstance(dirs, str):
+            dirs = [dirs]
+
+        pending = []
+        num_unchanged = 0
+        num_removed = 0
+
+        for directory in dirs:
+            directory = os.path.abspath(directory)
+
+            known = dict((row['filename'], (row['mtime'], row['size']))
+                    for row in self._db.execute('SELECT filename, mtime, '
+                    'size FROM files WHERE directory = ?', (directory,)))
+
+            filenames = []
+
+            # The files of a deleted directory are all removed
+            if os.path.isdir(directory):
+                filenames = [os.path.abspath(filename) for filename in
+                        pathutils.list_data_files(directory)]
+
+            for filename in filenames:
+                stat = os.stat(filename)
+
+                if known.pop(filename, None) == (stat.st_mtime, stat.st_size):
+                    num_unchanged += 1
+                else:
+                    pending.append((filename, directory, stat.st_mtime,
+                            stat.st_size))
+
+            # Every file left in the catalog was deleted
+            self._db.executemany('DELETE FROM files WHERE filename = ?',
+                    [(filename,) for filename in known])
+            num_removed += len(known)
+
+        if len(pending):
+            if processes is None:
+                processes = multiprocessing.cpu_count()
+
+            processes = max(1, min(processes, len(pending)))
+            filenames = [item[0] for item in pending]
+
+            if processes == 1:
+                summaries = [_summarize_file(filename)
+                        for filename in filenames]
+            else:
+                pool = multiprocessing.Pool(processes)
+
+                try:
+                    summaries = pool.map(_summarize_file, filenames)
+                finally:
+                    pool.close()
+                    pool.join()
+
+            names = [name for name, _ in _SUMMARY_COLUMNS]
+
+            # Labels of updated files are kept
+            self._db.executemany('INSERT OR IGNORE INTO files (filename) '
+                    'VALUES (?)', [(filename,) for filename in filenames])
+            self._db.executemany('UPDATE files SET directory = ?, mtime = ?, '
+                    'size = ?, %s WHERE filename = ?' %
+                    ', '.join('%s = ?' % name for name in names),
+                    [item[1:] + tuple(summary[name] for name in names) +
+                    (item[0],) for item, summary in zip(pending, summaries)])
+
+        self._db.commit()
+
+        for directory in dirs:
+            self.label('directory = ?', (os.path.abspath(directory),),
+                    source=source, network=network)
+
+        return len(pending), num_unchanged, num_removed
+
+    def label(self, where, params=(), source=None, network=None):
+        """Label
+
+        Sets the source and network labels of the files matching a
+        condition.
+
+        Arguments:
+            where: The SQL condition on the columns of the files table.
+            params: The values of the condition placeholders. (Default: ())
+            source: The source label. If None, it is kept. (Default: None)
+            network: The network label. If None, it is kept.
+                (Default: None)
+        """
+        for name, value in (('source', source), ('network', network)):
+            if value is not None:
+                self._db.execute('UPDATE files SET %s = ? WHERE %s' %
+                        (name, where), (value,) + tuple(params))
+
+        self._db.commit()
+
+        return
+
+    def select(self, where='1', params=(), order_by='filename'):
+        """Select
+
+        Selects the files matching a condition. For instance, all rated
+        paths of randomized gate layouts with a mean rating above 0.7:
+
+            catalog.select('rating_mean > ? AND gates_randomized', (0.7,))
+
+        Arguments:
+            where: The SQL condition on the columns of the files table.
+                (Default: all files)
+            params: The values of the condition placeholders. (Default: ())
+            order_by: The SQL ordering of the files. (Default: 'filename')
+
+        Returns:
+            A list of the filenames.
+        """
+        return [row['filename'] for row in
+                self.query(where, params, order_by, columns='filename')]
+
+    def query(self, where='1', params=(), order_by='filename', columns='*'):
+        """Query
+
+        Queries the file summaries matching a condition.
+
+        Arguments:
+            where: The SQL condition on the columns of the files table.
+                (Default: all files)
+            params: The values of the condition placeholders. (Default: ())
+            order_by: The SQL ordering of the files. (Default: 'filename')
+            columns: The SQL list of columns returned. (Default: '*')
+
+        Returns:
+            A list of rows. Each row is indexed by column name.
+        """
+        return self._db.execute('SELECT %s FROM files WHERE %s ORDER BY %s' %
+                (columns, where, order_by), tuple(params)).fetchall()
+
+    def close(self):
+        """Close
+
+        Closes the catalog database.
+        """
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+        return False
+
+
+def _summarize_file(filename):
+    """Summarize File
+
+    Worker of Catalog.scan(). Reads a path data file and extracts its
+    summary values.
+
+    Arguments:
+        filename: The path data filename.
+
+    Returns:
+        A dictionary of each summary column value. Values which do not apply
+        to the file are None.
+    """
+    summary = dict((name, None) for name, _ in _SUMMARY_COLUMNS)
+
+    try:
+        data = np.asarray(datastore.retrieve(filename), dtype=float)
+
+        if data.ndim != 2:
+            raise ValueError('Path data must be two dimensional')
+
+        summary.update(_summarize_path(data))
+    except Exception as e:
+        summary['error'] = str(e)
+
+    return summary
+
+
+def _summarize_path(data):
+    """Summarize Path
+
+    Extracts the summary values of path data.
+
+    Arguments:
+        data: The numpy array of size (T, columns) of path data.
+
+    Returns:
+        A dictionary of the summary values which apply to the path.
+    """
+    summary = {
+        'num_samples': len(data),
+        'num_cols': data.shape[1],
+    }
+
+    if len(data):
+        t = data[:,constants.G_TIME_IDX]
+        summary['duration'] = float(np.max(t) - np.min(t))
+
+    # Only the current path data layout (with or without the rating) is
+    # understood further
+    num_cols = constants.G_TOTAL_COLS
+
+    if not len(data) or data.shape[1] not in (num_cols,
+            num_cols - constants.G_TOTAL_NUM_MISC):
+        return summary
+
+    has_rating = data.shape[1] == num_cols
+
+    summary['has_rating'] = int(has_rating)
+
+    if has_rating:
+        ratings = data[:,constants.G_RATING_IDX]
+
+        summary['rating_mean'] = float(np.mean(ratings))
+        summary['rating_min'] = float(np.min(ratings))
+        summary['rating_max'] = float(np.max(ratings))
+
+    pos_start_idx = constants.G_POS_IDX
+    pos_end_idx = pos_start_idx + constants.G_NUM_POS_DIMS
+
+    summary['path_length'] = float(np.sum(np.sqrt(np.sum(np.diff(
+            data[:,pos_start_idx:pos_end_idx], axis=0) ** 2, axis=1))))
+
+    summary['accuracy_mean'] = float(np.mean(
+            pathutils.calc_closest_approaches(data)))
+
+    gate_pos = data[:,pathutils._get_gate_pos_cols()]
+
+    tolerance = constants.G_CATALOG_GATE_TOLERANCE
+
+    # The standard [x, z] gate positions of the test article
+    gate_pos_standard = models.get_gate_layout(randomize=False)[:,[0, 2]]
+
+    summary['gates_randomized'] = int(np.any(np.abs(
+            gate_pos[0][:,[0, 2]] - gate_pos_standard) > tolerance))
+    summary['gates_moving'] = int(np.any(np.abs(
+            gate_pos - gate_pos[0]) > tolerance))
+
+    # Layouts are compared to the tolerance
+    layout = np.round(gate_pos[0] / tolerance).astype(np.int64)
+    summary['gate_layout'] = hashlib.sha1(layout.tobytes()).hexdigest()[:16]
+
+    return summary
+
+
+if __name__ == '__main__':
+    """Main
+
+    If the module is directly called, the given directories are scanned
+    into the catalog and the files matching a condition are listed.
+
+    Usage:
+        ./catalog.py [-h] [-c CATALOG] [-s SOURCE] [-n NETWORK]
+                     [-w WHERE] [-j PROCESSES] [dirs [dirs ...]]
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('dirs', nargs='*',
+                        help='directories of path data files to scan')
+    parser.add_argument('-c', '--catalog',
+                        help='catalog database file',
+                        action='store',
+                        default=constants.G_CATALOG_FILE)
+    parser.add_argument('-s', '--source',
+                        help='source label of the scanned files',
+                        action='store',
+                        default=None)
+    parser.add_argument('-n', '--network',
+                        help='network label of the scanned files',
+                        action='store',
+                        default=None)
+    parser.add_argument('-w', '--where',
+                        help='list the files matching an SQL condition '
+                             '(e.g. "rating_mean > 0.7 AND gates_randomized")',
+                        action='store',
+                        default=None)
+    parser.add_argument('-j', '--processes',
+                        help='number of scanning processes (default: one '
+                             'per cpu)',
+                        action='store',
+                        type=int,
+                        default=None)
+    args = parser.parse_args()
+
+    with Catalog(args.catalog) as catalog:
+        if len(args.dirs):
+            counts = catalog.scan(args.dirs, source=args.source,
+                    network=args.network, processes=args.processes)
+
+            print('%d read, %d unchanged, %d removed' % counts)
+
+        if args.where is not None:
+            for filename in catalog.select(args.where):
+                print(filename)
+
+    exit()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+
+"""Clock module
+
+Provides the highest resolution monotonic clock available for timing the
+simulation event loops.
+
+Python 3.3+ provides a monotonic clock. Python 2 does not, so the system
+monotonic clock is called through ctypes (clock_gettime() on Linux,
+mach_absolute_time() on OS X, and QueryPerformanceCounter() by time.clock()
+on Windows). The wall clock is only used when none of these is available.
+
+Author:
+    Evan Sneath - evansneath@gmail.com
+
+License:
+    Open Software License v3.0
+
+Functions:
+    monotonic: Returns the current value of the clock in seconds.
+"""
+
+import sys
+import time
+import ctypes
+import ctypes.util
+
+
+# The clock_gettime() clock id of the Linux monotonic clock
+_CLOCK_MONOTONIC_LINUX = 1
+
+
+class _timespec(ctypes.Structure):
+    """The struct timespec of clock_gettime()"""
+    _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+
+class _mach_timebase_info(ctypes.Structure):
+    """The struct mach_timebase_info of mach_timebase_info()"""
+    _fields_ = [('numer', ctypes.c_uint32), ('denom', ctypes.c_uint32)]
+
+
+def _get_clock():
+    """Get Clock
+
+    Finds the best monotonic clock of the system.
+
+    Returns:
+        A function which returns the current clock value in [s].
+    """
+    if hasattr(time, 'perf_counter'):
+        # A monotonic, high resolution clock is available (Python 3.3+)
+        return time.perf_counter
+
+    if sys.platform.startswith('linux'):
+        libc = ctypes.CDLL(ctypes.util.find_library('rt') or
+                ctypes.util.find_library('c'), use_errno=True)
+
+        clock_gettime = libc.clock_gettime
+        clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(_timespec)]
+        clock_gettime.restype = ctypes.c_int
+
+        ts = _timespec()
+
+        if clock_gettime(_CLOCK_MONOTONIC_LINUX, ctypes.byref(ts)) != 0:
+            raise OSError(ctypes.get_errno(), 'clock_gettime() failed')
+
+        def clock():
+            clock_gettime(_CLOCK_MONOTONIC_LINUX, ctypes.byref(ts))
+            return ts.tv_sec + ts.tv_nsec * 1.0e-9
+
+        return clock
+
+    if sys.platform == 'darwin':
+        libc = ctypes.CDLL(ctypes.util.find_library('c'))
+
+        mach_absolute_time = libc.mach_absolute_time
+        mach_absolute_time.argtypes = []
+        mach_absolute_time.restype = ctypes.c_uint64
+
+        timebase = _mach_timebase_info()
+        libc.mach_timebase_info(ctypes.byref(timebase))
+
+        scale = 1.0e-9 * timebase.numer / timebase.denom
+
+        def clock():
+            return mach_absolute_time() * scale
+
+        return clock
+
+    if sys.platform == 'win32':
+        # Backed by QueryPerformanceCounter()
+        return time.clock
+
+    raise OSError('No monotonic clock on %s' % sys.platform)
+
+
+try:
+    _clock = _get_clock()
+except (OSError, AttributeError, TypeError):
+    # The wall clock may step. Users of the clock must tolerate steps
+    _clock = time.time
+
+
+def monotonic():
+    """Monotonic
+
+    Returns the current value of the clock. Only the difference between
+    two values is meaningful.
+
+    Returns:
+        The current clock value in [s].
+    """
+    return _clock()
+
+
+if __name__ == '__main__':
+    pass
@@ -23,19 +23,130 @@ G_IP_LOCAL_DEFAULT = '127.0.0.1'
 G_PORT_DEFAULT = 5555
 G_CONTROLLER_MSG_FMT = '!iiddddddd'
 
+# Each recorded controller packet is prefixed by its capture time [s]
+G_CONTROLLER_LOG_FMT = '!d'
+
 
 # ----------------------------------------------------------------------------
 # Environment constants
 
+# The event loop rate. The controller is polled and data is recorded once
+# per frame (60-240 [Hz] is reasonable)
 G_ENVIRONMENT_FPS = 60.0 # [Hz]
+
+# The ODE step rate. Each frame is divided into physics sub-steps. Must be at
+# least the event loop rate
+G_PHYSICS_FPS = 1000.0 # [Hz]
+
+# The highest rate at which body information is sent to the viewer
+G_VIEWER_FPS = 30.0 # [Hz]
+
+# Bodies whose position [m] or rotation matrix elements change by less than
+# this are not sent to the viewer
+G_VIEWER_EPSILON = 1.0e-5
+
+# All bodies are sent at this interval so new or lossy viewers catch up
+G_VIEWER_KEYFRAME_INTERVAL = 1.0 # [s]
+
+# The largest viewer packet. Must not exceed the viewer receive buffer
+G_VIEWER_PACKET_SIZE = 16384 # [bytes]
+
+# Bodies whose position [m] or rotation matrix elements change by less than
+# this are considered unmoved, so their positions are not read again
+G_SCENE_EPSILON = 1.0e-9
+
 G_ENVIRONMENT_GRAVITY = 0.0 #[m/s^2]
 
 
+# ----------------------------------------------------------------------------
+# World cache constants
+
+# Generated XODE world files are cached here and shared by all runs
+G_WORLD_CACHE_DIR = os.path.expanduser(
+        os.path.join('~', '.surgicalsim', 'worlds'))
+
+# The most world files kept in the cache. The least recently used files are
+# deleted first
+G_WORLD_CACHE_MAX_FILES = 32
+
+
+# ----------------------------------------------------------------------------
+# Frame scheduler constants
+
+# The catch-up policy used when a frame misses its deadline:
+#   'substep' - Run extra physics steps next frame to catch up to real time
+#   'drop'    - Skip the missed frames. Simulation time falls behind
+#   'slowmo'  - Shift all following deadlines. The simulation runs slower
+G_SCHEDULER_POLICY = 'substep'
+
+# The most simulation time caught up in a single frame by the 'substep' policy
+G_SCHEDULER_MAX_CATCHUP = 4 # [frames]
+
+
+# ----------------------------------------------------------------------------
+# Profiling constants
+
+# The phases timed within each simulation frame (in order of execution)
+G_PROFILER_PHASES = (
+    'controller',
+    'capture',
+    'correction',
+    'ik',
+    'ode',
+    'viewer',
+    'sleep',
+)
+
+# Phases which are not counted as frame work when detecting overruns
+G_PROFILER_IDLE_PHASES = ('sleep',)
+
+# The number of most recent frames kept by the profiler
+G_PROFILER_CAPACITY = 3600 # [frames]
+
+
 # ----------------------------------------------------------------------------
 # Mitsubishi PA10 constants
 
 G_MAX_ACCEL = 0.8 # [m/s^2]
 
+# The position of the PA10 base on the floor
+G_PA10_X_OFFSET = 0.0 # [m]
+G_PA10_Z_OFFSET = 1.0 # [m]
+
+# The PA10 hinge joints from the base to the flange
+G_PA10_JOINT_NAMES = (
+    'pa10_s1',
+    'pa10_s2',
+    'pa10_s3',
+    'pa10_e1',
+    'pa10_e2',
+    'pa10_w1',
+    'pa10_w2',
+)
+
+# Damped least squares inverse kinematics parameters
+G_PA10_IK_DAMPING = 0.05 # [m]
+G_PA10_IK_MAX_ITER = 10
+G_PA10_IK_TOLERANCE = 1.0e-4 # [m]
+G_PA10_IK_MAX_STEP = 0.1 # [m]
+G_PA10_IK_LIMIT_MARGIN = 0.0175 # [rad]
+
+# The iterations of each frame's correction around a precomputed solution
+G_PA10_IK_PATH_ITER = 1
+
+# The time budget of a single inverse kinematics solve
+G_PA10_IK_BUDGET = 1.0e-3 # [s]
+
+# The width of the moving average smoothing a precomputed joint trajectory
+G_PA10_IK_SMOOTHING = 5 # [frames]
+
+# NOTE: The joint velocity limits are taken from the PA10-7C specification.
+# The acceleration limits are an estimate
+G_PA10_MAX_JOINT_VEL = np.deg2rad([57.0, 57.0, 114.0, 114.0, 360.0, 360.0,
+        360.0]) # [rad/s]
+G_PA10_MAX_JOINT_ACCEL = np.deg2rad([115.0, 115.0, 230.0, 230.0, 720.0,
+        720.0, 720.0]) # [rad/s^2]
+
 
 # ----------------------------------------------------------------------------
 # End effector constants
@@ -58,6 +169,9 @@ G_TABLE_IS_OSCILLATING = True
 G_TABLE_OSCILLATION_AMP = 0.015 # [m]
 G_TABLE_OSCILLATION_FREQ = 0.2 # [Hz]
 
+# The sample period of precomputed table motion trajectories
+G_TABLE_DISTURBANCE_DT = 0.001 # [s]
+
 # Table constants
 G_TABLE_LENGTH = 0.4 # [m]
 G_TABLE_HEIGHT = 0.01 # [m]
@@ -152,6 +266,85 @@ G_NUM_RATING_INPUTS = 1
 G_TOTAL_NUM_MISC = G_NUM_RATING_INPUTS
 G_TOTAL_COLS = G_TOTAL_NUM_INPUTS + G_TOTAL_NUM_OUTPUTS + G_TOTAL_NUM_MISC
 
+# The initial number of samples of a path recorder. The buffer doubles in
+# size when full
+G_RECORDER_CAPACITY = 4096 # [samples]
+
+
+# ----------------------------------------------------------------------------
+# Archive constants
+
+# The number of rows of each independently readable chunk of an archive
+G_ARCHIVE_CHUNK_ROWS = 4096
+
+# The zlib compression level of archive column blocks (1 to 9)
+G_ARCHIVE_COMPRESSION_LEVEL = 6
+
+# Archives converted from path files are written beside them, named as the
+# path file with this extension
+G_ARCHIVE_FILE_EXT = '.archive'
+
+
+# ----------------------------------------------------------------------------
+# Catalog constants
+
+# The catalog of path data files and their summaries
+G_CATALOG_FILE = os.path.expanduser(
+        os.path.join('~', '.surgicalsim', 'catalog.sqlite'))
+
+# Gate positions closer than this are the same when comparing gate layouts
+G_CATALOG_GATE_TOLERANCE = 1.0e-4 # [m]
+
+
+# ----------------------------------------------------------------------------
+# Path processing constants
+
+# Tooltip motion slower than this is idle lead-in/lead-out when trimming
+G_TRIM_VELOCITY = 0.01 # [m/s]
+
+# The idle time kept before the first and after the last motion
+G_TRIM_MARGIN = 0.25 # [s]
+
+# Each step of gate closest approach distance lowers an automatic segment
+# rating by one (from 5 down to 1)
+G_RATING_DISTANCE_STEP = 0.005 # [m]
+
+# Segment ratings (1 to 5, one per line) are read from a file named as the
+# raw path file with this extension
+G_RATING_FILE_EXT = '.ratings'
+
+
+# ----------------------------------------------------------------------------
+# Path correction constants
+
+# The number of past gate velocities of the predictive correction model
+G_PREDICTOR_ORDER = 4
+
+# The weight of each older velocity in the predictive correction model fit
+# (0 to 1). Lower values follow changes of the gate motion faster
+G_PREDICTOR_FORGETTING = 0.99
+
+# The initial covariance of the predictive correction model fit. Also bounds
+# the covariance while the gates are still
+G_PREDICTOR_COVARIANCE = 1.0e12
+
+# The predictive correction aims for the gate positions this far ahead
+G_PREDICTOR_HORIZON = 1 # [frames]
+
+
+# ----------------------------------------------------------------------------
+# Plotting constants
+
+# Longer paths are downsampled for display
+G_PLOT_MAX_POINTS = 2000
+
+# Size [in] and resolution [dpi] of headless rendered figures
+G_PLOT_FIGURE_SIZE = (10.0, 8.0)
+G_PLOT_DPI = 100
+
+# File formats of headless rendered figures
+G_PLOT_FORMATS = ('png', 'svg')
+
 
 # ----------------------------------------------------------------------------
 # Artificial neural network constants
@@ -13,11 +13,18 @@ License:
 Classes:
     PhantomOmniData: Parses and holds a single packet of Omni controller data.
     PhantomOmniInterface: Provides an interface for Omni communications.
+    PhantomOmniReplayInterface: Provides the Omni interface from a recorded
+        packet log.
+    PhantomOmniRecorder: Records raw Omni packets to a packet log.
     PhantomOmniThread: A communication thread for controller status updating.
+
+Functions:
+    load_packet_log: Reads all (time, packet) pairs from a packet log file.
 """
 
 import array
 import time
+import bisect
 import socket
 import struct
 import numpy as np
@@ -112,10 +119,15 @@ class PhantomOmniInterface(object):
     Gets positional and pointing vector information from the Phantom Omni
     6-DOF controller.
 
+    Attributes:
+        is_finished: Determines if the controller has no more data to provide.
+
     Methods:
         set_dt: Sets the change of time between timesteps.
         connect: Starts the communication thread and connects to TCP socket.
         disconnect: Kills the communication thread.
+        start_recording: Begins logging every packet used by update().
+        stop_recording: Stops logging packets and closes the packet log.
         update: Updates all positional and angular data from the latest
             Phantom Omni controller information.
         get_linear_vel: Returns the most recently updated linear velocity as
@@ -151,6 +163,9 @@ class PhantomOmniInterface(object):
         # Phantom Omni device
         self._thread = None
 
+        # Holds the packet recorder while recording is active
+        self._recorder = None
+
         # Initialize time and difference in time between polling. dt is used
         # only in calculations to determine linear/angular velocities
         self._t = 0.0 # [s]
@@ -170,6 +185,19 @@ class PhantomOmniInterface(object):
         return
 
 
+    @property
+    def is_finished(self):
+        """Is Finished Property
+
+        Determines if the controller has run out of data. A live controller
+        never runs out of data.
+
+        Returns:
+            True if no new data will be provided, False otherwise.
+        """
+        return False
+
+
     def set_dt(self, dt):
         """Set dt
 
@@ -220,8 +248,38 @@ class PhantomOmniInterface(object):
 
         Attempts to disconnect the TCP server from the incoming client.
         """
+        self.stop_recording()
+
         # Terminate the data collection thread
-        self._thread.terminate()
+        if self._thread is not None:
+            self._thread.terminate()
+
+        return
+
+
+    def start_recording(self, filename):
+        """Start Recording
+
+        Logs every packet consumed by update() to the given file. The log
+        can be played back with the PhantomOmniReplayInterface class.
+
+        Arguments:
+            filename: The packet log file to create.
+        """
+        self.stop_recording()
+        self._recorder = PhantomOmniRecorder(filename)
+
+        return
+
+
+    def stop_recording(self):
+        """Stop Recording
+
+        Stops logging packets and closes the packet log if recording.
+        """
+        if self._recorder is not None:
+            self._recorder.close()
+            self._recorder = None
 
         return
 
@@ -233,10 +291,35 @@ class PhantomOmniInterface(object):
         method updates each positional, rotational, and velocity array with
         appropriate calculations.
         """
+        raw_data = self._get_raw_data()
+
+        if self._recorder is not None:
+            self._recorder.write(raw_data)
+
+        self._update_values(raw_data)
+
+        return
+
+
+    def _get_raw_data(self):
+        """Get Raw Data
+
+        Returns the newest raw packet from the shared thread array.
+        """
         # Convert shared data array into a byte list form
-        raw_data = array.array('b', list(self._cur_data)).tostring()
+        return array.array('b', list(self._cur_data)).tostring()
 
-        # Grab the newest Omni data from the shared thread array
+
+    def _update_values(self, raw_data):
+        """Update Values From Raw Data
+
+        Parses a raw packet and updates each positional, rotational, and
+        velocity array.
+
+        Arguments:
+            raw_data: Raw, packed data in the Phantom Omni message format.
+        """
+        # Parse the packet into formatted Omni data
         parsed_data = PhantomOmniData(raw_data=raw_data)
 
         # Get the new tooltip position from the device
@@ -301,6 +384,176 @@ class PhantomOmniInterface(object):
         return self._cur_angle
 
 
+class PhantomOmniReplayInterface(PhantomOmniInterface):
+    """PhantomOmniReplayInterface class
+
+    Provides the PhantomOmniInterface API from a packet log recorded by the
+    PhantomOmniRecorder class. This allows the simulation to be driven
+    deterministically without a connected controller.
+
+    Inherits:
+        PhantomOmniInterface: The Phantom Omni controller interface.
+
+    Attributes:
+        realtime: If True, the packet replayed by update() is the latest
+            packet at the elapsed wall time since connect(). Otherwise, one
+            packet is replayed per update() as fast as possible.
+        is_finished: Determines if all logged packets have been replayed.
+    """
+    def __init__(self, filename, dt=0.01, realtime=True):
+        """Initialize
+
+        Creates a new PhantomOmniReplayInterface object.
+
+        Arguments:
+            filename: The packet log file to replay.
+            dt: The difference in time between timesteps used to calculate
+                linear and angular velocity.
+            realtime: Determines if packets are replayed at their recorded
+                times. (Default: True)
+        """
+        super(PhantomOmniReplayInterface, self).__init__(dt=dt)
+
+        self.realtime = realtime
+
+        self._filename = filename
+        self._packet_times = []
+        self._packets = []
+        self._packet_idx = -1
+        self._t_connect = 0.0
+
+        return
+
+
+    @property
+    def is_finished(self):
+        """Is Finished Property
+
+        Determines if the last packet in the log has been replayed.
+
+        Returns:
+            True if the log is exhausted, False otherwise.
+        """
+        return self._packet_idx >= len(self._packets) - 1
+
+
+    def connect(self, ip=None, port=None):
+        """Connect to Packet Log
+
+        Loads the packet log into memory. The ip and port arguments are
+        accepted for compatibility with PhantomOmniInterface and are ignored.
+        """
+        log = load_packet_log(self._filename)
+
+        if not len(log):
+            raise ValueError('No packets found in %s' % self._filename)
+
+        self._packet_times = [t for t, _ in log]
+        self._packets = [packet for _, packet in log]
+        self._packet_idx = -1
+
+        self._t_connect = time.time()
+
+        return
+
+
+    def _get_raw_data(self):
+        """Get Raw Data
+
+        Returns the next raw packet from the packet log.
+        """
+        if self.realtime:
+            # Find the latest packet which has been "received" by now
+            t_elapsed = time.time() - self._t_connect
+            idx = bisect.bisect_right(self._packet_times, t_elapsed) - 1
+            self._packet_idx = max(idx, 0)
+        elif not self.is_finished:
+            self._packet_idx += 1
+
+        return self._packets[self._packet_idx]
+
+
+class PhantomOmniRecorder(object):
+    """PhantomOmniRecorder class
+
+    Writes raw Phantom Omni packets to a packet log. Each packet is stored
+    in the G_CONTROLLER_MSG_FMT format prefixed by its time since recording
+    started in the G_CONTROLLER_LOG_FMT format.
+
+    Methods:
+        write: Writes a single raw packet to the log.
+        close: Closes the packet log.
+    """
+    def __init__(self, filename):
+        """Initialize
+
+        Creates (or overwrites) the packet log file.
+
+        Arguments:
+            filename: The packet log file to create.
+        """
+        super(PhantomOmniRecorder, self).__init__()
+
+        self._f = open(filename, 'wb')
+        self._t_start = time.time()
+
+        return
+
+
+    def write(self, raw_data):
+        """Write Packet
+
+        Writes a raw packet with the current recording time.
+
+        Arguments:
+            raw_data: Raw, packed data in the Phantom Omni message format.
+        """
+        t = time.time() - self._t_start
+        self._f.write(struct.pack(constants.G_CONTROLLER_LOG_FMT, t))
+        self._f.write(raw_data)
+
+        return
+
+
+    def close(self):
+        """Close
+
+        Flushes and closes the packet log.
+        """
+        self._f.close()
+
+        return
+
+
+def load_packet_log(filename):
+    """Load Packet Log
+
+    Reads a packet log written by the PhantomOmniRecorder class.
+
+    Arguments:
+        filename: The packet log file to read.
+
+    Returns:
+        A list of (time, raw_data) tuples in recorded order.
+    """
+    t_size = struct.calcsize(constants.G_CONTROLLER_LOG_FMT)
+    msg_size = struct.calcsize(constants.G_CONTROLLER_MSG_FMT)
+    record_size = t_size + msg_size
+
+    with open(filename, 'rb') as f:
+        contents = f.read()
+
+    log = []
+
+    # Ignore a trailing partial record (a recording that was cut short)
+    for offset in range(0, len(contents) - record_size + 1, record_size):
+        t = struct.unpack(constants.G_CONTROLLER_LOG_FMT,
+                contents[offset:offset+t_size])[0]
+        log.append((t, contents[offset+t_size:offset+record_size]))
+
+    return log
+
+
 class PhantomOmniThread(multiprocessing.Process):
     """PhantomOmniThread class
 
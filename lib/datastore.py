@@ -27,6 +27,8 @@ import numpy as np
 # Import pybrain sequential data module
 from pybrain.datasets.sequential import SequentialDataSet
 
+import surgicalsim.lib.archive as archive
+
 
 def store(data, filename):
     """Store Data
@@ -48,6 +50,7 @@ def retrieve(filename):
     """Retrieve Data
 
     Returns all pickled data in the specified filename as a Python object.
+    Compressed archive files (see the archive module) are read as well.
 
     Arguments:
         filename: The filename containing the pickled object data.
@@ -55,6 +58,9 @@ def retrieve(filename):
     Returns:
         The unpickled Python object.
     """
+    if archive.is_archive(filename):
+        return archive.retrieve(filename)
+
     data = np.load(filename)
     return data
 
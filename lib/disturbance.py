@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+
+"""Disturbance module
+
+Describes the motion of the test article table as a trajectory of offsets
+from its initial position. The trajectory is sampled once for the whole
+run, so the table is driven and the gate positions are predicted by table
+lookups without querying the physics engine.
+
+Author:
+    Evan Sneath - evansneath@gmail.com
+
+License:
+    Open Software License v3.0
+
+Classes:
+    Disturbance: A precomputed offset trajectory.
+    KinematicDriver: Drives a body along a disturbance by velocity.
+"""
+
+import numpy as np
+
+import surgicalsim.lib.constants as constants
+import surgicalsim.lib.datastore as datastore
+
+
+class Disturbance(object):
+    """Disturbance class
+
+    Holds an offset trajectory sampled at a fixed period. Offsets between
+    samples are linearly interpolated. Before the first sample and after the
+    last sample, the first and last offsets are held.
+
+    Attributes:
+        offsets: The numpy array of size (N, 3) of the sampled offsets in
+            [m].
+        dt: The sample period in [s].
+        t_start: The time of the first sample in [s].
+        duration: The time between the first and last samples in [s].
+
+    Methods:
+        static: Returns a disturbance without motion.
+        sine: Returns a sinusoidal disturbance along one axis.
+        multi_sine: Returns a sum of sinusoidal disturbances.
+        from_samples: Returns a disturbance resampled from recorded motion.
+        load: Returns a disturbance of recorded motion stored in a file.
+        offset: Returns the offset at one or more times.
+        displace: Returns positions moved by the offset at one or more times.
+    """
+    def __init__(self, offsets, dt=constants.G_TABLE_DISTURBANCE_DT,
+            t_start=0.0):
+        """Initialize
+
+        Arguments:
+            offsets: The numpy array of size (N, 3) of the sampled offsets
+                in [m].
+            dt: The sample period in [s]. (Default: G_TABLE_DISTURBANCE_DT)
+            t_start: The time of the first sample in [s]. (Default: 0.0)
+        """
+        super(Disturbance, self).__init__()
+
+        offsets = np.array(offsets, dtype=float, ndmin=2)
+
+        if offsets.ndim != 2 or offsets.shape[1] != constants.G_NUM_POS_DIMS \
+                or len(offsets) == 0:
+            raise ValueError('Disturbance offsets must be of size (N, %d)' %
+                    constants.G_NUM_POS_DIMS)
+
+        if dt <= 0.0:
+            raise ValueError('Disturbance sample period must be positive')
+
+        self.duration = (len(offsets) - 1) * dt
+
+        # Every lookup interpolates between two samples
+        if len(offsets) == 1:
+            offsets = np.vstack((offsets, offsets))
+
+        self.offsets = offsets
+        self.dt = float(dt)
+        self.t_start = float(t_start)
+
+        return
+
+    @classmethod
+    def static(cls):
+        """Static
+
+        Returns:
+            A new Disturbance object which holds a zero offset.
+        """
+        return cls(np.zeros((1, constants.G_NUM_POS_DIMS)))
+
+    @classmethod
+    def sine(cls, duration, amp=constants.G_TABLE_OSCILLATION_AMP,
+            freq=constants.G_TABLE_OSCILLATION_FREQ, axis=1,
+            dt=constants.G_TABLE_DISTURBANCE_DT):
+        """Sine
+
+        Creates a sinusoidal disturbance along one axis which starts at a
+        zero offset.
+
+        Arguments:
+            duration: The duration of the disturbance in [s].
+            amp: The amplitude in [m]. (Default: G_TABLE_OSCILLATION_AMP)
+            freq: The frequency in [Hz]. (Default: G_TABLE_OSCILLATION_FREQ)
+            axis: The axis of motion (0: x, 1: y, 2: z). (Default: 1)
+            dt: The sample period in [s]. (Default: G_TABLE_DISTURBANCE_DT)
+
+        Returns:
+            A new Disturbance object.
+        """
+        return cls.multi_sine(duration, [(amp, freq, 0.0, axis)], dt=dt)
+
+    @classmethod
+    def multi_sine(cls, duration, components,
+            dt=constants.G_TABLE_DISTURBANCE_DT):
+        """Multi Sine
+
+        Creates a disturbance of the sum of sinusoidal components.
+
+        Arguments:
+            duration: The duration of the disturbance in [s].
+            components: A list of (amplitude, frequency, phase, axis) tuples
+                of each component in [m, Hz, rad, -].
+            dt: The sample period in [s]. (Default: G_TABLE_DISTURBANCE_DT)
+
+        Returns:
+            A new Disturbance object.
+        """
+        t = np.arange(int(np.ceil(duration / dt)) + 1) * dt
+
+        offsets = np.zeros((len(t), constants.G_NUM_POS_DIMS))
+
+        for amp, freq, phase, axis in components:
+            offsets[:,axis] += amp * np.sin(2.0 * np.pi * freq * t + phase)
+
+        return cls(offsets, dt=dt)
+
+    @classmethod
+    def from_samples(cls, times, offsets,
+            dt=constants.G_TABLE_DISTURBANCE_DT):
+        """From Samples
+
+        Creates a disturbance from recorded motion, such as patient motion.
+        The recorded offsets are resampled at a fixed period.
+
+        Arguments:
+            times: The numpy array of size (N) of the increasing recorded
+                sample times in [s].
+            offsets: The numpy array of size (N, 3) of the recorded offsets
+                in [m].
+            dt: The sample period in [s]. (Default: G_TABLE_DISTURBANCE_DT)
+
+        Returns:
+            A new Disturbance object. The first recorded sample is at time
+            zero.
+        """
+        times = np.asarray(times, dtype=float)
+        offsets = np.asarray(offsets, dtype=float)
+
+        if len(times) != len(offsets) or len(times) == 0:
+            raise ValueError('Each recorded offset must have a sample time')
+
+        if np.any(np.diff(times) <= 0.0):
+            raise ValueError('Recorded sample times must be increasing')
+
+        duration = times[-1] - times[0]
+
+        t = times[0] + np.arange(int(np.floor(duration / dt)) + 1) * dt
+
+        resampled = np.column_stack([np.interp(t, times, offsets[:,axis])
+                for axis in range(constants.G_NUM_POS_DIMS)])
+
+        return cls(resampled, dt=dt)
+
+    @classmethod
+    def load(cls, filename, dt=constants.G_TABLE_DISTURBANCE_DT):
+        """Load
+
+        Loads recorded motion stored in a file. Each row of the stored array
+        holds the [time, x, y, z] of a sample in [s, m, m, m].
+
+        Arguments:
+            filename: The recorded motion filename.
+            dt: The sample period in [s]. (Default: G_TABLE_DISTURBANCE_DT)
+
+        Returns:
+            A new Disturbance object.
+        """
+        data = np.atleast_2d(datastore.retrieve(filename))
+
+        if data.shape[1] != constants.G_NUM_POS_DIMS + 1:
+            raise ValueError('%s must hold [time, x, y, z] rows' % filename)
+
+        return cls.from_samples(data[:,0], data[:,1:], dt=dt)
+
+    def offset(self, t):
+        """Offset
+
+        Arguments:
+            t: A time or a numpy array of size (T) of times in [s].
+
+        Returns:
+            The numpy array of size (3) or (T, 3) of the offsets in [m].
+        """
+        last = len(self.offsets) - 1
+
+        pos = np.clip((np.asarray(t, dtype=float) - self.t_start) / self.dt,
+                0.0, last)
+
+        idx = np.minimum(pos.astype(int), last - 1)
+        frac = (pos - idx)[...,np.newaxis]
+
+        return self.offsets[idx] * (1.0 - frac) + self.offsets[idx+1] * frac
+
+    def displace(self, positions, t):
+        """Displace
+
+        Moves positions by the offset at one or more times, such as to
+        predict the gate positions of a disturbed test article.
+
+        Arguments:
+            positions: The numpy array of size (..., 3) of positions at a
+                zero offset in [m].
+            t: A time or a numpy array of size (T) of times in [s].
+
+        Returns:
+            The numpy array of size (..., 3) or (T, ..., 3) of the displaced
+            positions in [m].
+        """
+        positions = np.asarray(positions, dtype=float)
+        offset = self.offset(t)
+
+        if offset.ndim > 1:
+            offset = offset.reshape((len(offset),) +
+                    (1,) * (positions.ndim - 1) + (constants.G_NUM_POS_DIMS,))
+
+        return positions + offset
+
+
+class KinematicDriver(object):
+    """KinematicDriver class
+
+    Drives a body of the environment along a disturbance. The body and all
+    bodies joined to it by fixed joints are given the velocity which takes
+    the body to its next position over each frame, so the physics engine
+    moves them together with no teleport. Contacts which push the bodies off
+    the trajectory are corrected on the next frame.
+
+    Attributes:
+        disturbance: The Disturbance object of the body motion.
+        origin: The position of the body at a zero offset in [m].
+
+    Methods:
+        update: Sets the velocities which move the body over the next frame.
+    """
+    def __init__(self, env, body_name, disturbance, t=0.0):
+        """Initialize
+
+        Arguments:
+            env: The EnvironmentInterface object holding the body.
+            body_name: The name of the driven body.
+            disturbance: The Disturbance object of the body motion.
+            t: The current time of the disturbance in [s]. The body is
+                taken to be at its offset of this time. (Default: 0.0)
+        """
+        super(KinematicDriver, self).__init__()
+
+        self.disturbance = disturbance
+
+        self.origin = env.get_body_pos(body_name) - disturbance.offset(t)
+
+        # The driven bodies are looked up once
+        self._body = env.get_body_by_name(body_name)
+        self._bodies = [env.get_body_by_name(name)
+                for name in env.get_fixed_bodies(body_name)]
+
+        return
+
+    def update(self, t, dt):
+        """Update
+
+        Sets the velocity which moves the body from its current position to
+        its position at time t + dt over the next dt seconds. The driven
+        bodies are not rotated.
+
+        Arguments:
+            t: The current time of the disturbance in [s].
+            dt: The time until the next update in [s].
+        """
+        target = self.origin + self.disturbance.offset(t + dt)
+
+        vel = tuple((target - self._body.getPosition()) / dt)
+        zero = (0.0, 0.0, 0.0)
+
+        for body in self._bodies:
+            body.setLinearVel(vel)
+            body.setAngularVel(zero)
+
+        return
+
+
+if __name__ == '__main__':
+    pass
@@ -17,7 +17,16 @@ Classes:
 
 import numpy as np
 import ode
+import xode.joint
 from pybrain.rl.environments.ode import ODEEnvironment, actuators
+from pybrain.utilities import threaded
+
+import surgicalsim.lib.constants as constants
+
+from surgicalsim.lib.clock import monotonic
+from surgicalsim.lib.broadcast import BroadcastEncoder
+
+import surgicalsim.lib.models as models
 
 
 class EnvironmentInterface(ODEEnvironment):
@@ -41,6 +50,12 @@ class EnvironmentInterface(ODEEnvironment):
         set_group_angular_vel: Sets the angular velocity of a group of bodies.
         get_body_by_name: Returns the ODE body object given a body name.
         get_body_pos: Returns the position of a body given a body name.
+        get_body_positions: Returns the positions of a list of bodies.
+        get_body_versions: Returns the motion versions of a list of bodies.
+        update_body_positions: Reads the positions of only the bodies of a
+            list which moved since they were last read.
+        get_fixed_bodies: Returns the bodies joined to a body by fixed
+            joints.
         set_body_pos: Sets the position of a body given a body name.
         get_body_linear_vel: Returns the velocity of a body given a body name.
         set_body_linear_vel: Sets the velocity of a body given a body name.
@@ -48,11 +63,15 @@ class EnvironmentInterface(ODEEnvironment):
             body name.
         set_body_angular_vel: Sets the angular velocity of a body given a
             body name.
-        step: Step the world by 'dt' seconds.
+        get_joint_angles: Returns the angles of a list of hinge joints.
+        reset_test_article: Moves the test article gates to a new layout.
+        step: Step the world by one or more 'dt' second sub-steps.
+        perform_action: Actuates the joints and steps the world.
+        update_viewer: Sends the current body information to viewer clients.
     """
     def __init__(self, xode_filename, render=True, realtime=True,
             ip='127.0.0.1', port='21590', buffer='16384', verbose=False,
-            gravity=-9.81):
+            gravity=-9.81, viewer_fps=constants.G_VIEWER_FPS):
         """Initialize
 
         Initializes the ODE world, variables, the frame rate and the 
@@ -73,6 +92,9 @@ class EnvironmentInterface(ODEEnvironment):
                 displayed. (Boolean - Default: False)
             gravity: The gravity in meters per second to be excerted on objects
                 in the world. (Float - Default: -9.81)
+            viewer_fps: The highest rate at which body information is sent
+                to viewer clients in [Hz]. If None, every update is sent.
+                (Float - Default: G_VIEWER_FPS)
         """
         # Initialize the superclass object
         super(EnvironmentInterface, self).__init__(
@@ -85,6 +107,42 @@ class EnvironmentInterface(ODEEnvironment):
                 verbose=verbose
         )
 
+        # Determines if viewer updates are skipped during world steps
+        self._viewer_deferred = False
+
+        # Viewer updates are rate limited against a fixed grid of send times
+        self._viewer_dt = 1.0 / viewer_fps if viewer_fps else 0.0
+        self._t_viewer_next = 0.0
+
+        # Body information is packed to fit the viewer receive buffer. The
+        # encoder is created once the bodies are loaded
+        self._packet_size = int(buffer)
+        self._encoder = None
+        self._t_keyframe = None
+        self._num_clients = 0
+
+        # The fixed joints of the world are found on the first reset
+        self._fixed_joints = None
+
+        # Joints are looked up by name once and cached
+        self._joints = {}
+
+        # The bodies by name, built from the body list on the first body
+        # lookup. Rebuilt if the world model is reloaded
+        self._bodies = None
+        self._bodies_source = None
+
+        # The bodies joined by fixed joints move as one component. Each
+        # component has a version which changes when it moves. Built on the
+        # first version lookup and rebuilt if the world model is reloaded
+        self._scene = None
+        self._scene_source = None
+        self._scene_bodies = []
+        self._scene_poses = []
+        self._scene_versions = []
+        self._scene_checked = []
+        self._scene_counter = 0
+
         # Load XODE file (This is generated prior to env initialization)
         self.loadXODE(xode_filename)
 
@@ -195,12 +253,17 @@ class EnvironmentInterface(ODEEnvironment):
         Return:
             The copied body object if found, None otherwise.
         """
-        # Pull out the body in the (body, geom) tuple
-        for body, _ in self.body_geom:
-            if body is not None and body.name == name:
-                return body
+        if self._bodies_source is not self.body_geom:
+            self._bodies = {}
+            self._bodies_source = self.body_geom
 
-        return
+            # Pull out the body in the (body, geom) tuple. The first body of
+            # a name is found, as with a search of the list
+            for body, _ in self.body_geom:
+                if body is not None:
+                    self._bodies.setdefault(body.name, body)
+
+        return self._bodies.get(name)
 
     def get_body_pos(self, name):
         """Get Body Position
@@ -217,6 +280,111 @@ class EnvironmentInterface(ODEEnvironment):
         pos = body.getPosition()
         return np.asarray(pos)
 
+    def get_body_positions(self, names, out=None):
+        """Get Body Positions
+
+        Gets the current positions of a list of bodies.
+
+        Arguments:
+            names: A list of body names.
+            out: A numpy array of size (N, 3) into which the positions are
+                written. Any view (such as the gate positions of a path
+                sample) may be given. If None, a new array is created.
+                (Default: None)
+
+        Returns:
+            The numpy array of size (N, 3) of (x, y, z) positions.
+        """
+        if out is None:
+            out = np.empty((len(names), 3))
+
+        get_body_by_name = self.get_body_by_name
+
+        for idx, name in enumerate(names):
+            out[idx] = get_body_by_name(name).getPosition()
+
+        return out
+
+    def get_body_versions(self, names, out=None):
+        """Get Body Versions
+
+        Gets the motion versions of a list of bodies. The version of a body
+        changes whenever the body may have moved, so a body only needs to be
+        read again once its version changes. Versions are never reused, even
+        if the world model is reloaded.
+
+        Bodies joined by fixed joints move as one component and share a
+        version. A component has moved once the pose of its first body
+        changes by more than G_SCENE_EPSILON, or once any of its bodies is
+        moved through this interface.
+
+        Arguments:
+            names: A list of body names.
+            out: A numpy integer array of size (N) into which the versions
+                are written. If None, a new array is created.
+                (Default: None)
+
+        Returns:
+            The numpy integer array of size (N) of body versions.
+        """
+        if out is None:
+            out = np.empty(len(names), dtype=int)
+
+        components = self._get_scene()
+
+        for idx, name in enumerate(names):
+            out[idx] = self._check_component(components[name])
+
+        return out
+
+    def update_body_positions(self, names, out, versions):
+        """Update Body Positions
+
+        Reads the positions of only the bodies of a list which moved since
+        their positions were last read. The positions of bodies in a static
+        scene are then read once.
+
+        Arguments:
+            names: A list of body names.
+            out: The numpy array of size (N, 3) of the last read positions.
+                The positions of moved bodies are written in place.
+            versions: The numpy integer array of size (N) of the versions of
+                the last read positions (see get_body_versions()). Updated in
+                place. Set to -1 to read every position.
+
+        Returns:
+            The number of body positions read.
+        """
+        current = self.get_body_versions(names)
+        moved = np.flatnonzero(current != versions)
+
+        get_body_by_name = self.get_body_by_name
+
+        for idx in moved:
+            out[idx] = get_body_by_name(names[idx]).getPosition()
+
+        versions[moved] = current[moved]
+
+        return len(moved)
+
+    def get_fixed_bodies(self, name):
+        """Get Fixed Bodies
+
+        Gets the bodies which move as one with a body, joined to it (or to
+        each other) by fixed joints.
+
+        Arguments:
+            name: The name of the body.
+
+        Returns:
+            A list of the body names, including the given body.
+        """
+        components = self._get_scene()
+        component = components[name]
+
+        return [body_name for body_name in sorted(components)
+                if components[body_name] == component]
+
     def set_body_pos(self, name, pos):
         """Set Body Position
 
@@ -230,7 +398,13 @@ class EnvironmentInterface(ODEEnvironment):
             None
         """
         body = self.get_body_by_name(name)
-        body.setPosition(tuple(pos))
+        pos = tuple(pos)
+
+        # Setting a body to where it already is does not move it
+        if body.getPosition() != pos:
+            self._touch_bodies([name])
+
+        body.setPosition(pos)
         return
 
     def get_body_angular_vel(self, name):
@@ -295,10 +469,263 @@ class EnvironmentInterface(ODEEnvironment):
         body.setLinearVel(tuple(vel))
         return
 
-    def step(self, paused=False, fast=False):
+    def get_joint_angles(self, names):
+        """Get Joint Angles
+
+        Gets the current angles of the given hinge joints.
+
+        Arguments:
+            names: A list of hinge joint names.
+
+        Returns:
+            A numpy array of the joint angles in [rad].
+        """
+        joints = self._joints
+
+        angles = np.zeros(len(names))
+
+        for idx, name in enumerate(names):
+            joint = joints.get(name)
+
+            if joint is None:
+                joint = self.root.namedChild(name).getODEObject()
+                joints[name] = joint
+
+            angles[idx] = joint.getAngle()
+
+        return angles
+
+    def reset_test_article(self, layout=None, seed=None):
+        """Reset Test Article
+
+        Moves the test article gates to a new layout in place. The table is
+        returned to its initial position and all test article bodies are
+        stopped. The world, its bodies, and its joints are reused, so no
+        world model is generated or loaded.
+
+        Arguments:
+            layout: A (G_NUM_GATES, 4) array of the [x, height, z, rotation]
+                of each gate in [m, m, m, rad]. If None, a randomized layout
+                is generated. (Default: None)
+            seed: The random seed of the randomized layout. Only used if no
+                layout is given. (Default: None)
+        """
+        if layout is None:
+            layout = models.get_gate_layout(randomize=True, seed=seed)
+
+        layout = np.asarray(layout, dtype=float)
+
+        geoms = dict((body.name, geom) for body, geom in self.body_geom
+                if body is not None)
+
+        # Return the table to its initial position
+        table = self.get_body_by_name('table')
+        table.setPosition(tuple(self.init_body_positions['table']))
+        table.setRotation((1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0))
+
+        moved = [table]
+
+        top_table = models.calc_table_top()
+
+        for gate_idx in range(constants.G_NUM_GATES):
+            rotation = models.calc_gate_rotation(layout[gate_idx, 3])
+
+            for body_args in models.calc_gate_bodies(gate_idx, top_table,
+                    layout[gate_idx]):
+                body = self.get_body_by_name(body_args['bname'])
+                geom = geoms[body_args['bname']]
+                size = body_args['size']
+
+                body.setPosition(tuple(body_args['pos']))
+
+                # Boxes turn with the gate. Cylinders stand upright and
+                # spheres need no orientation
+                if body_args['shape'] == 'box':
+                    body.setRotation(rotation)
+                    geom.setLengths(tuple(size))
+                elif body_args['shape'] == 'cylinder':
+                    geom.setParams(size[0], size[1])
+
+                moved.append(body)
+
+        for body in moved:
+            body.setLinearVel((0.0, 0.0, 0.0))
+            body.setAngularVel((0.0, 0.0, 0.0))
+
+        moved_names = set(body.name for body in moved)
+
+        self._touch_bodies(moved_names)
+
+        # Fixed joints hold the relative pose of their bodies from when they
+        # were fixed. Fix them again at the new poses
+
+        for joint in self._get_fixed_joints():
+            bodies = [joint.getBody(idx) for idx in range(2)]
+
+            if any(getattr(body, 'name', None) in moved_names
+                    for body in bodies):
+                joint.setFixed()
+
+        # Viewers need the new gate shapes
+        self._t_keyframe = None
+
+        return
+
+    def _get_fixed_joints(self):
+        """Get Fixed Joints
+
+        Finds all fixed joints of the loaded world model.
+
+        Returns:
+            A list of the ODE fixed joint objects.
+        """
+        if self._fixed_joints is None:
+            self._fixed_joints = []
+
+            nodes = [self.root]
+
+            while nodes:
+                node = nodes.pop()
+
+                if isinstance(node, xode.joint.Joint):
+                    joint = node.getODEObject()
+
+                    if isinstance(joint, ode.FixedJoint):
+                        self._fixed_joints.append(joint)
+
+                nodes.extend(node.getChildren())
+
+        return self._fixed_joints
+
+    def _get_scene(self):
+        """Get Scene
+
+        Groups the bodies of the loaded world model into components of
+        bodies joined by fixed joints. Each component starts with a new
+        version.
+
+        Returns:
+            A dictionary of the component index of each body name.
+        """
+        if self._scene_source is self.body_geom:
+            return self._scene
+
+        self._scene_source = self.body_geom
+
+        # Each body starts as its own group. The groups of the two bodies of
+        # each fixed joint are merged. Joints to the static environment have
+        # no second body
+        groups = {}
+
+        for body, _ in self.body_geom:
+            if body is not None:
+                groups.setdefault(body.name, [body.name])
+
+        for joint in self._get_fixed_joints():
+            names = [getattr(joint.getBody(idx), 'name', None)
+                    for idx in range(2)]
+
+            if not all(name in groups for name in names):
+                continue
+
+            group = groups[names[0]]
+            other = groups[names[1]]
+
+            if group is not other:
+                group.extend(other)
+
+                for name in other:
+                    groups[name] = group
+
+        self._scene = {}
+        self._scene_bodies = []
+
+        for body, _ in self.body_geom:
+            if body is None or body.name in self._scene:
+                continue
+
+            component = len(self._scene_bodies)
+
+            for name in groups[body.name]:
+                self._scene[name] = component
+
+            self._scene_bodies.append(body)
+
+        num_components = len(self._scene_bodies)
+
+        self._scene_poses = [body.getPosition() + body.getRotation()
+                for body in self._scene_bodies]
+        self._scene_versions = [0] * num_components
+        self._scene_checked = [None] * num_components
+
+        for component in range(num_components):
+            self._bump_component(component)
+
+        return self._scene
+
+    def _check_component(self, component):
+        """Check Component
+
+        Compares the pose of the first body of a component against its pose
+        when the component last moved. A component is compared at most once
+        per step.
+
+        Arguments:
+            component: The component index.
+
+        Returns:
+            The version of the component.
+        """
+        if self._scene_checked[component] != self.stepCounter:
+            self._scene_checked[component] = self.stepCounter
+
+            body = self._scene_bodies[component]
+            pose = body.getPosition() + body.getRotation()
+
+            change = max(abs(value - last) for value, last in
+                    zip(pose, self._scene_poses[component]))
+
+            if change > constants.G_SCENE_EPSILON:
+                self._scene_poses[component] = pose
+                self._bump_component(component)
+
+        return self._scene_versions[component]
+
+    def _touch_bodies(self, names):
+        """Touch Bodies
+
+        Gives the components of bodies moved through this interface a new
+        version.
+
+        Arguments:
+            names: A list of body names.
+        """
+        components = self._get_scene()
+
+        for component in set(components[name] for name in names
+                if name in components):
+            self._bump_component(component)
+
+        return
+
+    def _bump_component(self, component):
+        """Bump Component
+
+        Gives a component a new version.
+
+        Arguments:
+            component: The component index.
+        """
+        self._scene_counter += 1
+        self._scene_versions[component] = self._scene_counter
+
+        return
+
+    def step(self, paused=False, fast=False, update_viewer=True, substeps=1):
         """Step World
 
-        Steps the world by one timestep.
+        Steps the world by one or more timesteps of 'dt' seconds. Sensors and
+        viewer clients are only updated after the final sub-step.
 
         Arguments:
             paused: If True, the viewer will be updated, but the world time
@@ -307,17 +734,154 @@ class EnvironmentInterface(ODEEnvironment):
             fast: If True, the fast step Open Dynamics Engine algorithm will
                 be used. This is quicker and requires less memory but is less
                 accurate. (Default: False)
+            update_viewer: If False, viewer clients are not updated by this
+                step. The viewer may then be updated separately with
+                update_viewer(). (Default: True)
+            substeps: The number of 'dt' second timesteps to take.
+                (Default: 1)
         """
         if paused:
             # Update viewer so it receives messages, but the world remains
             # unmodified
-            self.updateClients()
-        else:
+            if update_viewer:
+                self.update_viewer()
+        elif substeps > 0:
+            # Run the leading sub-steps directly against ODE. Only the state
+            # after the final sub-step is observed, so the sensor and viewer
+            # work of the full step is skipped. Bound lookups are hoisted out
+            # of the loop
+            collide = self.space.collide
+            world_step = self.world.quickStep if fast else self.world.step
+            empty = self.contactgroup.empty
+            args = (self.world, self.contactgroup)
+            callback = self._near_callback
+            dt = float(self.dt)
+
+            for _ in range(substeps - 1):
+                collide(args, callback)
+                world_step(dt)
+                empty()
+
+            self.stepCounter += substeps - 1
+
             # Step by iterating the world by 'dt' seconds
+            self._viewer_deferred = not update_viewer
             super(EnvironmentInterface, self).step(fast=fast)
+            self._viewer_deferred = False
+
+        return
+
+    def perform_action(self, action, fast=False, update_viewer=True,
+            substeps=1):
+        """Perform Action
+
+        Sets the values of all actuators and steps the world. The actuator
+        values are held for all sub-steps.
+
+        Arguments:
+            action: The combined list of values for all actuators.
+            fast: If True, the fast step Open Dynamics Engine algorithm will
+                be used. (Default: False)
+            update_viewer: If False, viewer clients are not updated by this
+                step. (Default: True)
+            substeps: The number of 'dt' second timesteps to take.
+                (Default: 1)
+        """
+        # Hand each actuator its slice of the action values
+        pointer = 0
+
+        for actuator in self.actuators:
+            num_values = actuator.getNumValues()
+            actuator._update(action[pointer:pointer+num_values])
+            pointer += num_values
+
+        self.step(fast=fast, update_viewer=update_viewer, substeps=substeps)
+
+        return
+
+    def update_viewer(self):
+        """Update Viewer
+
+        Sends the current body information to all viewer clients. Nothing is
+        sent if the environment is not rendered.
+        """
+        if self.render:
+            self.updateClients()
 
         return
 
+    def updateClients(self):
+        """Update Clients (Subclassed)
+
+        Sends the bodies which moved since the last update to all viewer
+        clients. Every body is sent with each keyframe. Nothing is sent if
+        viewer updates are deferred by the current step, the last update was
+        sent too recently, or the last update is still being sent.
+        """
+        if self._viewer_deferred:
+            return
+
+        t = monotonic()
+
+        if t < self._t_viewer_next:
+            return
+
+        # Keep to the send time grid unless updates stopped for a while
+        self._t_viewer_next += self._viewer_dt
+
+        if self._t_viewer_next <= t:
+            self._t_viewer_next = t + self._viewer_dt
+
+        if not self.updateLock.acquire(False):
+            return
+
+        if self._encoder is None:
+            self._encoder = BroadcastEncoder(self.body_geom,
+                    packet_size=self._packet_size)
+
+        # Periodic keyframes recover viewers from lost packets
+        keyframe = self._t_keyframe is None or \
+                t - self._t_keyframe >= constants.G_VIEWER_KEYFRAME_INTERVAL
+
+        if keyframe:
+            self._t_keyframe = t
+
+        # Read the body poses now. Only the network wait is threaded
+        packets = self._encoder.encode(keyframe=keyframe)
+
+        self.updateDone = False
+        self._send_packets(packets)
+
+        return
+
+    @threaded()
+    def _send_packets(self, packets):
+        """Send Packets
+
+        Waits for viewer clients to check in and sends them the packets.
+        Releases the update lock when done.
+
+        Arguments:
+            packets: A list of packet strings.
+        """
+        try:
+            self.server.listen()
+
+            if self.server.clients > self._num_clients:
+                # New viewers need every body on the next update
+                self._t_keyframe = None
+
+            self._num_clients = self.server.clients
+
+            for sock, addr in zip(self.server.UDPOutSockList,
+                    self.server.addrList):
+                for packet in packets:
+                    sock.sendto(packet, addr)
+        finally:
+            self.updateLock.release()
+            self.updateDone = True
+
+        return
 
 if __name__ == '__main__':
     pass
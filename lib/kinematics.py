@@ -16,22 +16,401 @@ Classes:
 
 import numpy as np
 
+import surgicalsim.lib.constants as constants
+import surgicalsim.lib.models as models
+
 
 class PA10Kinematics(object):
     """PA10Kinematics class
 
-    Given the tooltip position and rotation of the PA10, the appropriate
-    velocities for the PA10 joint will be calculated.
+    Calculates the forward and inverse kinematics of the PA10 flange
+    position. The link geometry is read from the PA10 model, so the
+    kinematics always match the simulated arm.
+
+    Inverse kinematics are solved with damped least squares. Only the flange
+    position is constrained, so the redundant degrees of freedom are left
+    near the starting angles. Each solve starts from the previous solution,
+    which is within a few iterations of the goal when the goal moves
+    smoothly from frame to frame.
+
+    Joint angles follow the ODE hinge convention. A positive angle turns the
+    child link about the negated hinge axis given to ODE.
+
+    Attributes:
+        limits: The (7, 2) low and high joint limits in [rad].
+        max_vel: The 7 joint velocity limits in [rad/s].
+        max_accel: The 7 joint acceleration limits in [rad/s^2].
+        angles: The most recent inverse kinematics solution in [rad].
+
+    Methods:
+        reset: Sets the starting angles of the next solve.
+        calc_forward_kinematics: Returns the flange position for joint angles.
+        calc_path_forward_kinematics: Returns the flange positions and
+            orientations of a joint angle trajectory.
+        calc_jacobian: Returns the flange position and position Jacobian.
+        calc_inverse_kinematics: Returns the joint angles for a flange
+            position.
+        calc_path_inverse_kinematics: Returns a smoothed joint angle
+            trajectory for a flange path.
+        check_joint_rates: Returns the samples of a joint angle trajectory
+            which exceed the joint velocity and acceleration limits.
     """
-    def __init__(self):
+    def __init__(self, x_offset=constants.G_PA10_X_OFFSET,
+            z_offset=constants.G_PA10_Z_OFFSET,
+            damping=constants.G_PA10_IK_DAMPING,
+            max_iter=constants.G_PA10_IK_MAX_ITER,
+            tolerance=constants.G_PA10_IK_TOLERANCE,
+            max_step=constants.G_PA10_IK_MAX_STEP,
+            limit_margin=constants.G_PA10_IK_LIMIT_MARGIN):
+        """Initialize
+
+        Creates a new PA10Kinematics object for a PA10 at the given base
+        position.
+
+        Arguments:
+            x_offset: The x position of the PA10 base in [m].
+                (Default: G_PA10_X_OFFSET)
+            z_offset: The z position of the PA10 base in [m].
+                (Default: G_PA10_Z_OFFSET)
+            damping: The damping factor of the least squares solve in [m].
+                (Default: G_PA10_IK_DAMPING)
+            max_iter: The most iterations of a single solve.
+                (Default: G_PA10_IK_MAX_ITER)
+            tolerance: The flange position error at which a solve stops in
+                [m]. (Default: G_PA10_IK_TOLERANCE)
+            max_step: The largest flange position error corrected by a
+                single iteration in [m]. (Default: G_PA10_IK_MAX_STEP)
+            limit_margin: The distance kept from each joint stop in [rad].
+                (Default: G_PA10_IK_LIMIT_MARGIN)
+        """
         super(PA10Kinematics, self).__init__()
+
+        layout = models.get_joint_layout(x_offset, z_offset)
+
+        self.limits = layout['limits'].copy()
+        self.limits[:, 0] += limit_margin
+        self.limits[:, 1] -= limit_margin
+
+        self.max_vel = np.array(constants.G_PA10_MAX_JOINT_VEL, dtype=float)
+        self.max_accel = np.array(constants.G_PA10_MAX_JOINT_ACCEL,
+                dtype=float)
+
+        self.angles = np.zeros(len(self.limits))
+
+        self._damping_sq = damping ** 2
+        self._max_iter = max_iter
+        self._tolerance = tolerance
+        self._max_step = max_step
+
+        # Joint axes in the ODE hinge convention
+        axes = -layout['axes']
+
+        # Cross product matrices of each axis for the Rodrigues formula
+        num_joints = len(axes)
+        k = np.zeros((num_joints, 3, 3))
+        k[:, 0, 1] = -axes[:, 2]
+        k[:, 0, 2] = axes[:, 1]
+        k[:, 1, 0] = axes[:, 2]
+        k[:, 1, 2] = -axes[:, 0]
+        k[:, 2, 0] = -axes[:, 1]
+        k[:, 2, 1] = axes[:, 0]
+
+        self._axes = axes
+        self._k = k
+        self._k_sq = np.einsum('nij,njk->nik', k, k)
+
+        # The rest offset of each joint (and the flange) from the previous
+        # joint. Each offset is carried by the link between the two
+        points = np.vstack((layout['anchors'], layout['flange']))
+
+        self._base = points[0].copy()
+        self._offsets = np.diff(points, axis=0)
+
+        # Working buffers reused by every call
+        self._rotations = np.empty((num_joints, 3, 3))
+        self._frames = np.empty((num_joints + 1, 3, 3))
+        self._frames[0] = np.eye(3)
+        self._eye = np.eye(3)
+
+        return
+
+    def reset(self, angles=None):
+        """Reset
+
+        Sets the starting angles of the next inverse kinematics solve, such
+        as the measured angles of the simulated arm.
+
+        Arguments:
+            angles: The joint angles in [rad]. If None, all joints are
+                zeroed. (Default: None)
+        """
+        if angles is None:
+            self.angles = np.zeros(len(self.limits))
+        else:
+            self.angles = np.array(angles, dtype=float)
+
         return
 
-    def calc_inverse_kinematics(self, pos_init, pos_goal):
-        # TODO: Perform PA10 inverse kinematics
-        angles = np.array([0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0])
+    def _calc_joint_frames(self, angles):
+        """Calculate Joint Frames
+
+        Calculates the rotation of every link and the position of every
+        joint and the flange.
+
+        Arguments:
+            angles: The 7 joint angles in [rad].
+
+        Returns:
+            A tuple of the (8, 3, 3) link rotations relative to the rest pose
+            (base first) and the (8, 3) positions of the joints and flange.
+        """
+        angles = np.asarray(angles, dtype=float)
+
+        # All joint rotations at once. Only the chained product is serial
+        sin = np.sin(angles)[:, np.newaxis, np.newaxis]
+        versin = 1.0 - np.cos(angles)[:, np.newaxis, np.newaxis]
+
+        rotations = self._rotations
+        np.multiply(self._k, sin, out=rotations)
+        rotations += versin * self._k_sq
+        rotations += self._eye
+
+        frames = self._frames
+
+        for idx in range(len(rotations)):
+            np.dot(frames[idx], rotations[idx], out=frames[idx+1])
+
+        # Each offset is turned by all joints before its link
+        links = np.matmul(frames[1:], self._offsets[:, :, np.newaxis])[:, :, 0]
+
+        positions = np.empty((len(frames), 3))
+        positions[0] = self._base
+        np.cumsum(links, axis=0, out=positions[1:])
+        positions[1:] += self._base
+
+        return frames, positions
+
+    def calc_forward_kinematics(self, angles):
+        """Calculate Forward Kinematics
+
+        Calculates the flange position for the given joint angles.
+
+        Arguments:
+            angles: The 7 joint angles in [rad].
+
+        Returns:
+            The flange position in [m].
+        """
+        _, positions = self._calc_joint_frames(angles)
+
+        return positions[-1]
+
+    def calc_path_forward_kinematics(self, angles):
+        """Calculate Path Forward Kinematics
+
+        Calculates the flange position and orientation for every sample of
+        a joint angle trajectory. All samples are transformed at once, so
+        only the chain of 7 joints is iterated.
+
+        Arguments:
+            angles: A numpy array of size (T, 7) of joint angles in [rad].
+
+        Returns:
+            A tuple of the (T, 3) flange positions in [m] and the (T, 3, 3)
+            flange rotations relative to the rest pose.
+        """
+        angles = np.atleast_2d(np.asarray(angles, dtype=float))
+
+        # The rotation of every joint of every sample
+        sin = np.sin(angles)[:, :, np.newaxis, np.newaxis]
+        versin = 1.0 - np.cos(angles)[:, :, np.newaxis, np.newaxis]
+
+        rotations = sin * self._k + versin * self._k_sq
+        rotations += self._eye
+
+        frames = np.tile(self._eye, (len(angles), 1, 1))
+        positions = np.tile(self._base, (len(angles), 1))
+
+        for idx in range(rotations.shape[1]):
+            frames = np.matmul(frames, rotations[:, idx])
+            positions += np.dot(frames, self._offsets[idx])
+
+        return positions, frames
+
+    def calc_jacobian(self, angles):
+        """Calculate Jacobian
+
+        Calculates the flange position and the Jacobian of the flange
+        position with respect to the joint angles.
+
+        Arguments:
+            angles: The 7 joint angles in [rad].
+
+        Returns:
+            A tuple of the flange position in [m] and the (3, 7) Jacobian in
+            [m/rad].
+        """
+        frames, positions = self._calc_joint_frames(angles)
+
+        # The world axis of each joint is turned by all links before it
+        axes = np.matmul(frames[:-1], self._axes[:, :, np.newaxis])[:, :, 0]
+
+        # The cross product of each axis with its lever arm. Written out as
+        # np.cross is slow for small arrays
+        arms = positions[-1] - positions[:-1]
+
+        jacobian = np.empty((3, len(arms)))
+        jacobian[0] = axes[:, 1] * arms[:, 2] - axes[:, 2] * arms[:, 1]
+        jacobian[1] = axes[:, 2] * arms[:, 0] - axes[:, 0] * arms[:, 2]
+        jacobian[2] = axes[:, 0] * arms[:, 1] - axes[:, 1] * arms[:, 0]
+
+        return positions[-1], jacobian
+
+    def calc_inverse_kinematics(self, pos_goal, angles_init=None,
+            max_iter=None):
+        """Calculate Inverse Kinematics
+
+        Solves for the joint angles which place the flange at the goal
+        position using damped least squares. Joint angles are held within
+        the joint limits. An unreachable goal gives the angles of the
+        closest reachable position.
+
+        Arguments:
+            pos_goal: The goal flange position in [m].
+            angles_init: The starting joint angles in [rad]. If None, the
+                previous solution is used. (Default: None)
+            max_iter: The most iterations of this solve. If None, the
+                iteration limit of the object is used. (Default: None)
+
+        Returns:
+            The 7 joint angles in [rad].
+        """
+        if max_iter is None:
+            max_iter = self._max_iter
+
+        if angles_init is None:
+            angles = self.angles.copy()
+        else:
+            angles = np.array(angles_init, dtype=float)
+
+        pos_goal = np.asarray(pos_goal, dtype=float)
+
+        low = self.limits[:, 0]
+        high = self.limits[:, 1]
+
+        damping = self._damping_sq * self._eye
+
+        for _ in range(max_iter):
+            pos, jacobian = self.calc_jacobian(angles)
+
+            error = pos_goal - pos
+            error_norm = np.sqrt(np.dot(error, error))
+
+            if error_norm < self._tolerance:
+                break
+
+            # Large errors are corrected over several iterations to keep
+            # the linearization valid
+            if error_norm > self._max_step:
+                error *= self._max_step / error_norm
+
+            # dq = J^T (J J^T + l^2 I)^-1 e
+            step = np.linalg.solve(np.dot(jacobian, jacobian.T) + damping,
+                    error)
+
+            angles += np.dot(jacobian.T, step)
+            np.clip(angles, low, high, out=angles)
+
+        self.angles = angles
+
+        return angles.copy()
+
+    def calc_path_inverse_kinematics(self, positions, angles_init=None,
+            smoothing=constants.G_PA10_IK_SMOOTHING):
+        """Calculate Path Inverse Kinematics
+
+        Solves for the joint angles of every sample of a flange path. Each
+        sample starts from the solution of the sample before it. The
+        trajectory is then smoothed with a centered moving average. The
+        starting angles of the next call to calc_inverse_kinematics() are
+        left unchanged.
+
+        Arguments:
+            positions: A numpy array of size (T, 3) of flange positions in
+                [m].
+            angles_init: The starting joint angles of the first sample in
+                [rad]. If None, the previous solution is used.
+                (Default: None)
+            smoothing: The width of the moving average in samples. Even
+                widths are rounded up. No smoothing is done for widths of 1
+                or less. (Default: G_PA10_IK_SMOOTHING)
+
+        Returns:
+            A numpy array of size (T, 7) of joint angles in [rad].
+        """
+        positions = np.atleast_2d(np.asarray(positions, dtype=float))
+
+        angles_prev = self.angles
+
+        if angles_init is None:
+            angles_init = self.angles
+
+        angles = np.empty((len(positions), len(self.limits)))
+
+        # The first sample has no nearby solution to start from
+        max_iter = 10 * self._max_iter
+
+        for idx, pos in enumerate(positions):
+            angles[idx] = self.calc_inverse_kinematics(pos, angles_init,
+                    max_iter=max_iter)
+
+            angles_init = self.angles
+            max_iter = self._max_iter
+
+        self.angles = angles_prev
+
+        if smoothing <= 1 or len(angles) < 2:
+            return angles
+
+        # Moving average by differences of the cumulative sum. The ends are
+        # padded with their end values so the path keeps its length
+        pad = int(smoothing) // 2
+        width = 2 * pad + 1
+
+        padded = np.vstack((np.repeat(angles[:1], pad, axis=0), angles,
+                np.repeat(angles[-1:], pad, axis=0)))
+
+        total = np.vstack((np.zeros((1, angles.shape[1])),
+                np.cumsum(padded, axis=0)))
+
+        smoothed = (total[width:] - total[:-width]) / width
+
+        # Smoothing never leaves the joint limits, since it only averages
+        # angles within them
+        return smoothed
+
+    def check_joint_rates(self, angles, dt):
+        """Check Joint Rates
+
+        Finds the samples of a joint angle trajectory whose joint velocity
+        or acceleration exceed the joint limits.
+
+        Arguments:
+            angles: A numpy array of size (T, 7) of joint angles in [rad].
+            dt: The time between samples in [s].
+
+        Returns:
+            A tuple of numpy boolean arrays of size (T-1, 7) and (T-2, 7).
+            The first marks each step whose joint velocity exceeds its
+            limit. The second marks each step whose joint acceleration
+            exceeds its limit.
+        """
+        angles = np.asarray(angles, dtype=float)
+
+        vel = np.diff(angles, axis=0) / dt
+        accel = np.diff(vel, axis=0) / dt
 
-        return angles
+        return np.abs(vel) > self.max_vel, np.abs(accel) > self.max_accel
 
 
 if __name__ == '__main__':
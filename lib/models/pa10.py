@@ -14,10 +14,14 @@ License:
 Functions:
     build_pa10: Given an XODE object, a PA10 robotic arm will be built in the
         world.
+    get_joint_layout: Returns the joint anchors, axes, and limits of the
+        PA10 built by build_pa10.
 """
 
 import numpy as np
 
+import surgicalsim.lib.constants as constants
+
 
 def build_pa10(xode, x_offset, z_offset):
     pa10_passset = ['pa10']
@@ -559,6 +563,80 @@ def build_pa10(xode, x_offset, z_offset):
     return
 
 
+def get_joint_layout(x_offset, z_offset):
+    """Get Joint Layout
+
+    Reads the joint layout of the PA10 at rest (all joint angles zero) back
+    from build_pa10, so the layout always matches the built model.
+
+    Arguments:
+        x_offset: The x position of the PA10 base in [m].
+        z_offset: The z position of the PA10 base in [m].
+
+    Returns:
+        A dictionary of numpy arrays:
+            anchors: (7, 3) joint anchor positions in [m].
+            axes: (7, 3) unit joint axes as given to ODE.
+            limits: (7, 2) low and high joint stops in [rad].
+            flange: (3,) position of the center of the flange (the top of
+                the last link) in [m].
+    """
+    recorder = _JointRecorder()
+    build_pa10(recorder, x_offset, z_offset)
+
+    joints = [recorder.joints[name] for name in constants.G_PA10_JOINT_NAMES]
+
+    anchors = np.array([joint['anchor'] for joint in joints], dtype=float)
+
+    axes = np.array([[joint['axis']['x'], joint['axis']['y'],
+            joint['axis']['z']] for joint in joints], dtype=float)
+
+    limits = np.array([[joint['axis']['LowStop'], joint['axis']['HiStop']]
+            for joint in joints], dtype=float)
+
+    # The last link is an upright cylinder centered on its body position
+    l7 = recorder.bodies['pa10_l7']
+    flange = np.array(l7['pos'], dtype=float) + \
+            np.array([0.0, l7['size'][1] / 2.0, 0.0])
+
+    return {
+        'anchors': anchors,
+        'axes': axes / np.linalg.norm(axes, axis=1)[:, np.newaxis],
+        'limits': limits,
+        'flange': flange,
+    }
+
+
+class _JointRecorder(object):
+    """_JointRecorder class
+
+    Stands in for an XODE object to record the bodies and joints inserted
+    by build_pa10.
+    """
+    def __init__(self):
+        super(_JointRecorder, self).__init__()
+
+        self.bodies = {}
+        self.joints = {}
+
+        return
+
+    def insertBody(self, bname, **kwargs):
+        self.bodies[bname] = kwargs
+        return
+
+    def insertJoint(self, body1, body2, type, axis=None, anchor=(0, 0, 0),
+            name=None, **kwargs):
+        if name is None:
+            name = body1 + '_' + body2
+
+        self.joints[name] = {'type': type, 'axis': axis, 'anchor': anchor}
+        return
+
+    def affixToEnvironment(self, name):
+        return
+
+
 def _build_arm_segment(xode, name, mass, passset, joint_size, joint_pos,
         arm_size, arm_pos, color):
     """Build Arm Segment
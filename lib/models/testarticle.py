@@ -16,6 +16,11 @@ Functions:
         the world.
     build_test_article: Given an XODE obejct, the test article platform will
         be built in the world.
+    calc_table_top: Returns the height of the top of the test article table.
+    get_gate_layout: Returns the position, height, and angle of each gate.
+    sample_gate_layouts: Returns many seeded gate layouts at once.
+    calc_gate_rotation: Returns the orientation of a gate's turned bodies.
+    calc_gate_bodies: Returns the shape and placement of each gate body.
 """
 
 import numpy as np
@@ -65,7 +70,7 @@ def build_end_effector(xode, y_offset):
     return
 
 
-def build_test_article(xode, randomize=True):
+def build_test_article(xode, randomize=True, seed=None, layout=None):
     """Build Test Article
 
     Generates the test article used for training.
@@ -73,6 +78,11 @@ def build_test_article(xode, randomize=True):
     Arguments:
         randomize: Determines if the gates of the test article should be
             randomized with position, height, and angle. (Default: True)
+        seed: The random seed of the randomized gates. The same seed always
+            generates the same test article. (Default: None)
+        layout: A (G_NUM_GATES, 4) array of the [x, height, z, rotation] of
+            each gate, as sampled by sample_gate_layouts(). If given, the
+            randomize and seed arguments are ignored. (Default: None)
     """
     y_pos_test_article = constants.G_TABLE_Y_POS
     m_table = constants.G_TABLE_MASS
@@ -82,7 +92,7 @@ def build_test_article(xode, randomize=True):
     h_table = constants.G_TABLE_HEIGHT # [m]
 
     # Calculate the top of the table so gate generation is easier
-    y_top_table = h_table + y_pos_test_article
+    y_top_table = calc_table_top()
 
     siz_table = np.array([l_table, h_table, l_table])
     pos_table = np.array([
@@ -97,8 +107,68 @@ def build_test_article(xode, randomize=True):
             density=0.0, pos=pos_table, passSet=['test_article'],
             euler=eul_table, mass=m_table, color=(0.1, 0.1, 0.1, 1.0))
 
+    if layout is None:
+        layout = get_gate_layout(randomize, seed)
+
+    # Generate the gates at these positions
+    for i in range(constants.G_NUM_GATES):
+        _build_gate(xode, i, y_top_table, layout[i])
+
+    #xode.affixToEnvironment('table')
+
+    return y_top_table
+
+
+def calc_table_top():
+    """Calculate Table Top
+
+    Returns:
+        The y position of the top of the test article table in [m].
+    """
+    return constants.G_TABLE_HEIGHT + constants.G_TABLE_Y_POS
+
+
+def get_gate_layout(randomize=True, seed=None):
+    """Get Gate Layout
+
+    Calculates the placement of each test article gate. This is the first
+    layout sampled by sample_gate_layouts() with the same seed.
+
+    Arguments:
+        randomize: Determines if the gates of the test article should be
+            randomized with position, height, and angle. (Default: True)
+        seed: The random seed of the randomized gates. (Default: None)
+
+    Returns:
+        A numpy array of size (G_NUM_GATES, 4). Each row is the [x, height,
+        z, rotation] of a gate in [m, m, m, rad].
+    """
+    return sample_gate_layouts(1, seed=seed, randomize=randomize)[0]
+
+
+def sample_gate_layouts(num_layouts, seed=None, randomize=True):
+    """Sample Gate Layouts
+
+    Samples the placement of each test article gate for many layouts at
+    once. Each layout draws its random values in sequence, so the first
+    layouts of a seed are the same no matter how many are sampled.
+
+    Arguments:
+        num_layouts: The number of layouts to sample.
+        seed: The random seed of the randomized gates. (Default: None)
+        randomize: Determines if the gates should be randomized with
+            position, height, and angle. If False, every layout is the
+            nominal layout. (Default: True)
+
+    Returns:
+        A numpy array of size (num_layouts, G_NUM_GATES, 4). Each row is the
+        [x, height, z, rotation] of a gate in [m, m, m, rad].
+    """
+    num_gates = constants.G_NUM_GATES
+    l_table = constants.G_TABLE_LENGTH # [m]
+
     # Define the normalized gate height for each gate [y]
-    gate_norm_height = np.ones(8)
+    gate_norm_height = np.ones(num_gates)
 
     # Keep the standard height of each gate at 10 cm off the board
     gate_height_multiplier = 0.10
@@ -114,55 +184,77 @@ def build_test_article(xode, randomize=True):
     # Define the rotation multiplier to unnormalize the rotation value
     gate_rot_multiplier = 2.0 * np.pi
 
-    # Calculate the actual gate height [y]
-    gate_height = gate_norm_height * gate_height_multiplier
+    layouts = np.empty((num_layouts, num_gates, 4))
 
     # Calculate the actual gate position [x, z]
     gate_pos = constants.G_GATE_NORM_POS * gate_pos_multiplier
 
+    layouts[:, :, 0] = gate_pos[:, 0]
+    layouts[:, :, 2] = gate_pos[:, 1]
+
+    # Calculate the actual gate height [y]
+    layouts[:, :, 1] = gate_norm_height * gate_height_multiplier
+
     # Calculate the actual gate rotation
-    gate_rot = gate_norm_rot * gate_rot_multiplier
+    layouts[:, :, 3] = gate_norm_rot * gate_rot_multiplier
 
     # Randomize gate height, position, rotation if flag is set
     if randomize:
-        # Randomize height (y-direction)
-        height_rand = (constants.G_GATE_HEIGHT_RAND *
-                ((np.random.rand(8) - 0.5) * 2.0))
+        rng = np.random.RandomState(seed)
 
-        # Randomize position (x,z-direction)
-        pos_rand = (constants.G_GATE_POS_RAND *
-                ((np.random.rand(8, 2) - 0.5) * 2.0))
+        # Draw the height, position, and rotation offsets of each layout
+        # in sequence, scaled to [-1, 1)
+        rand = (rng.rand(num_layouts, 4 * num_gates) - 0.5) * 2.0
 
-        # Randomize marker rotation
-        rot_rand = (constants.G_GATE_ROT_RAND *
-                ((np.random.rand(8) - 0.5) * 2.0))
+        height_rand = rand[:, 0:num_gates]
+        pos_rand = rand[:, num_gates:3*num_gates].reshape(-1, num_gates, 2)
+        rot_rand = rand[:, 3*num_gates:4*num_gates]
 
         # Offset the gate attributes
-        gate_height += height_rand
-        gate_pos += pos_rand
-        gate_rot += rot_rand
+        layouts[:, :, 0] += constants.G_GATE_POS_RAND * pos_rand[:, :, 0]
+        layouts[:, :, 1] += constants.G_GATE_HEIGHT_RAND * height_rand
+        layouts[:, :, 2] += constants.G_GATE_POS_RAND * pos_rand[:, :, 1]
+        layouts[:, :, 3] += constants.G_GATE_ROT_RAND * rot_rand
 
-    # Generate the gates at these positions
-    for i in range(constants.G_NUM_GATES):
-        _build_gate(xode, i, y_top_table, gate_height[i], gate_pos[i],
-                gate_rot[i])
+    return layouts
 
-    #xode.affixToEnvironment('table')
 
-    return y_top_table
+def calc_gate_rotation(gate_rot):
+    """Calculate Gate Rotation
 
+    Calculates the orientation of the gate bodies turned with the gate. The
+    local x-axis of these bodies spans the gate markers.
+
+    Arguments:
+        gate_rot: The rotation of the gate in [rad].
+
+    Returns:
+        The 9-element row-major rotation matrix of the ODE body.
+    """
+    c = np.cos(gate_rot)
+    s = np.sin(gate_rot)
+
+    return (c, 0.0, -s, 0.0, 1.0, 0.0, s, 0.0, c)
 
-def _build_gate(xode, num, top_table, gate_height, gate_pos, gate_rot):
-    """Build Gate
+
+def calc_gate_bodies(num, top_table, gate):
+    """Calculate Gate Bodies
+
+    Calculates the shape and placement of every body of a gate.
 
     Arguments:
         num: The gate number to be appended to the name.
         top_table: The top of the table y position in [m].
-        gate_height: The height of the gate to generate in [m].
-        gate_pos: The 2-element numpy array of the [x, z] position of the
-            gate to generate in [m].
-        gate_rot: The rotation of the gate in [rad].
+        gate: The [x, height, z, rotation] of the gate in [m, m, m, rad].
+
+    Returns:
+        A list of dictionaries holding the XODE insertBody() arguments of
+        each gate body.
     """
+    gate_pos = np.array([gate[0], gate[2]])
+    gate_height = gate[1]
+    gate_rot = gate[3]
+
     # Define the width of the gate entry point
     gate_width = constants.G_GATE_WIDTH
 
@@ -182,6 +274,8 @@ def _build_gate(xode, num, top_table, gate_height, gate_pos, gate_rot):
 
     gate_name = 'gate' + str(num)
 
+    bodies = []
+
     marker_radius = constants.G_GATE_POST_RADIUS
     marker_size = [marker_radius]
     marker_mass = 0.5
@@ -194,23 +288,21 @@ def _build_gate(xode, num, top_table, gate_height, gate_pos, gate_rot):
     ])
 
     # Build the two markers on either side of the gate
-    marker1_name = gate_name + '_marker1'
     marker1_pos = gate_full_pos + marker_offset
 
-    xode.insertBody(bname=marker1_name, shape='sphere',
+    bodies.append(dict(bname=gate_name + '_marker1', shape='sphere',
             size=marker_size, density=0.0, pos=marker1_pos,
             passSet=['test_article'], euler=marker_eul, mass=marker_mass,
             color=(1.0, 1.0, 1.0, 1.0)
-    )
+    ))
 
-    marker2_name = gate_name + '_marker2'
     marker2_pos = gate_full_pos - marker_offset
 
-    xode.insertBody(bname=marker2_name, shape='sphere',
+    bodies.append(dict(bname=gate_name + '_marker2', shape='sphere',
             size=marker_size, density=0.0, pos=marker2_pos,
             passSet=['test_article'], euler=marker_eul, mass=marker_mass,
             color=(1.0, 1.0, 1.0, 1.0)
-    )
+    ))
 
     # Build the stands which hold the markers
     stand_size = np.array([
@@ -221,24 +313,21 @@ def _build_gate(xode, num, top_table, gate_height, gate_pos, gate_rot):
     stand_mass = 2.0
     stand_eul = np.array([90.0, 0.0, 0.0])
 
-    stand1_name = gate_name + '_stand1'
     stand1_pos = marker1_pos - np.array([0.0, stand_size[1]/2.0, 0.0])
 
-    xode.insertBody(bname=stand1_name, shape='cylinder',
+    bodies.append(dict(bname=gate_name + '_stand1', shape='cylinder',
             size=stand_size, density=0.0, pos=stand1_pos,
             passSet=['test_article'], euler=stand_eul, mass=stand_mass
-    )
+    ))
 
-    stand2_name = gate_name + '_stand2'
     stand2_pos = marker2_pos - np.array([0.0, stand_size[1]/2.0, 0.0])
 
-    xode.insertBody(bname=stand2_name, shape='cylinder',
+    bodies.append(dict(bname=gate_name + '_stand2', shape='cylinder',
             size=stand_size, density=0.0, pos=stand2_pos,
             passSet=['test_article'], euler=stand_eul, mass=stand_mass
-    )
+    ))
 
     # Build the cross support
-    support_name = gate_name + '_support'
     support_mass = 2.0
 
     support_size = np.array([
@@ -252,13 +341,12 @@ def _build_gate(xode, num, top_table, gate_height, gate_pos, gate_rot):
 
     support_eul = np.array([0.0, gate_rot*180/np.pi, 0.0])
 
-    xode.insertBody(bname=support_name, shape='box',
+    bodies.append(dict(bname=gate_name + '_support', shape='box',
             size=support_size, density=0.0, pos=support_pos,
             passSet=['test_article'], euler=support_eul, mass=support_mass
-    )
+    ))
 
     # Build the base for the gate
-    base_name = gate_name + '_base'
     base_mass = 3.0 # [g]
 
     base_size = np.array([
@@ -274,12 +362,11 @@ def _build_gate(xode, num, top_table, gate_height, gate_pos, gate_rot):
 
     base_eul = np.array([90.0, 0.0, 0.0])
 
-    xode.insertBody(bname=base_name, shape='cylinder',
+    bodies.append(dict(bname=gate_name + '_base', shape='cylinder',
             size=base_size, density=0.0, pos=base_pos,
             passSet=['test_article'], euler=base_eul, mass=base_mass
-    )
+    ))
 
-    hitbox_name = gate_name
     hitbox_mass = 0.5 # [g]
     hitbox_size = np.array([
          gate_width,
@@ -289,11 +376,35 @@ def _build_gate(xode, num, top_table, gate_height, gate_pos, gate_rot):
     hitbox_pos = gate_full_pos - np.array([0.0, stand_size[1]/2.0, 0.0])
     hitbox_eul = np.array([0.0, gate_rot*180/np.pi, 0.0])
 
-    xode.insertBody(bname=hitbox_name, shape='box',
+    bodies.append(dict(bname=gate_name, shape='box',
             size=hitbox_size, density=0.0, pos=hitbox_pos,
             passSet=['end_effector', 'test_article'], euler=hitbox_eul,
             mass=hitbox_mass, invisible=True
-    )
+    ))
+
+    return bodies
+
+
+def _build_gate(xode, num, top_table, gate):
+    """Build Gate
+
+    Arguments:
+        num: The gate number to be appended to the name.
+        top_table: The top of the table y position in [m].
+        gate: The [x, height, z, rotation] of the gate in [m, m, m, rad].
+    """
+    for body in calc_gate_bodies(num, top_table, gate):
+        xode.insertBody(**body)
+
+    gate_name = 'gate' + str(num)
+
+    hitbox_name = gate_name
+    support_name = gate_name + '_support'
+    base_name = gate_name + '_base'
+    stand1_name = gate_name + '_stand1'
+    stand2_name = gate_name + '_stand2'
+    marker1_name = gate_name + '_marker1'
+    marker2_name = gate_name + '_marker2'
 
     # Create fixed joints between all parts of the gate. This makes it
     # a single body
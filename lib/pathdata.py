@@ -0,0 +1,335 @@
+#!/usr/bin/env python
+
+"""Path Data module
+
+Gives named access to the columns of path data. A path is held in a single
+contiguous array in the column layout of the training data constants, so
+it is stored, loaded, and trained on exactly as before.
+
+Author:
+    Evan Sneath - evansneath@gmail.com
+
+License:
+    Open Software License v3.0
+
+Classes:
+    Path: A path data array with named views of its columns.
+    PathRecorder: Records path samples into a preallocated buffer.
+"""
+
+import numpy as np
+
+import surgicalsim.lib.constants as constants
+import surgicalsim.lib.datastore as datastore
+
+
+class Path(object):
+    """Path class
+
+    Holds path data in one contiguous array and exposes each group of
+    columns as a view. The views are created once and share memory with
+    the array, so reading or assigning a view (with a single index, a
+    slice, or an index array) reads or writes the path data directly.
+
+    Attributes:
+        data: The numpy array of size (T, columns) of path data.
+        time: The view of size (T) of the time of each sample.
+        gates: The view of size (T, G_NUM_GATES, G_NUM_GATE_DIMS) of the
+            position and orientation of each gate.
+        gate_pos: The view of size (T, G_NUM_GATES, 3) of the position of
+            each gate.
+        tooltip: The view of size (T, G_NUM_POS_DIMS) of the tooltip
+            position.
+        rating: The view of size (T) of the segment rating of each sample.
+            None if the path has no rating column.
+
+    Methods:
+        empty: Returns a new zeroed path of a given length.
+        load: Returns the path stored in a file.
+        store: Writes the path data to a file.
+        set_samples: Sets any of the columns of a set of samples.
+        copy: Returns a path with a copy of the path data.
+    """
+    def __init__(self, data):
+        """Initialize
+
+        Wraps path data. The data is only copied if it is not already a
+        contiguous float array.
+
+        Arguments:
+            data: The numpy array of size (T, columns) of path data, with
+                or without the rating column.
+        """
+        super(Path, self).__init__()
+
+        data = np.ascontiguousarray(data, dtype=float)
+
+        if data.ndim != 2 or data.shape[1] < constants.G_RATING_IDX:
+            raise ValueError('Path data must have at least %d columns' %
+                    constants.G_RATING_IDX)
+
+        self.data = data
+
+        gate_start_idx = constants.G_GATE_IDX
+        gate_end_idx = gate_start_idx + constants.G_NUM_GATE_INPUTS
+
+        pos_start_idx = constants.G_POS_IDX
+        pos_end_idx = pos_start_idx + constants.G_NUM_POS_DIMS
+
+        self.time = data[:,constants.G_TIME_IDX]
+
+        # The gate columns are adjacent within each row, so they are split
+        # into gates without a copy
+        self.gates = data[:,gate_start_idx:gate_end_idx].reshape(
+                len(data), constants.G_NUM_GATES, constants.G_NUM_GATE_DIMS)
+        self.gate_pos = self.gates[:,:,:constants.G_NUM_POS_DIMS]
+
+        self.tooltip = data[:,pos_start_idx:pos_end_idx]
+
+        if data.shape[1] > constants.G_RATING_IDX:
+            self.rating = data[:,constants.G_RATING_IDX]
+        else:
+            self.rating = None
+
+        return
+
+    @classmethod
+    def empty(cls, num_samples, rating=True):
+        """Empty
+
+        Creates a new path of zeros.
+
+        Arguments:
+            num_samples: The number of samples of the path.
+            rating: Determines if the path has a rating column.
+                (Default: True)
+
+        Returns:
+            A new Path object.
+        """
+        num_cols = constants.G_TOTAL_COLS
+
+        if not rating:
+            num_cols -= constants.G_TOTAL_NUM_MISC
+
+        return cls(np.zeros((num_samples, num_cols)))
+
+    @classmethod
+    def load(cls, filename):
+        """Load
+
+        Loads the path data stored in a file.
+
+        Arguments:
+            filename: The path data filename.
+
+        Returns:
+            A new Path object.
+        """
+        return cls(datastore.retrieve(filename))
+
+    def store(self, filename):
+        """Store
+
+        Writes the path data to a file.
+
+        Arguments:
+            filename: The path data filename.
+        """
+        datastore.store(self.data, filename)
+
+        return
+
+    def set_samples(self, idx, time=None, gates=None, gate_pos=None,
+            tooltip=None, rating=None):
+        """Set Samples
+
+        Sets any of the columns of a set of samples at once. Each value is
+        broadcast over the selected samples.
+
+        Arguments:
+            idx: A sample index, slice, or index array.
+            time: The sample time. (Default: None)
+            gates: The gate positions and orientations. (Default: None)
+            gate_pos: The gate positions. (Default: None)
+            tooltip: The tooltip position. (Default: None)
+            rating: The segment rating. (Default: None)
+        """
+        if time is not None:
+            self.time[idx] = time
+
+        if gates is not None:
+            self.gates[idx] = gates
+
+        if gate_pos is not None:
+            self.gate_pos[idx] = gate_pos
+
+        if tooltip is not None:
+            self.tooltip[idx] = tooltip
+
+        if rating is not None:
+            if self.rating is None:
+                raise ValueError('Path has no rating column')
+
+            self.rating[idx] = rating
+
+        return
+
+    def copy(self):
+        """Copy
+
+        Returns:
+            A new Path object with a copy of the path data.
+        """
+        return Path(self.data.copy())
+
+    def __len__(self):
+        """Length (len(path))
+
+        Returns:
+            The number of samples of the path.
+        """
+        return len(self.data)
+
+    def __getitem__(self, idx):
+        """Get Item (path[idx])
+
+        Arguments:
+            idx: A slice or index array of samples.
+
+        Returns:
+            A new Path object of the selected samples. A slice shares memory
+            with this path.
+        """
+        data = self.data[idx]
+
+        if data.ndim != 2:
+            raise IndexError('A path must be indexed by a slice or array')
+
+        return Path(data)
+
+
+class PathRecorder(object):
+    """PathRecorder class
+
+    Records path samples one at a time into a preallocated buffer. Each
+    sample is written in place into its row of the buffer, so no array is
+    created per sample. The buffer doubles in size when full.
+
+    New rows are filled from a template sample, so columns which never
+    change (such as the rotations of static gates) are written once.
+
+    Attributes:
+        path: The Path of the whole buffer. Rows past the number of
+            recorded samples are unused.
+        num_samples: The number of recorded samples.
+
+    Methods:
+        next_index: Returns the row index of a new sample.
+        append: Records a copy of a complete sample.
+        get_path: Returns the Path of the recorded samples.
+        clear: Discards all recorded samples.
+    """
+    def __init__(self, template=None, rating=False,
+            capacity=constants.G_RECORDER_CAPACITY):
+        """Initialize
+
+        Creates a new PathRecorder object with an empty buffer.
+
+        Arguments:
+            template: The numpy array of the initial values of each new
+                sample. If None, samples start as zeros. (Default: None)
+            rating: Determines if samples have a rating column. Ignored if
+                a template is given. (Default: False)
+            capacity: The initial number of samples of the buffer.
+                (Default: G_RECORDER_CAPACITY)
+        """
+        super(PathRecorder, self).__init__()
+
+        if template is None:
+            template = Path.empty(1, rating=rating).data[0]
+
+        self._template = np.array(template, dtype=float)
+
+        self.num_samples = 0
+        self.path = self._allocate(max(1, capacity))
+
+        return
+
+    def next_index(self):
+        """Next Index
+
+        Adds a sample to the recording. The sample starts as the template.
+
+        Returns:
+            The row index of the new sample in the path buffer. The index
+            is valid until the next call (the buffer may then grow).
+        """
+        if self.num_samples == len(self.path):
+            path = self._allocate(2 * len(self.path))
+            path.data[:self.num_samples] = self.path.data
+            self.path = path
+
+        idx = self.num_samples
+        self.num_samples += 1
+
+        return idx
+
+    def append(self, sample):
+        """Append
+
+        Records a copy of a complete sample.
+
+        Arguments:
+            sample: The numpy array of the sample values.
+        """
+        self.path.data[self.next_index()] = sample
+
+        return
+
+    def get_path(self):
+        """Get Path
+
+        Returns:
+            The Path of the recorded samples. It shares memory with the
+            buffer until the buffer grows.
+        """
+        return self.path[:self.num_samples]
+
+    def clear(self):
+        """Clear
+
+        Discards all recorded samples. The buffer is kept.
+        """
+        self.path.data[:self.num_samples] = self._template
+        self.num_samples = 0
+
+        return
+
+    def __len__(self):
+        """Length (len(recorder))
+
+        Returns:
+            The number of samples recorded.
+        """
+        return self.num_samples
+
+    def _allocate(self, capacity):
+        """Allocate
+
+        Creates a buffer filled with the template sample.
+
+        Arguments:
+            capacity: The number of samples of the buffer.
+
+        Returns:
+            The Path of the buffer.
+        """
+        data = np.empty((capacity, len(self._template)))
+        data[:] = self._template
+
+        return Path(data)
+
+
+if __name__ == '__main__':
+    pass
@@ -11,14 +11,24 @@ Author:
 License:
     Open Software License v3.0
 
+Classes:
+    PathRenderer: Draws a path and its gates, reusing the plot artists.
+
 Functions:
     display_path: Displays the path and gates of a set of data.
+    render_paths: Renders path files to image files without a display,
+        in parallel.
     zero_time: Zeroes the time wrt the minimum time value.
     normalize_time: Normalizes the time column of a set of data.
+    resample_path: Resamples a path onto a fixed normalized time grid.
+    resample_paths: Resamples a list of paths into one dense array.
+    load_resampled_paths: Loads and resamples all paths in a directory.
     trim_path: Provides a user prompt wizard for trimming the start and end
         sets of data.
+    auto_trim_path: Trims the idle start and end of a path without a prompt.
     list_data_files: Provides a list of all .dat files present in a given
         directory.
+    detect_segments: Returns the segment end index of each gate of a path.
     fix_starting_pos: Snaps the starting path position to the first marker.
     get_path_time: Return the time at a specific time step index.
     set_path_time: Sets the time at a specific time step index.
@@ -26,11 +36,30 @@ Functions:
     set_path_tooltip_pos: Sets the tooltip position at a specific time step.
     get_path_gate_pos: Return the position of a gate at a specific time step.
     set_path_gate_pos: Sets the position of a gate at a specific time step.
+    correct_step: Returns the next acceleration limited step of a path
+        corrected for gate motion.
+    correct_path: Corrects a whole path for a gate motion trajectory.
+    evaluate_tracking: Returns the tracking error of a corrected path and
+        its summary.
+    get_segment_indices: Returns the current segment of each step of a
+        path.
+    calc_path_derivatives: Returns the velocity, acceleration, and jerk norms
+        of a path or a batch of paths.
+    analyze_paths: Returns the kinematic summary of each of a set of paths.
+    calc_closest_approaches: Returns the closest approach of each path to
+        each gate.
+    evaluate_accuracy: Returns the closest approaches and their summary for
+        a set of path files, evaluated in parallel.
     split_segments: Returns a list of segment end-points given a full path.
     rate_segments: Prompts for segment ratings and plots segments.
+    score_segments: Returns automatic ratings of each segment of a path.
+    load_ratings: Loads the segment ratings of a ratings file.
+    apply_ratings: Adds given segment ratings to a path.
 """
 
 import os
+import glob
+import multiprocessing
 
 import numpy as np
 import matplotlib.pyplot as plt
@@ -38,6 +67,8 @@ import matplotlib.pyplot as plt
 from scipy.spatial.distance import cdist
 from mpl_toolkits.mplot3d import Axes3D
 from matplotlib.widgets import Slider, Button
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 
 import surgicalsim.lib.constants as constants
 import surgicalsim.lib.datastore as datastore
@@ -61,84 +92,348 @@ def display_path(axis, path, dotted_paths=[], title='End Effector Path', label_a
         dotted_paths: A list of time sequence arrays to display in dotted red.
             (Default: [])
         title: The title of the plot. (Default: 'End Effector Path')
+
+    Returns:
+        The PathRenderer drawing the path. Further paths are drawn quickly
+        on the same axis with its update() method.
     """
     assert len(path) > 0
 
     axis.clear()
-    
-    if title:
-        axis.set_title(title, fontsize=25)
 
-    if label_axes:
-        axis.set_xlabel('Position X Axis [m]', fontsize=20)
-        axis.set_ylabel('Position Z Axis [m]', fontsize=20)
+    renderer = PathRenderer(axis, title=title, label_axes=label_axes,
+            two_dimensional=two_dimensional)
 
-        if not two_dimensional:
-            axis.set_zlabel('Position Y Axis [m]', fontsize=20)
+    renderer.update(path, dotted_paths)
+
+    return renderer
+
+
+def render_paths(filenames, out_dir=None, fmt='png', title=None,
+        label_axes=True, two_dimensional=False, force=False, processes=None):
+    """Render Paths
+
+    Renders the plot of each path file to an image file. Figures are drawn
+    on an Agg canvas rather than through pyplot, so no display is needed
+    and the interactive backend is never touched. Files are rendered in
+    parallel worker processes. A file whose image is newer than the file
+    itself is skipped.
+
+    Arguments:
+        filenames: A list of path data filenames or glob patterns.
+        out_dir: The directory of the image files. If None, each image is
+            written beside its path file. (Default: None)
+        fmt: The image format, one of G_PLOT_FORMATS. (Default: 'png')
+        title: The title of every plot. If None, the basename of each path
+            file is used. (Default: None)
+        label_axes: Determines if the axes are labelled. (Default: True)
+        two_dimensional: If True, the (x, z) projection of each path is
+            drawn. (Default: False)
+        force: If True, up to date images are rendered again.
+            (Default: False)
+        processes: The number of worker processes. If None, one per CPU is
+            used. If 1, files are rendered in this process. (Default: None)
+
+    Returns:
+        A tuple of the list of image filenames written and the list of
+        image filenames skipped as up to date.
+    """
+    if fmt not in constants.G_PLOT_FORMATS:
+        raise ValueError('Unknown image format: %s' % fmt)
 
-    if not two_dimensional:
-        axis.set_xlim3d((-0.3, 0.3))
-        axis.set_ylim3d((-0.3, 0.3))
-        axis.set_zlim3d((0.0, 0.2))
+    # Patterns are expanded here as well as by the shell, so quoted globs
+    # over more files than the argument list allows also work
+    expanded = []
 
-    axis.grid(True)
+    for filename in filenames:
+        matches = sorted(glob.glob(filename))
+        expanded.extend(matches if matches else [filename])
 
-    # Split the data into more managable input and output arrays
-    path_in, path_out = datastore.split_data(path, constants.G_TOTAL_NUM_INPUTS)
+    if out_dir is not None and not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
 
-    # Print the main tooltip path
+    jobs = []
+    skipped = []
 
-    if not two_dimensional:
-        axis.plot(path_out[:,0], path_out[:,1], -path_out[:,2], 'b-', zdir='y')
+    for filename in expanded:
+        basename = os.path.splitext(os.path.basename(filename))[0]
+        image_dir = out_dir
+
+        if image_dir is None:
+            image_dir = os.path.dirname(filename)
+
+        image_filename = os.path.join(image_dir, basename + '.' + fmt)
+
+        if not force and os.path.exists(image_filename) and \
+                os.path.getmtime(image_filename) >= \
+                os.path.getmtime(filename):
+            skipped.append(image_filename)
+            continue
+
+        plot_title = title if title is not None else basename
+
+        jobs.append((filename, image_filename, plot_title, label_axes,
+                two_dimensional))
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+
+    processes = max(1, min(processes, len(jobs)))
+
+    if processes == 1:
+        written = [_render_path_file(job) for job in jobs]
     else:
-        axis.plot(path_out[:,0], -path_out[:,2], 'b-')
+        pool = multiprocessing.Pool(processes)
 
-    # Print the starting gate positions
-    for gate in range(constants.G_NUM_GATES):
-        start = constants.G_GATE_IDX + (gate * constants.G_NUM_GATE_DIMS)
-        end = start + constants.G_NUM_POS_DIMS
+        try:
+            written = pool.map(_render_path_file, jobs, 1)
+        finally:
+            pool.close()
+            pool.join()
 
-        gate_pos = path_in[0,start:end]
+    return written, skipped
 
-        if not two_dimensional:
-            axis.plot([gate_pos[0]], [gate_pos[1]], [-gate_pos[2]], color='black',
-                    marker='o', zdir='y', markersize=5)
-        else:
-            axis.plot([gate_pos[0]], [-gate_pos[2]], color='black',
-                    marker='o', markersize=5)
 
-    # Print the gate positions at point of closest approach
-    segments = _detect_segments(path)
-    for seg_idx, seg_end in enumerate(segments):
-        start = constants.G_GATE_IDX + (seg_idx * constants.G_NUM_GATE_DIMS)
-        end = start + constants.G_NUM_POS_DIMS
+def _render_path_file(job):
+    """Render Path File
+
+    Worker of render_paths(). Loads a path file and saves its plot.
+
+    Arguments:
+        job: A tuple of (path filename, image filename, title, label_axes,
+            two_dimensional).
+
+    Returns:
+        The image filename.
+    """
+    filename, image_filename, title, label_axes, two_dimensional = job
+
+    path = datastore.retrieve(filename)
+
+    fig = Figure(figsize=constants.G_PLOT_FIGURE_SIZE, facecolor='white')
+    canvas = FigureCanvasAgg(fig)
+
+    if two_dimensional:
+        axis = fig.add_subplot(111)
+    else:
+        axis = fig.add_subplot(111, projection='3d')
+
+    display_path(axis, path, title=title, label_axes=label_axes,
+            two_dimensional=two_dimensional)
+
+    # The image format is given by the filename extension
+    canvas.print_figure(image_filename, dpi=constants.G_PLOT_DPI,
+            facecolor='white')
+
+    return image_filename
+
+
+class PathRenderer(object):
+    """PathRenderer class
 
-        gate_pos = path_in[seg_end,start:end] 
+    Draws a path, its starting gate positions, and its gate positions at
+    the point of closest approach. The plot artists are created once and
+    only their data is replaced by each update, so paths can be redrawn
+    interactively. Long paths are downsampled for display.
+
+    Methods:
+        update: Draws a new path on the axis.
+    """
+    def __init__(self, axis, title='End Effector Path', label_axes=True,
+            two_dimensional=False, max_points=constants.G_PLOT_MAX_POINTS):
+        """Initialize
+
+        Sets up the axis and creates the plot artists.
+
+        Arguments:
+            axis: The matplotlib axis to draw on (3d unless two_dimensional).
+            title: The title of the plot. (Default: 'End Effector Path')
+            label_axes: Determines if the axes are labelled. (Default: True)
+            two_dimensional: If True, the (x, z) projection of the path is
+                drawn. (Default: False)
+            max_points: The most points drawn of each path.
+                (Default: G_PLOT_MAX_POINTS)
+        """
+        super(PathRenderer, self).__init__()
+
+        self._axis = axis
+        self._two_dimensional = two_dimensional
+        self._max_points = max_points
+
+        if title:
+            axis.set_title(title, fontsize=25)
+
+        if label_axes:
+            axis.set_xlabel('Position X Axis [m]', fontsize=20)
+            axis.set_ylabel('Position Z Axis [m]', fontsize=20)
+
+            if not two_dimensional:
+                axis.set_zlabel('Position Y Axis [m]', fontsize=20)
 
         if not two_dimensional:
-            axis.plot([gate_pos[0]], [gate_pos[1]], [-gate_pos[2]], color='red',
-                    marker='o', zdir='y', markersize=5)
+            axis.set_xlim3d((-0.3, 0.3))
+            axis.set_ylim3d((-0.3, 0.3))
+            axis.set_zlim3d((0.0, 0.2))
+
+        axis.grid(True)
+
+        self._path_line = self._create_line('b-')
+
+        # One artist holds the markers of every gate
+        self._start_gates = self._create_line(color='black', marker='o',
+                linestyle='None', markersize=5)
+        self._closest_gates = self._create_line(color='red', marker='o',
+                linestyle='None', markersize=5)
+
+        # Dotted path lines are created as needed and reused
+        self._dotted_lines = []
+
+        # The segments of the most recently drawn paths
+        self._segment_cache = {}
+
+        return
+
+    def update(self, path, dotted_paths=[]):
+        """Update
+
+        Draws a new path (and any dotted paths) in place of the previous
+        paths.
+
+        Arguments:
+            path: The time sequence array of the path to maintain.
+            dotted_paths: A list of time sequence arrays to display in dotted
+                red. (Default: [])
+        """
+        pos_start_idx = constants.G_POS_IDX
+        pos_end_idx = pos_start_idx + constants.G_NUM_POS_DIMS
+
+        self._set_line_data(self._path_line,
+                self._downsample(path[:,pos_start_idx:pos_end_idx]))
+
+        gate_cols = _get_gate_pos_cols()
+
+        # The starting gate positions
+        self._set_line_data(self._start_gates, path[0,gate_cols])
+
+        # The gate positions at the point of closest approach
+        segments = self._get_segments(path)
+
+        self._set_line_data(self._closest_gates,
+                path[np.array(segments)[:, np.newaxis], gate_cols])
+
+        dotted_paths = [dotted_path for dotted_path in dotted_paths
+                if dotted_path is not None and len(dotted_path) > 0]
+
+        while len(self._dotted_lines) < len(dotted_paths):
+            self._dotted_lines.append(self._create_line('r--'))
+
+        for idx, line in enumerate(self._dotted_lines):
+            if idx < len(dotted_paths):
+                self._set_line_data(line, self._downsample(
+                        dotted_paths[idx][:,pos_start_idx:pos_end_idx]))
+                line.set_visible(True)
+            else:
+                line.set_visible(False)
+
+        if self._two_dimensional:
+            self._axis.relim()
+            self._axis.autoscale_view()
+
+        return
+
+    def _create_line(self, *args, **kwargs):
+        """Create Line
+
+        Creates an empty line on the axis.
+
+        Returns:
+            The matplotlib line artist.
+        """
+        if self._two_dimensional:
+            line, = self._axis.plot([], [], *args, **kwargs)
         else:
-            axis.plot([gate_pos[0]], [-gate_pos[2]], color='red',
-                    marker='o', markersize=5)
+            line, = self._axis.plot([], [], [], *args, zdir='y', **kwargs)
 
+        return line
 
-    # Print any other paths
-    for dotted_path in dotted_paths:
-        if dotted_path is None or len(dotted_path) == 0:
-            continue
+    def _set_line_data(self, line, pos):
+        """Set Line Data
 
-        _, dotted_path_out = datastore.split_data(dotted_path,
-                constants.G_TOTAL_NUM_INPUTS)
+        Replaces the data of a line with a set of tooltip or gate positions.
 
-        if not two_dimensional:
-            axis.plot(dotted_path_out[:,0], dotted_path_out[:,1], -dotted_path_out[:,2],
-                    'r--', zdir='y')
+        Arguments:
+            line: The matplotlib line artist.
+            pos: A numpy array of size (N, 3) of (x, y, z) positions.
+        """
+        if self._two_dimensional:
+            line.set_data(pos[:,0], -pos[:,2])
         else:
-            axis.plot(dotted_path_out[:,0], -dotted_path_out[:,2],
-                    'r--', zdir='y')
-       
-    return
+            line.set_data(pos[:,0], pos[:,1])
+            line.set_3d_properties(-pos[:,2], zdir='y')
+
+        return
+
+    def _downsample(self, pos):
+        """Downsample
+
+        Evenly reduces the positions to at most the maximum number of points.
+        The last position is always kept.
+
+        Arguments:
+            pos: A numpy array of size (N, 3) of positions.
+
+        Returns:
+            A numpy array of the kept positions.
+        """
+        if len(pos) <= self._max_points:
+            return pos
+
+        stride = int(np.ceil(len(pos) / float(self._max_points - 1)))
+
+        return np.vstack((pos[::stride], pos[-1:]))
+
+    def _get_segments(self, path):
+        """Get Segments
+
+        Detects the segments of a path. The segments of recently drawn paths
+        are cached by their data location and length, so redrawing the same
+        path does not detect them again.
+
+        A cached entry keeps a copy of the data the segments are detected
+        from, and is only used while the path still holds the same data.
+        Another path may be allocated at the location of a freed path, or a
+        path may be edited in place.
+
+        Arguments:
+            path: The path data.
+
+        Returns:
+            A list of segment end indices for each gate.
+        """
+        pos_start_idx = constants.G_POS_IDX
+        pos_end_idx = pos_start_idx + constants.G_NUM_POS_DIMS
+
+        # The segments depend on the tooltip positions and the starting
+        # gate positions only
+        pos = path[:,pos_start_idx:pos_end_idx]
+
+        key = (path.__array_interface__['data'][0], path.shape,
+                path.strides)
+
+        entry = self._segment_cache.get(key)
+
+        if entry is not None and np.array_equal(entry[0], path[0]) and \
+                np.array_equal(entry[1], pos):
+            return entry[2]
+
+        # Only a few recent paths are kept
+        if len(self._segment_cache) >= 16:
+            self._segment_cache.clear()
+
+        segments = detect_segments(path)
+        self._segment_cache[key] = (path[0].copy(), pos.copy(), segments)
+
+        return segments
 
 
 def zero_time(data, t_col=0):
@@ -177,6 +472,115 @@ def normalize_time(data, t_col=0):
     return data
 
 
+def resample_path(data, num_samples, t_col=0):
+    """Resample Path
+
+    Linearly interpolates every column of a path onto num_samples evenly
+    spaced points of normalized time (0.0 to 1.0). The rating column, if
+    present, holds the rating of the preceding sample instead.
+
+    Arguments:
+        data: The path data.
+        num_samples: The number of samples of the resampled path.
+        t_col: The column index of the time step data. (Default: 0)
+
+    Returns:
+        Numpy data array of size (num_samples, columns) with the time column
+        normalized.
+    """
+    out = np.empty((num_samples, data.shape[1]))
+    _resample_into(data, out, t_col)
+
+    return out
+
+
+def resample_paths(paths, num_samples, t_col=0):
+    """Resample Paths
+
+    Resamples paths of any length onto the same normalized time grid, so
+    they can be batched, averaged, or compared sample by sample.
+
+    Arguments:
+        paths: A list of path data arrays with the same columns.
+        num_samples: The number of samples of each resampled path.
+        t_col: The column index of the time step data. (Default: 0)
+
+    Returns:
+        Numpy data array of size (N, num_samples, columns).
+    """
+    out = np.empty((len(paths), num_samples, paths[0].shape[1]))
+
+    for path, path_out in zip(paths, out):
+        _resample_into(path, path_out, t_col)
+
+    return out
+
+
+def load_resampled_paths(dir, num_samples, t_col=0):
+    """Load Resampled Paths
+
+    Loads every .dat path file of a directory and resamples them onto the
+    same normalized time grid.
+
+    Arguments:
+        dir: A string denoting a directory to search.
+        num_samples: The number of samples of each resampled path.
+        t_col: The column index of the time step data. (Default: 0)
+
+    Returns:
+        A tuple of the sorted list of filenames and the numpy data array of
+        size (N, num_samples, columns).
+    """
+    filenames = sorted(list_data_files(dir))
+    paths = [datastore.retrieve(filename) for filename in filenames]
+
+    return filenames, resample_paths(paths, num_samples, t_col)
+
+
+def _resample_into(data, out, t_col):
+    """Resample Into
+
+    Resamples a path onto the normalized time grid of the output array. All
+    columns are interpolated at once.
+
+    Arguments:
+        data: The path data.
+        out: The output array of size (num_samples, columns).
+        t_col: The column index of the time step data.
+    """
+    t = data[:,t_col]
+    t_span = t[-1] - t[0]
+
+    if t_span > 0.0:
+        t = (t - t[0]) / t_span
+    else:
+        t = np.zeros(len(t))
+
+    t_new = np.linspace(0.0, 1.0, len(out))
+
+    # The sample preceding each new time and the weight of the next sample
+    idx = np.searchsorted(t, t_new, side='right') - 1
+    idx = np.clip(idx, 0, max(len(t) - 2, 0))
+    idx_next = np.minimum(idx + 1, len(t) - 1)
+
+    dt = t[idx_next] - t[idx]
+    weight = np.zeros(len(t_new))
+    np.divide(t_new - t[idx], dt, out=weight, where=dt > 0.0)
+    np.clip(weight, 0.0, 1.0, out=weight)
+
+    weight = weight[:, np.newaxis]
+    out[:] = data[idx] * (1.0 - weight) + data[idx_next] * weight
+
+    # Ratings are not interpolated
+    if data.shape[1] > constants.G_RATING_IDX:
+        held = np.where(weight[:,0] < 1.0, idx, idx_next)
+        out[:,constants.G_RATING_IDX:] = data[held,constants.G_RATING_IDX:]
+
+    out[:,t_col] = t_new
+
+    return
+
+
 def trim_path(path):
     """Trim Path
 
@@ -201,6 +605,18 @@ def trim_path(path):
 
     plt.subplots_adjust(bottom=0.2)
 
+    # The plot artists are created once and updated by each slider event
+    renderer = PathRenderer(axis, title='Trim Path')
+
+    def redraw():
+        renderer.update(
+            path[__g_start_trim_index:__g_end_trim_index],
+            dotted_paths=[path[:__g_start_trim_index], path[__g_end_trim_index:]]
+        )
+
+        fig.canvas.draw_idle()
+        return
+
     slider_start_axis = plt.axes([0.15, 0.06, 0.6, 0.03], axisbg='w')
     slider_start = Slider(slider_start_axis, 'Start', valmin=0,
             valmax=len(path), valfmt='%d', valinit=0, closedmax=False,
@@ -212,14 +628,7 @@ def trim_path(path):
 
         __g_start_trim_index = int(round(val))
 
-        display_path(
-            axis,
-            path[__g_start_trim_index:__g_end_trim_index],
-            dotted_paths=[path[:__g_start_trim_index], path[__g_end_trim_index:]],
-            title='Trim Path'
-        )
-
-        plt.draw()
+        redraw()
         return
 
     slider_start.on_changed(start_changed)
@@ -237,14 +646,7 @@ def trim_path(path):
 
         __g_end_trim_index = int(round(val))
 
-        display_path(
-            axis,
-            path[__g_start_trim_index:__g_end_trim_index],
-            dotted_paths=[path[:__g_start_trim_index], path[__g_end_trim_index:]],
-            title='Trim Path'
-        )
-
-        plt.draw()
+        redraw()
         return
 
     slider_end.on_changed(end_changed)
@@ -261,7 +663,7 @@ def trim_path(path):
     button_ok.on_clicked(button_clicked)
 
     # Show the path initially
-    display_path(axis, path, title='Trim Path')
+    renderer.update(path)
 
     plt.show()
 
@@ -271,6 +673,48 @@ def trim_path(path):
     return path
 
 
+def auto_trim_path(path, velocity=constants.G_TRIM_VELOCITY,
+        margin=constants.G_TRIM_MARGIN):
+    """Auto Trim Path
+
+    Trims the idle lead-in and lead-out of a path without prompting. The
+    path is kept from the first to the last sample at which the tooltip
+    moves faster than the velocity threshold, plus a margin of idle time at
+    either end.
+
+    Arguments:
+        path: The full path input/output numpy array.
+        velocity: The tooltip velocity threshold in [m/s].
+            (Default: G_TRIM_VELOCITY)
+        margin: The idle time kept at either end in [s].
+            (Default: G_TRIM_MARGIN)
+
+    Returns:
+        A trimmed path input/output numpy array. The path is returned as is
+        if the tooltip never moves.
+    """
+    if len(path) < 2:
+        return path
+
+    t = path[:,constants.G_TIME_IDX]
+    pos = path[:,constants.G_POS_IDX:constants.G_POS_IDX+constants.G_NUM_POS_DIMS]
+
+    # Repeated time stamps are treated as the shortest possible step
+    dt = np.maximum(np.diff(t), np.finfo(float).eps)
+    speed = np.sqrt(np.sum(np.diff(pos, axis=0) ** 2, axis=1)) / dt
+
+    moving = np.flatnonzero(speed > velocity)
+
+    if not len(moving):
+        return path
+
+    # Step i moves from sample i to sample i+1
+    start_idx = np.searchsorted(t, t[moving[0]] - margin, side='left')
+    end_idx = np.searchsorted(t, t[moving[-1]+1] + margin, side='right')
+
+    return path[start_idx:end_idx]
+
+
 def list_data_files(dir):
     """List Data Files
 
@@ -291,7 +735,7 @@ def list_data_files(dir):
     return dat_files
 
 
-def _detect_segments(data):
+def detect_segments(data):
     """Detect Segments
 
     Using the minimum point from the gate, this function provides a simple way
@@ -304,32 +748,87 @@ def _detect_segments(data):
     Returns:
         A list of segment end indices for each gate.
     """
+    positions, gates = _get_approach_arrays([data])
 
-    segment_ends = []
+    segment_ends = _find_segment_ends(positions, gates, np.array([len(data)]))
 
-    # Detect a segment for each gate
-    for cur_gate in xrange(constants.G_NUM_GATES):
-        # The last segment should contain the end at the last index
-        if cur_gate == constants.G_NUM_GATES - 1:
-            segment_ends.append(data.shape[0]-1)
-            continue
+    return [int(end) for end in segment_ends[0]]
+
+
+def _get_approach_arrays(paths):
+    """Get Approach Arrays
+
+    Gathers the tooltip positions and the starting gate positions of a list
+    of paths into padded arrays.
+
+    Arguments:
+        paths: A list of paths.
+
+    Returns:
+        A tuple of the (N, T, 3) tooltip positions, padded to the longest
+        path with the last position, and the (N, G_NUM_GATES, 3) gate
+        positions at the start of each path.
+    """
+    pos_start_idx = constants.G_POS_IDX
+    pos_end_idx = pos_start_idx + constants.G_NUM_POS_DIMS
+
+    gate_cols = _get_gate_pos_cols()
 
-        cur_gate_pos_start = (constants.G_GATE_IDX +
-                (cur_gate * constants.G_NUM_GATE_DIMS))
-        cur_gate_pos_end = cur_gate_pos_start + constants.G_NUM_GATE_DIMS - 1
+    num_samples = max(len(path) for path in paths)
 
-        # Calculate distance
-        dist = cdist(
-            data[:,constants.G_POS_IDX:constants.G_POS_IDX+constants.G_NUM_POS_DIMS],
-            data[:,cur_gate_pos_start:cur_gate_pos_end],
-            metric='euclidean'
-        )[:,0]
+    positions = np.empty((len(paths), num_samples, constants.G_NUM_POS_DIMS))
+    gates = np.empty((len(paths),) + gate_cols.shape)
 
-        # Find the minimum distance
-        closest_epoch = np.argmin(dist, axis=0)
+    for idx, path in enumerate(paths):
+        positions[idx,:len(path)] = path[:,pos_start_idx:pos_end_idx]
+        positions[idx,len(path):] = path[-1,pos_start_idx:pos_end_idx]
 
-        # Add the closest point to a list
-        segment_ends.append(closest_epoch)
+        gates[idx] = path[0,gate_cols]
+
+    return positions, gates
+
+
+def _get_gate_pos_cols():
+    """Get Gate Position Columns
+
+    Returns:
+        A numpy array of size (G_NUM_GATES, 3) of the path data columns of
+        each gate position.
+    """
+    return (constants.G_GATE_IDX +
+            constants.G_NUM_GATE_DIMS *
+            np.arange(constants.G_NUM_GATES)[:, np.newaxis] +
+            np.arange(constants.G_NUM_POS_DIMS))
+
+
+def _find_segment_ends(positions, gates, lengths):
+    """Find Segment Ends
+
+    Finds the segment end of each gate of each path: the sample closest to
+    the gate position at the start of the path. The last segment ends at
+    the end of the path.
+
+    Arguments:
+        positions: The (N, T, 3) padded tooltip positions.
+        gates: The (N, G_NUM_GATES, 3) starting gate positions.
+        lengths: The (N) number of samples of each path.
+
+    Returns:
+        A numpy array of size (N, G_NUM_GATES) of segment end indices.
+    """
+    # Squared distances by expansion, which avoids the (N, T, gates, 3)
+    # difference array
+    dist = (np.sum(positions * positions, axis=2)[:, :, np.newaxis] -
+            2.0 * np.einsum('ntk,ngk->ntg', positions, gates[:,:-1]) +
+            np.sum(gates[:,:-1] * gates[:,:-1], axis=2)[:, np.newaxis, :])
+
+    # Padding samples never count as closest
+    padding = np.arange(positions.shape[1]) >= lengths[:, np.newaxis]
+    dist[padding] = np.inf
+
+    segment_ends = np.empty(gates.shape[:2], dtype=int)
+    segment_ends[:,:-1] = np.argmin(dist, axis=1)
+    segment_ends[:,-1] = lengths - 1
 
     return segment_ends
 
@@ -428,6 +927,495 @@ def set_path_gate_pos(path, path_idx, seg_idx, pos):
     return
 
 
+def correct_step(x_curr, x_next, x_gate_expected, x_gate_actual, x_offset,
+        v_curr, dt, a_max=constants.G_MAX_ACCEL):
+    """Correct Step
+
+    Steps the tooltip along a path corrected for the motion of the current
+    gate. The tooltip aims for the next path position shifted by the gate
+    displacement, but its acceleration is limited to a_max.
+
+    Arguments:
+        x_curr: The current tooltip position of the uncorrected path.
+        x_next: The next tooltip position of the uncorrected path.
+        x_gate_expected: The gate position of the uncorrected path.
+        x_gate_actual: The actual gate position.
+        x_offset: The offset of the corrected path from the uncorrected path
+            at the current step.
+        v_curr: The current tooltip velocity in [m/s].
+        dt: The time of the step in [s].
+        a_max: The largest tooltip acceleration norm in [m/s^2].
+            (Default: G_MAX_ACCEL)
+
+    Returns:
+        A tuple of the new tooltip position, the new tooltip velocity, and
+        the offset of the corrected path at the next step.
+    """
+    x_curr = x_curr + x_offset
+    x_next = x_next + x_offset
+
+    # Calculate the new position from change to new gate position
+    dx_gate = x_gate_actual - (x_gate_expected + x_offset)
+    x_new = x_next + dx_gate
+
+    # Calculate the new velocity and acceleration
+    v_new = (x_new - x_curr) / dt
+    a_new = (v_new - v_curr) / dt
+
+    # Limit the acceleration vector norm
+    a_new_norm = np.sqrt(np.dot(a_new, a_new))
+
+    if a_new_norm > a_max:
+        a_new = a_new * (a_max / a_new_norm)
+
+    # Calculate the new velocity and position from the limited acceleration
+    v_new = v_curr + a_new * dt
+    x_new = x_curr + v_new * dt
+
+    return x_new, v_new, x_offset + (x_new - x_next)
+
+
+def correct_path(path, gate_positions, dt, a_max=constants.G_MAX_ACCEL,
+        segments=None, out=None):
+    """Correct Path
+
+    Corrects the tooltip path for a whole gate motion trajectory. Gives the
+    same positions as calling correct_step() for each step of the path.
+
+    The gate displacements of every step are found at once. Only the
+    acceleration limit, which depends on the previous step, is iterated.
+
+    Arguments:
+        path: The path data of the uncorrected path.
+        gate_positions: A numpy array of size (T, G_NUM_GATES, 3) of the
+            actual gate positions at each step of the path.
+        dt: The time of each step in [s]. Either a single value or a numpy
+            array of size (T-1).
+        a_max: The largest tooltip acceleration norm in [m/s^2].
+            (Default: G_MAX_ACCEL)
+        segments: The segment end indices of the path. If None, the
+            segments are detected from the path. (Default: None)
+        out: A numpy array of size (T, 3) to hold the corrected positions.
+            If None, a new array is created. (Default: None)
+
+    Returns:
+        A numpy array of size (T, 3) of the corrected tooltip positions.
+        The first position is the start of the uncorrected path.
+    """
+    num_steps = len(path) - 1
+
+    pos_start_idx = constants.G_POS_IDX
+    pos_end_idx = pos_start_idx + constants.G_NUM_POS_DIMS
+
+    x_path = path[:,pos_start_idx:pos_end_idx]
+
+    if out is None:
+        out = np.empty((len(path), constants.G_NUM_POS_DIMS))
+
+    out[0] = x_path[0]
+
+    if num_steps < 1:
+        return out
+
+    dt = np.broadcast_to(np.asarray(dt, dtype=float), (num_steps,))
+
+    # The uncorrected step of the path and the gate displacement, which
+    # together give the aim of each step before its offset
+    dx_path = (x_path[1:] - x_path[:-1]).tolist()
+    dx_gate = _get_gate_displacements(path, gate_positions, num_steps,
+            segments).tolist()
+
+    # The acceleration limit makes each step depend on the one before it.
+    # Python floats are much faster than 3-element arrays for this loop
+    x = [float(v) for v in x_path[0]]
+    v = [0.0, 0.0, 0.0]
+    offset = [0.0, 0.0, 0.0]
+
+    dt_list = dt.tolist()
+
+    for idx in range(num_steps):
+        dt_step = dt_list[idx]
+        step = dx_path[idx]
+        gate = dx_gate[idx]
+
+        # The aim less the current position: the uncorrected step plus the
+        # gate displacement not yet taken up by the offset
+        a = [((step[k] + gate[k] - offset[k]) / dt_step - v[k]) / dt_step
+                for k in range(3)]
+
+        a_norm = (a[0] * a[0] + a[1] * a[1] + a[2] * a[2]) ** 0.5
+
+        if a_norm > a_max:
+            scale = a_max / a_norm
+            a = [a[k] * scale for k in range(3)]
+
+        for k in range(3):
+            v[k] += a[k] * dt_step
+            x[k] += v[k] * dt_step
+            offset[k] += v[k] * dt_step - step[k]
+
+        out[idx+1] = x
+
+    return out
+
+
+def evaluate_tracking(path, tooltip, gate_positions, segments=None):
+    """Evaluate Tracking
+
+    Calculates how far a corrected tooltip is from the uncorrected path
+    shifted by the gate displacement at each step. This is the error of the
+    path correction, including its lag behind moving gates.
+
+    Arguments:
+        path: The path data of the uncorrected path. Must have at least as
+            many samples as the corrected tooltip positions.
+        tooltip: The numpy array of size (T, 3) of the corrected tooltip
+            positions.
+        gate_positions: A numpy array of size (T, G_NUM_GATES, 3) of the
+            actual gate positions at each step.
+        segments: The segment end indices of the path. If None, the
+            segments are detected from the path. (Default: None)
+
+    Returns:
+        A tuple of the numpy array of size (T) of the tracking error at each
+        step in [m], and a dictionary summary:
+            mean: The mean tracking error.
+            rms: The root mean square tracking error.
+            p95: The 95th percentile tracking error.
+            max: The largest tracking error.
+    """
+    num_steps = len(tooltip)
+
+    pos_start_idx = constants.G_POS_IDX
+    pos_end_idx = pos_start_idx + constants.G_NUM_POS_DIMS
+
+    x_target = path[:num_steps,pos_start_idx:pos_end_idx] + \
+            _get_gate_displacements(path, gate_positions, num_steps, segments)
+
+    errors = np.sqrt(np.sum((np.asarray(tooltip) - x_target) ** 2, axis=1))
+
+    if num_steps == 0:
+        return errors, dict((key, 0.0) for key in ('mean', 'rms', 'p95',
+                'max'))
+
+    summary = {
+        'mean': np.mean(errors),
+        'rms': np.sqrt(np.mean(errors ** 2)),
+        'p95': np.percentile(errors, 95.0),
+        'max': np.max(errors),
+    }
+
+    return errors, summary
+
+
+def _get_gate_displacements(path, gate_positions, num_steps, segments=None):
+    """Get Gate Displacements
+
+    Calculates the displacement of the gate of the current segment from its
+    position in the uncorrected path at each step.
+
+    Arguments:
+        path: The path data of the uncorrected path.
+        gate_positions: A numpy array of size (T, G_NUM_GATES, 3) of the
+            actual gate positions at each step.
+        num_steps: The number of steps.
+        segments: The segment end indices of the path. If None, the
+            segments are detected from the path. (Default: None)
+
+    Returns:
+        A numpy array of size (num_steps, 3) of gate displacements in [m].
+    """
+    if segments is None:
+        segments = detect_segments(path)
+
+    segments = np.asarray(segments)
+
+    seg_idx = get_segment_indices(segments, num_steps)
+
+    # The expected gate position is taken from the end of each segment
+    gate_cols = (constants.G_GATE_IDX +
+            constants.G_NUM_GATE_DIMS * seg_idx[:, np.newaxis] +
+            np.arange(constants.G_NUM_POS_DIMS))
+
+    x_gate_expected = path[segments[seg_idx][:, np.newaxis], gate_cols]
+
+    x_gate_actual = np.asarray(gate_positions)[np.arange(num_steps), seg_idx]
+
+    return x_gate_actual - x_gate_expected
+
+
+def get_segment_indices(segments, num_steps):
+    """Get Segment Indices
+
+    Finds the current segment of each step: the first segment which ends at
+    or after the step. The segment ends are the closest approach to each
+    gate, so they are not necessarily in order.
+
+    Arguments:
+        segments: The segment end indices of the path.
+        num_steps: The number of steps.
+
+    Returns:
+        A numpy array of size (num_steps) of segment indices.
+    """
+    segments = np.asarray(segments)
+
+    # The running maximum keeps the segment ends sorted for the search
+    seg_idx = np.searchsorted(np.maximum.accumulate(segments),
+            np.arange(num_steps))
+
+    return np.minimum(seg_idx, len(segments) - 1)
+
+
+def calc_path_derivatives(path, dt=None, from_rest=False):
+    """Calculate Path Derivatives
+
+    Calculates the finite difference velocity, acceleration, and jerk norms
+    of the tooltip along a path, or along every path of a batch.
+
+    Arguments:
+        path: The path data. Either a single path of size (T, columns) or a
+            batch of equal length paths of size (N, T, columns).
+        dt: The time of each step in [s]. If None, the time column of the
+            path is used. (Default: None)
+        from_rest: If True, the tooltip is at rest before the path starts,
+            which adds an acceleration from rest to the first velocity.
+            (Default: False)
+
+    Returns:
+        A tuple of numpy arrays of the velocity, acceleration, and jerk norms
+        along the last axis of the path. For a path of T samples these hold
+        T-1, T-2, and T-3 values (one more for the acceleration and jerk
+        when starting from rest).
+    """
+    path = np.asarray(path, dtype=float)
+
+    pos_start_idx = constants.G_POS_IDX
+    pos_end_idx = pos_start_idx + constants.G_NUM_POS_DIMS
+
+    pos = path[...,pos_start_idx:pos_end_idx]
+
+    if dt is None:
+        dt = np.diff(path[...,constants.G_TIME_IDX], axis=-1)
+    else:
+        dt = np.asarray(dt, dtype=float)
+
+    # Trailing axis for the position dimensions
+    if dt.ndim:
+        dt = dt[...,np.newaxis]
+
+    vel = np.diff(pos, axis=-2) / dt
+
+    if from_rest:
+        rest = np.zeros(vel.shape[:-2] + (1, vel.shape[-1]))
+        vel_full = np.concatenate((rest, vel), axis=-2)
+        dt_accel = dt
+    else:
+        vel_full = vel
+        dt_accel = dt[...,1:,:] if dt.ndim else dt
+
+    accel = np.diff(vel_full, axis=-2) / dt_accel
+    jerk = np.diff(accel, axis=-2) / \
+            (dt_accel[...,1:,:] if dt_accel.ndim else dt_accel)
+
+    def norm(values):
+        return np.sqrt(np.sum(values * values, axis=-1))
+
+    return norm(vel), norm(accel), norm(jerk)
+
+
+def analyze_paths(paths, dt=None, a_max=constants.G_MAX_ACCEL,
+        from_rest=False):
+    """Analyze Paths
+
+    Calculates a kinematic summary of the tooltip motion along each path.
+    The peak acceleration of a path scales with the inverse square of its
+    duration, so the time scaling which brings a path to the acceleration
+    limit follows from its peak acceleration.
+
+    Arguments:
+        paths: The path data. Either a single path of size (T, columns), a
+            batch of equal length paths of size (N, T, columns), or a list
+            of paths of any length.
+        dt: The time of each step in [s]. If None, the time column of each
+            path is used. (Default: None)
+        a_max: The tooltip acceleration norm limit in [m/s^2].
+            (Default: G_MAX_ACCEL)
+        from_rest: If True, each path starts from rest.
+            (Default: False)
+
+    Returns:
+        A dictionary of numpy arrays with one value per path:
+            length: The path length in [m].
+            duration: The path duration in [s].
+            v_max: The peak velocity norm in [m/s].
+            a_max: The peak acceleration norm in [m/s^2].
+            j_max: The peak jerk norm in [m/s^3].
+            gain: The acceleration gain which brings the peak acceleration
+                to the limit (a_max / peak acceleration).
+            time_scale: The factor by which the duration is scaled to bring
+                the peak acceleration to the limit.
+            min_duration: The shortest duration within the acceleration
+                limit in [s].
+        For a single path, each value is a scalar.
+    """
+    if isinstance(paths, np.ndarray) and paths.ndim <= 3:
+        batches = [paths]
+    else:
+        # Paths of different lengths are analyzed one at a time
+        batches = [np.asarray(path) for path in paths]
+
+    names = ('length', 'duration', 'v_max', 'a_max', 'j_max')
+    results = dict((name, []) for name in names)
+
+    for path in batches:
+        vel, accel, jerk = calc_path_derivatives(path, dt, from_rest)
+
+        if dt is None:
+            t = path[...,constants.G_TIME_IDX]
+            duration = t[...,-1] - t[...,0]
+            step_dt = np.diff(t, axis=-1)
+        else:
+            duration = dt * (path.shape[-2] - 1) * np.ones(path.shape[:-2])
+            step_dt = dt
+
+        results['length'].append(np.sum(vel * step_dt, axis=-1))
+        results['duration'].append(duration)
+        results['v_max'].append(np.max(vel, axis=-1))
+        results['a_max'].append(np.max(accel, axis=-1))
+        results['j_max'].append(np.max(jerk, axis=-1))
+
+    if isinstance(paths, np.ndarray) and paths.ndim <= 3:
+        summary = dict((name, results[name][0]) for name in names)
+    else:
+        summary = dict((name, np.array(results[name])) for name in names)
+
+    with np.errstate(divide='ignore'):
+        summary['gain'] = a_max / summary['a_max']
+
+    summary['time_scale'] = np.sqrt(summary['a_max'] / a_max)
+    summary['min_duration'] = summary['duration'] * summary['time_scale']
+
+    return summary
+
+
+def calc_closest_approaches(paths, lengths=None):
+    """Calculate Closest Approaches
+
+    Calculates the distance of closest approach of the tooltip to each gate,
+    measured at the end of the segment of each gate.
+
+    Arguments:
+        paths: The path data. Either a single path of size (T, columns), a
+            padded batch of paths of size (N, T, columns), or a list of
+            paths of any length.
+        lengths: The number of samples of each path of a padded batch. If
+            None, every sample is used. (Default: None)
+
+    Returns:
+        A numpy array of size (N, G_NUM_GATES) of distances in [m]. For a
+        single path, a numpy array of size (G_NUM_GATES).
+    """
+    single = isinstance(paths, np.ndarray) and paths.ndim == 2
+
+    if single:
+        paths = [paths]
+    elif isinstance(paths, np.ndarray) and lengths is not None:
+        paths = [path[:length] for path, length in zip(paths, lengths)]
+
+    paths = [np.asarray(path) for path in paths]
+
+    lengths = np.array([len(path) for path in paths])
+
+    positions, gates = _get_approach_arrays(paths)
+
+    segment_ends = _find_segment_ends(positions, gates, lengths)
+
+    # The tooltip and gate positions at the end of each segment
+    path_idx = np.arange(len(paths))[:, np.newaxis]
+    x_tooltip = positions[path_idx, segment_ends]
+
+    gate_cols = _get_gate_pos_cols()
+
+    x_gate = np.array([path[ends[:, np.newaxis], gate_cols]
+            for path, ends in zip(paths, segment_ends)])
+
+    distances = np.sqrt(np.sum((x_gate - x_tooltip) ** 2, axis=2))
+
+    if single:
+        return distances[0]
+
+    return distances
+
+
+def evaluate_accuracy(filenames, processes=None):
+    """Evaluate Accuracy
+
+    Calculates the closest approaches of the paths of many files. Files are
+    loaded and evaluated in parallel worker processes.
+
+    Arguments:
+        filenames: A list of path data filenames.
+        processes: The number of worker processes. If None, one per CPU is
+            used. If 1, files are evaluated in this process.
+            (Default: None)
+
+    Returns:
+        A tuple of the numpy array of size (N, G_NUM_GATES) of closest
+        approach distances in [m], and a dictionary summary:
+            gate_mean: The mean distance of each gate.
+            gate_std: The standard deviation of the distance of each gate.
+            gate_max: The largest distance of each gate.
+            path_mean: The mean distance over the gates of each path.
+            mean: The mean distance over all paths and gates.
+    """
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+
+    processes = max(1, min(processes, len(filenames)))
+
+    if processes == 1:
+        distances = [_calc_file_closest_approaches(filename)
+                for filename in filenames]
+    else:
+        pool = multiprocessing.Pool(processes)
+
+        try:
+            chunksize = max(1, len(filenames) // (4 * processes))
+            distances = pool.map(_calc_file_closest_approaches, filenames,
+                    chunksize)
+        finally:
+            pool.close()
+            pool.join()
+
+    distances = np.array(distances).reshape(-1, constants.G_NUM_GATES)
+
+    summary = {
+        'gate_mean': np.mean(distances, axis=0),
+        'gate_std': np.std(distances, axis=0),
+        'gate_max': np.max(distances, axis=0),
+        'path_mean': np.mean(distances, axis=1),
+        'mean': np.mean(distances),
+    }
+
+    return distances, summary
+
+
+def _calc_file_closest_approaches(filename):
+    """Calculate File Closest Approaches
+
+    Worker of evaluate_accuracy(). Loads a path file and calculates its
+    closest approaches.
+
+    Arguments:
+        filename: The path data filename.
+
+    Returns:
+        A numpy array of size (G_NUM_GATES) of distances in [m].
+    """
+    return calc_closest_approaches(datastore.retrieve(filename))
+
+
 def split_segments(data):
     """Split Segments
 
@@ -444,7 +1432,7 @@ def split_segments(data):
 
     # Determine the start and end point for each segment
     segment_start = 0
-    segment_ends = _detect_segments(data)
+    segment_ends = detect_segments(data)
 
     for segment_end in segment_ends:
         # Split and store the data per segment
@@ -472,7 +1460,7 @@ def get_ratings(data):
     ratings = None
 
     # Find all segment ends
-    segment_ends = _detect_segments(data)
+    segment_ends = detect_segments(data)
 
     for segment_end in segment_ends:
         # Get the rating for each segment end
@@ -504,10 +1492,10 @@ def rate_segments(data):
     Returns:
         The path data with user-defined segment ratings added.
     """
-    ratings = None
+    ratings = []
 
     # Get the segment ends for easy rating
-    segment_ends = _detect_segments(data)
+    segment_ends = detect_segments(data)
 
     # The first segment will always start at 0th index
     segment_start = 0
@@ -517,16 +1505,16 @@ def rate_segments(data):
 
     fig.show()
 
-    for idx, segment_end in enumerate(segment_ends):
-        # Clear the axis so new data can be displayed
-        axis.clear()
+    # The plot artists are created once and updated for each segment
+    renderer = PathRenderer(axis, title=None)
 
+    for idx, segment_end in enumerate(segment_ends):
         # Display the current segment
-        display_path(
-            axis,
+        axis.set_title('Segment %d'%(idx+1), fontsize=25)
+
+        renderer.update(
             data[segment_start:segment_end],
-            dotted_paths=[data[:segment_start], data[segment_end:]],
-            title=('Segment %d'%(idx+1))
+            dotted_paths=[data[:segment_start], data[segment_end:]]
         )
 
         # Draw the current segment on the figure
@@ -545,37 +1533,125 @@ def rate_segments(data):
                 print('Invalid input. (1 to 5)')
                 continue
 
-            # Normalize rating between 0.0 and 1.0
-            rating = float(rating)
-            rating = (rating - 1.0) / 4.0
-
-            # Create the rating for each epoch in the segment
-            segment_rating = rating * np.ones((segment_end-segment_start, 1))
-
-            if ratings is None:
-                ratings = segment_rating
-            else:
-                ratings = np.vstack((ratings, segment_rating))
+            ratings.append(rating)
 
             break
 
         # Move next start index to current end index
         segment_start = segment_end
 
-    # Smash the ratings on to the end column of the data matrix
-    data = np.hstack((data, ratings))
+    return apply_ratings(data, ratings, segment_ends)
 
-    return data
 
+def score_segments(data, segment_ends=None):
+    """Score Segments
+
+    Rates each segment of a path without prompting. A segment is rated by
+    the closest approach of the tooltip to its gate: a perfect pass is
+    rated 5 and each G_RATING_DISTANCE_STEP of distance lowers the rating
+    by one, down to 1.
+
+    Arguments:
+        data: The path data from TrainingSim.
+        segment_ends: The segment end indices. If None, the segments are
+            detected. (Default: None)
+
+    Returns:
+        A numpy array of size (G_NUM_GATES) of ratings (1 to 5).
+    """
+    if segment_ends is None:
+        segment_ends = detect_segments(data)
+
+    segment_ends = np.asarray(segment_ends)
+
+    pos_start_idx = constants.G_POS_IDX
+    pos_end_idx = pos_start_idx + constants.G_NUM_POS_DIMS
+
+    # The same distances as calc_closest_approaches()
+    x_tooltip = data[segment_ends,pos_start_idx:pos_end_idx]
+    x_gate = data[segment_ends[:, np.newaxis], _get_gate_pos_cols()]
+
+    distances = np.sqrt(np.sum((x_gate - x_tooltip) ** 2, axis=1))
+
+    ratings = 5 - np.floor(distances / constants.G_RATING_DISTANCE_STEP)
+
+    return np.clip(ratings, 1, 5).astype(int)
+
+
+def load_ratings(filename):
+    """Load Ratings
+
+    Loads the segment ratings of a path from a ratings file. The file holds
+    one rating (1 to 5) per segment, separated by whitespace.
+
+    Arguments:
+        filename: The ratings filename.
+
+    Returns:
+        A numpy array of size (G_NUM_GATES) of ratings (1 to 5).
+    """
+    ratings = np.atleast_1d(np.loadtxt(filename)).astype(int)
+
+    if len(ratings) != constants.G_NUM_GATES:
+        raise ValueError('%s holds %d ratings, expected %d' %
+                (filename, len(ratings), constants.G_NUM_GATES))
+
+    if np.any((ratings < 1) | (ratings > 5)):
+        raise ValueError('%s holds ratings outside of 1 to 5' % filename)
+
+    return ratings
+
+
+def apply_ratings(data, ratings, segment_ends=None):
+    """Apply Ratings
+
+    Adds the rating column to a path given the rating of each segment.
+    Every sample of a segment, up to and including its end index, is given
+    the rating of that segment, so get_ratings() reads back the same
+    ratings when the segment ends are in order. The last segment runs to
+    the end of the path.
+
+    Arguments:
+        data: The path data from TrainingSim.
+        ratings: A list of segment ratings (1 to 5).
+        segment_ends: The segment end indices. If None, the segments are
+            detected. (Default: None)
+
+    Returns:
+        The path data with the segment ratings added.
+    """
+    if segment_ends is None:
+        segment_ends = detect_segments(data)
+
+    # The segment ends are the closest approach to each gate, so they are
+    # not necessarily in order. As for the current segment of each step,
+    # a segment which ends before an earlier segment is given no samples
+    segment_ends = np.maximum.accumulate(segment_ends)
+
+    # The last segment ends at the last sample
+    segment_bounds = np.hstack(([-1], segment_ends[:-1], [len(data)-1]))
+    segment_lengths = np.diff(segment_bounds)
+
+    # Normalize ratings between 0.0 and 1.0
+    ratings = (np.asarray(ratings, dtype=float) - 1.0) / 4.0
+
+    # Create the rating for each epoch in the segment
+    ratings = np.repeat(ratings, segment_lengths)[:, np.newaxis]
+
+    # Smash the ratings on to the end column of the data matrix
+    return np.hstack((data, ratings))
 
 if __name__ == '__main__':
     """Main
 
     If the module is directly called, the given file will be converted to
-    a path dataset and plotted.
+    a path dataset and plotted. With --render, every given file (or quoted
+    glob) is rendered to an image file without a display instead.
 
     Usage:
-        ./pathutils.py [-h] [-t] [-n] [-f] [-i TITLE] [-o OUT] paths [paths ...] 
+        ./pathutils.py [-h] [-t] [-n] [-f] [-i TITLE] [-o OUT] [-d] [-a] [-r]
+                       [-R] [--out-dir OUT_DIR] [--format {png,svg}]
+                       [--force] [-j PROCESSES] paths [paths ...]
     """
     import argparse
 
@@ -608,8 +1684,44 @@ if __name__ == '__main__':
     parser.add_argument('-r', '--ratings',
                         help='print out segment ratings along with the plot',
                         action='store_true')
+    parser.add_argument('-R', '--render',
+                        help='render all paths to image files without a '
+                             'display and exit',
+                        action='store_true')
+    parser.add_argument('--out-dir',
+                        help='directory of rendered images (default: beside '
+                             'each path file)',
+                        action='store',
+                        default=None)
+    parser.add_argument('--format',
+                        help='format of rendered images',
+                        choices=constants.G_PLOT_FORMATS,
+                        default='png')
+    parser.add_argument('--force',
+                        help='render images which are already up to date',
+                        action='store_true')
+    parser.add_argument('-j', '--processes',
+                        help='number of rendering processes (default: one '
+                             'per cpu)',
+                        action='store',
+                        type=int,
+                        default=None)
     args = parser.parse_args()
 
+    if args.render:
+        written, skipped = render_paths(args.paths, out_dir=args.out_dir,
+                fmt=args.format, title=args.title,
+                label_axes=args.label_axes,
+                two_dimensional=args.two_dimensional, force=args.force,
+                processes=args.processes)
+
+        for image_filename in written:
+            print('Rendered %s' % image_filename)
+
+        print('%d rendered, %d up to date' % (len(written), len(skipped)))
+
+        exit()
+
     main_file = args.paths[0]
     main_path = datastore.retrieve(main_file)
 
@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+
+"""Predictor module
+
+Predicts the motion of the gates a short time ahead from their recent
+positions. Each coordinate is modeled as an autoregressive process of its
+velocity between samples, so the model does not depend on where a gate
+rests. The model coefficients are fit online by recursive least squares
+with exponential forgetting.
+
+A sinusoid is predicted exactly by a model of order 2 and a constant
+velocity by a model of order 1. Higher orders follow sums of sinusoids.
+
+The model is exact for evenly spaced samples. Since it is of velocities
+rather than steps, slightly uneven sample times (such as frames of a
+varying number of physics steps) only add small errors.
+
+Author:
+    Evan Sneath - evansneath@gmail.com
+
+License:
+    Open Software License v3.0
+
+Classes:
+    MotionPredictor: Predicts a set of positions from their recent samples.
+
+Functions:
+    predict_trajectory: Returns the online predictions along a trajectory.
+"""
+
+import numpy as np
+
+import surgicalsim.lib.constants as constants
+
+
+class MotionPredictor(object):
+    """MotionPredictor class
+
+    Fits a model of the velocities of each coordinate of a set of positions
+    as the positions are sampled, and predicts the positions a number of
+    sample periods ahead. Until enough samples are taken to fit the model,
+    the latest positions are predicted.
+
+    Attributes:
+        shape: The shape of the array of positions of each sample.
+        order: The number of past velocities of the model.
+        forgetting: The weight of each older velocity in the model fit.
+        num_samples: The number of samples taken since the last reset.
+        coefficients: The numpy array of size (N, order) of the model
+            coefficients of each coordinate. The first coefficient weighs
+            the latest velocity.
+
+    Methods:
+        update: Takes a new sample of the positions.
+        predict: Returns the positions a number of sample periods ahead.
+        reset: Discards all samples and the model fit.
+    """
+    def __init__(self, shape=(constants.G_NUM_GATES,
+            constants.G_NUM_POS_DIMS), order=constants.G_PREDICTOR_ORDER,
+            forgetting=constants.G_PREDICTOR_FORGETTING,
+            covariance=constants.G_PREDICTOR_COVARIANCE):
+        """Initialize
+
+        Arguments:
+            shape: The shape of the array of positions of each sample.
+                (Default: (G_NUM_GATES, G_NUM_POS_DIMS))
+            order: The number of past velocities of the model.
+                (Default: G_PREDICTOR_ORDER)
+            forgetting: The weight of each older velocity in the model fit
+                (0 to 1). (Default: G_PREDICTOR_FORGETTING)
+            covariance: The initial covariance of the model fit.
+                (Default: G_PREDICTOR_COVARIANCE)
+        """
+        super(MotionPredictor, self).__init__()
+
+        if order < 1:
+            raise ValueError('Predictor order must be at least 1')
+
+        if not 0.0 < forgetting <= 1.0:
+            raise ValueError('Predictor forgetting must be in (0, 1]')
+
+        self.shape = tuple(shape)
+        self.order = order
+        self.forgetting = float(forgetting)
+
+        self._covariance = float(covariance)
+        self._size = int(np.prod(self.shape))
+
+        self.reset()
+
+        return
+
+    def reset(self):
+        """Reset
+
+        Discards all samples and the model fit.
+        """
+        self.num_samples = 0
+        self.coefficients = np.zeros((self._size, self.order))
+
+        # The fit covariance of each coordinate
+        self._p = np.tile(np.eye(self.order) * self._covariance,
+                (self._size, 1, 1))
+
+        # The latest position and the latest velocities (newest first) of
+        # each coordinate
+        self._x = np.zeros(self._size)
+        self._vels = np.zeros((self._size, self.order))
+
+        return
+
+    def update(self, positions, dt=1.0):
+        """Update
+
+        Takes a new sample of the positions and updates the model fit with
+        the velocity since the previous sample.
+
+        Arguments:
+            positions: The numpy array of the positions of the sample.
+            dt: The time since the previous sample. (Default: 1.0)
+        """
+        # The sample is copied, so the positions may be updated in place
+        x = np.array(positions, dtype=float).ravel()
+
+        if len(x) != self._size:
+            raise ValueError('Predictor samples must be of shape %s' %
+                    (self.shape,))
+
+        if self.num_samples > 0:
+            if dt <= 0.0:
+                raise ValueError('Predictor sample times must be increasing')
+
+            vel = (x - self._x) / dt
+
+            # The model is fit once a full set of past velocities is known
+            if self.num_samples > self.order:
+                self._fit(self._vels, vel)
+
+            self._vels[:,1:] = self._vels[:,:-1]
+            self._vels[:,0] = vel
+
+        self._x = x
+        self.num_samples += 1
+
+        return
+
+    def predict(self, steps=1, dt=1.0):
+        """Predict
+
+        Arguments:
+            steps: The number of sample periods ahead. (Default: 1)
+            dt: The sample period. (Default: 1.0)
+
+        Returns:
+            The numpy array of the positions predicted steps * dt ahead.
+        """
+        x = self._x.copy()
+
+        if self.num_samples > self.order + 1:
+            past = self._vels.copy()
+
+            for _ in range(steps):
+                vel = np.sum(self.coefficients * past, axis=1)
+
+                past[:,1:] = past[:,:-1]
+                past[:,0] = vel
+
+                x += vel * dt
+
+        return x.reshape(self.shape)
+
+    def _fit(self, past, vel):
+        """Fit
+
+        Updates the recursive least squares fit of each coordinate with an
+        observed velocity.
+
+        Arguments:
+            past: The numpy array of size (N, order) of the velocities
+                before the observed velocity (newest first).
+            vel: The numpy array of size (N) of the observed velocity.
+        """
+        lam = self.forgetting
+        p = self._p
+
+        p_past = np.einsum('nij,nj->ni', p, past)
+        gain = p_past / (lam + np.sum(past * p_past, axis=1))[:,np.newaxis]
+
+        error = vel - np.sum(self.coefficients * past, axis=1)
+        self.coefficients += gain * error[:,np.newaxis]
+
+        p -= gain[:,:,np.newaxis] * p_past[:,np.newaxis,:]
+
+        # Without motion the covariance would grow without bound from the
+        # forgetting. It is only discounted while below its initial size
+        trace = np.trace(p, axis1=1, axis2=2)
+        discount = np.where(trace < self.order * self._covariance,
+                1.0 / lam, 1.0)
+
+        p *= discount[:,np.newaxis,np.newaxis]
+
+        return
+
+
+def predict_trajectory(positions, steps=1, dt=1.0,
+        order=constants.G_PREDICTOR_ORDER,
+        forgetting=constants.G_PREDICTOR_FORGETTING):
+    """Predict Trajectory
+
+    Predicts each sample of a trajectory online, as it would be predicted
+    while the trajectory is sampled. Such as to correct a whole path with
+    predicted gate positions offline.
+
+    Arguments:
+        positions: The numpy array of size (T, ...) of the positions of each
+            sample.
+        steps: The number of sample periods ahead of each prediction.
+            (Default: 1)
+        dt: The time between samples. Either a single value or a numpy
+            array of size (T-1). Each prediction is made over the period
+            after its sample. (Default: 1.0)
+        order: The number of past velocities of the model.
+            (Default: G_PREDICTOR_ORDER)
+        forgetting: The weight of each older velocity in the model fit.
+            (Default: G_PREDICTOR_FORGETTING)
+
+    Returns:
+        The numpy array of size (T, ...) of the positions predicted from
+        each sample and the samples before it.
+    """
+    positions = np.asarray(positions, dtype=float)
+
+    num_periods = max(len(positions) - 1, 1)
+    dt = np.broadcast_to(np.asarray(dt, dtype=float), (num_periods,))
+
+    predictor = MotionPredictor(positions.shape[1:], order=order,
+            forgetting=forgetting)
+
+    predicted = np.empty_like(positions)
+
+    for idx in range(len(positions)):
+        # The last sample is predicted over the last period
+        dt_prev = dt[max(idx - 1, 0)]
+        dt_next = dt[min(idx, num_periods - 1)]
+
+        predictor.update(positions[idx], dt_prev)
+        predicted[idx] = predictor.predict(steps, dt_next)
+
+    return predicted
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+
+"""Profiler module
+
+Records per-phase timings of each frame of the simulation event loops.
+
+Author:
+    Evan Sneath - evansneath@gmail.com
+
+License:
+    Open Software License v3.0
+
+Classes:
+    FrameProfiler: Times the phases of each frame in a fixed-size ring buffer.
+"""
+
+import numpy as np
+
+import surgicalsim.lib.constants as constants
+
+from surgicalsim.lib.clock import monotonic
+
+
+class FrameProfiler(object):
+    """FrameProfiler class
+
+    Times the phases of each simulation frame. A frame is started with
+    start_frame(). Each call to mark() attributes the time since the last
+    mark (or the start of the frame) to the given phase. The frame is
+    committed to the ring buffer with end_frame(). Frames which are started
+    but never ended (paused frames, for instance) are discarded.
+
+    Attributes:
+        phases: A tuple of the phase names timed by the profiler.
+        budget: The frame time budget in [s]. Frames whose work exceeds the
+            budget are counted as overruns.
+        overruns: The number of frames which exceeded the budget.
+        num_frames: The total number of frames committed.
+
+    Methods:
+        start_frame: Starts timing a new frame.
+        mark: Attributes the time since the last mark to a phase.
+        end_frame: Commits the current frame to the ring buffer.
+        get_timings: Returns the buffered frame timings.
+        summary: Returns percentiles of the buffered timings for each phase.
+        report: Returns a printable summary of the buffered timings.
+        dump: Writes the buffered timings to a file.
+    """
+    def __init__(self, budget, phases=constants.G_PROFILER_PHASES,
+            idle_phases=constants.G_PROFILER_IDLE_PHASES,
+            capacity=constants.G_PROFILER_CAPACITY):
+        """Initialize
+
+        Creates a new FrameProfiler object with an empty ring buffer.
+
+        Arguments:
+            budget: The frame time budget in [s].
+            phases: The names of the phases to time.
+                (Default: G_PROFILER_PHASES)
+            idle_phases: The phases which are not counted as work when
+                detecting overruns. (Default: G_PROFILER_IDLE_PHASES)
+            capacity: The number of most recent frames to keep.
+                (Default: G_PROFILER_CAPACITY)
+        """
+        super(FrameProfiler, self).__init__()
+
+        self.phases = tuple(phases)
+        self.budget = budget
+        self.overruns = 0
+        self.num_frames = 0
+
+        self._phase_idx = dict((name, idx) for idx, name in
+                enumerate(self.phases))
+
+        # Indices of the phases which count as frame work
+        self._work_idx = np.array([idx for idx, name in
+                enumerate(self.phases) if name not in idle_phases])
+
+        # One row per frame. The last column holds the total frame time
+        self._timings = np.zeros((capacity, len(self.phases) + 1))
+
+        # The timings of the frame in progress (copied in on end_frame())
+        self._row = np.zeros(len(self.phases) + 1)
+
+        self._t_frame = 0.0
+        self._t_mark = 0.0
+
+        return
+
+    def start_frame(self):
+        """Start Frame
+
+        Starts timing a new frame. Any uncommitted frame is discarded.
+        """
+        self._row[:] = 0.0
+
+        self._t_frame = monotonic()
+        self._t_mark = self._t_frame
+
+        return
+
+    def mark(self, phase):
+        """Mark
+
+        Attributes the time since the last mark to the given phase. A phase
+        may be marked more than once in a frame.
+
+        Arguments:
+            phase: The name of the phase which just completed.
+        """
+        t = monotonic()
+        self._row[self._phase_idx[phase]] += t - self._t_mark
+        self._t_mark = t
+
+        return
+
+    def end_frame(self):
+        """End Frame
+
+        Commits the current frame to the ring buffer and checks the frame
+        work against the budget.
+
+        Returns:
+            True if the frame overran its budget, False otherwise.
+        """
+        self._row[-1] = monotonic() - self._t_frame
+
+        self._timings[self.num_frames % len(self._timings)] = self._row
+        self.num_frames += 1
+
+        overrun = np.sum(self._row[self._work_idx]) > self.budget
+
+        if overrun:
+            self.overruns += 1
+
+        return overrun
+
+    def get_timings(self):
+        """Get Timings
+
+        Returns the timings of all buffered frames, oldest first.
+
+        Returns:
+            A numpy array of size (N, P+1) in [s], where N is the number of
+            buffered frames and P is the number of phases. The last column
+            is the total frame time.
+        """
+        capacity = len(self._timings)
+
+        if self.num_frames <= capacity:
+            return self._timings[:self.num_frames].copy()
+
+        # The buffer has wrapped. Roll the oldest frame to the front
+        start = self.num_frames % capacity
+        return np.vstack((self._timings[start:], self._timings[:start]))
+
+    def summary(self, percentiles=(50.0, 90.0, 99.0)):
+        """Summary
+
+        Calculates percentiles of the buffered timings.
+
+        Arguments:
+            percentiles: The percentiles to calculate.
+                (Default: (50.0, 90.0, 99.0))
+
+        Returns:
+            A dictionary of phase name (and 'total') to a numpy array of the
+            given percentiles in [s]. None if no frames are buffered.
+        """
+        timings = self.get_timings()
+
+        if not len(timings):
+            return None
+
+        values = np.percentile(timings, list(percentiles), axis=0)
+        values = np.atleast_2d(values)
+
+        names = self.phases + ('total',)
+
+        return dict((name, values[:, idx]) for idx, name in enumerate(names))
+
+    def report(self, percentiles=(50.0, 90.0, 99.0)):
+        """Report
+
+        Builds a printable table of the phase timing percentiles.
+
+        Arguments:
+            percentiles: The percentiles to report.
+                (Default: (50.0, 90.0, 99.0))
+
+        Returns:
+            A multi-line string with timings in [ms].
+        """
+        summary = self.summary(percentiles)
+
+        if summary is None:
+            return 'No frames recorded'
+
+        lines = []
+        lines.append('%-12s' % 'phase' +
+                ''.join('%10s' % ('p%g' % p) for p in percentiles))
+
+        for name in self.phases + ('total',):
+            lines.append('%-12s' % name +
+                    ''.join('%10.3f' % (v * 1000.0) for v in summary[name]))
+
+        lines.append('frames: %d, overruns: %d (budget %.3f [ms])' %
+                (self.num_frames, self.overruns, self.budget * 1000.0))
+
+        return '\n'.join(lines)
+
+    def dump(self, filename):
+        """Dump
+
+        Writes the timings of all buffered frames to a whitespace delimited
+        text file with one frame per row, in [ms].
+
+        Arguments:
+            filename: The file to write.
+        """
+        header = ' '.join(self.phases + ('total',))
+        np.savetxt(filename, self.get_timings() * 1000.0, fmt='%.4f',
+                header=header)
+
+        return
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+
+"""Scheduler module
+
+Paces the simulation event loops against a monotonic clock and divides
+each frame into fixed-size physics steps.
+
+Author:
+    Evan Sneath - evansneath@gmail.com
+
+License:
+    Open Software License v3.0
+
+Classes:
+    FrameScheduler: Drift-free frame pacing with a physics step accumulator.
+"""
+
+import time
+
+import surgicalsim.lib.constants as constants
+
+from surgicalsim.lib.clock import monotonic
+
+
+class FrameScheduler(object):
+    """FrameScheduler class
+
+    Paces an event loop at a fixed frame rate. Frame deadlines are computed
+    from the start of the loop rather than from the end of the previous
+    frame, so sleep inaccuracies never accumulate into drift.
+
+    Each frame advances simulation time by the frame period. The elapsed
+    time is added to an accumulator which is drained in fixed physics steps,
+    so the physics time step never changes with the frame timing.
+
+    When a frame misses its deadline, the catch-up policy decides what
+    happens to the missed time:
+        'substep' - The missed frames are simulated on the next frame with
+            additional physics steps (up to max_catchup frames).
+        'drop' - The missed frames are skipped. Simulation time falls
+            behind real time.
+        'slowmo' - All following deadlines are shifted back. The
+            simulation runs slower than real time.
+
+    Attributes:
+        frame_dt: The frame period in [s].
+        physics_dt: The physics time step in [s].
+        policy: The catch-up policy.
+        max_catchup: The most frames caught up by the 'substep' policy.
+        t: The simulation time in [s] of all physics steps handed out.
+        num_frames: The number of frames ticked.
+        missed_deadlines: The number of frames which missed their deadline.
+        dropped_frames: The number of frames whose time was never simulated.
+
+    Methods:
+        start: Starts the frame clock.
+        tick: Returns the number of physics steps to run this frame.
+        wait: Sleeps until the deadline of the current frame.
+        report: Returns a printable summary of the deadline statistics.
+    """
+    POLICIES = ('substep', 'drop', 'slowmo')
+
+    def __init__(self, fps, physics_fps=None,
+            policy=constants.G_SCHEDULER_POLICY,
+            max_catchup=constants.G_SCHEDULER_MAX_CATCHUP):
+        """Initialize
+
+        Creates a new FrameScheduler object.
+
+        Arguments:
+            fps: The frame rate in [Hz].
+            physics_fps: The physics step rate in [Hz]. Must be at least the
+                frame rate. (Default: fps)
+            policy: The catch-up policy. (Default: G_SCHEDULER_POLICY)
+            max_catchup: The most frames caught up in a single frame by the
+                'substep' policy. (Default: G_SCHEDULER_MAX_CATCHUP)
+        """
+        super(FrameScheduler, self).__init__()
+
+        if physics_fps is None:
+            physics_fps = fps
+
+        if physics_fps < fps:
+            raise ValueError('Physics rate must be at least the frame rate')
+
+        if policy not in self.POLICIES:
+            raise ValueError('Unknown catch-up policy: %s' % policy)
+
+        self.frame_dt = 1.0 / float(fps)
+        self.physics_dt = 1.0 / float(physics_fps)
+        self.policy = policy
+        self.max_catchup = max_catchup
+
+        self.num_frames = 0
+        self.missed_deadlines = 0
+        self.dropped_frames = 0
+
+        # Simulation time not yet handed out as physics steps
+        self._accumulator = 0.0
+
+        # Total physics steps handed out. Time is derived from the count so
+        # it never accumulates rounding error
+        self._num_steps = 0
+
+        # Deadline n is at _t_origin + n * frame_dt
+        self._t_origin = 0.0
+        self._deadline_idx = 0
+
+        return
+
+    @property
+    def t(self):
+        """Time
+
+        Returns:
+            The simulation time in [s] of all physics steps handed out.
+        """
+        return self._num_steps * self.physics_dt
+
+    def start(self):
+        """Start
+
+        Starts the frame clock. The first frame deadline is one frame
+        period from now.
+        """
+        self._t_origin = monotonic()
+        self._deadline_idx = 1
+
+        return
+
+    def tick(self):
+        """Tick
+
+        Advances the simulation by one frame period and hands out the
+        physics steps which are due.
+
+        Returns:
+            The number of physics steps to run this frame.
+        """
+        self._accumulator += self.frame_dt
+
+        # The small tolerance keeps rounding error from delaying a step
+        num_steps = int(self._accumulator / self.physics_dt + 1e-9)
+
+        self._accumulator -= num_steps * self.physics_dt
+        self._num_steps += num_steps
+        self.num_frames += 1
+
+        return num_steps
+
+    def wait(self):
+        """Wait
+
+        Sleeps until the deadline of the current frame. If the deadline has
+        already passed, the catch-up policy is applied.
+
+        Returns:
+            The time remaining before the deadline when called in [s].
+            Negative if the deadline was missed.
+        """
+        slack = self._t_origin + self._deadline_idx * self.frame_dt - \
+                monotonic()
+
+        # A deadline is never more than a frame away unless the clock
+        # stepped back (only possible with the wall clock fallback). The
+        # deadlines are then rebased onto the clock
+        if slack > self.frame_dt:
+            self._t_origin -= slack - self.frame_dt
+            slack = self.frame_dt
+
+        if slack >= 0.0:
+            time.sleep(slack)
+        else:
+            self.missed_deadlines += 1
+
+            # Whole frame periods passed since the missed deadline
+            num_missed = int(-slack / self.frame_dt)
+
+            if self.policy == 'substep':
+                num_caught = min(num_missed, self.max_catchup)
+
+                # Simulate the missed time over the next frame
+                self._accumulator += num_caught * self.frame_dt
+                self.dropped_frames += num_missed - num_caught
+                self._deadline_idx += num_missed
+            elif self.policy == 'drop':
+                self.dropped_frames += num_missed
+                self._deadline_idx += num_missed
+            else:
+                # Rebase the deadlines so the current time is on schedule
+                self._t_origin -= slack
+
+        self._deadline_idx += 1
+
+        return slack
+
+    def report(self):
+        """Report
+
+        Builds a summary of the deadline statistics.
+
+        Returns:
+            A single-line string.
+        """
+        return 'frames: %d, missed deadlines: %d, dropped frames: %d ' \
+                '(policy %s)' % (self.num_frames, self.missed_deadlines,
+                self.dropped_frames, self.policy)
+
+
+if __name__ == '__main__':
+    pass
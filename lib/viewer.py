@@ -16,11 +16,16 @@ Classes:
     Viewer: A customized viewer class for the Surgical Sim application.
 """
 
+import socket
 import inspect
 import subprocess
 
 from pybrain.rl.environments.ode.viewer import ODEViewer
 
+import surgicalsim.lib.constants as constants
+
+from surgicalsim.lib.broadcast import BroadcastDecoder
+
 
 class ViewerInterface(object):
     """ViewerInterface class
@@ -109,6 +114,9 @@ class Viewer(ODEViewer):
     Attributes:
         paused: A boolean value to determine if the viewer is paused.
         stopped: A boolean value to determine if the viewer is stopped.
+
+    Methods:
+        updateData: Receives all pending body information packets.
     """
     def __init__(
             self, server_ip='127.0.0.1', viewer_ip='127.0.0.1',
@@ -138,6 +146,38 @@ class Viewer(ODEViewer):
         self.paused = False
         self.stopped = False
 
+        # Rebuilds the drawn bodies from keyframe and delta packets
+        self._decoder = BroadcastDecoder()
+
+        return
+
+    def updateData(self):
+        """Update Data (Subclassed)
+
+        Receives all pending body information packets from the environment.
+        The environment only sends bodies which moved, so the wait for the
+        first packet is short. The last received bodies are drawn if nothing
+        arrives.
+        """
+        client = self.client
+
+        # Send the alive signal (own IP address) to the environment
+        client.UDPOutSock.sendto(client.ownIP, client.outAddr)
+
+        client.UDPInSock.settimeout(1.0 / constants.G_VIEWER_FPS)
+
+        try:
+            while True:
+                packet = client.UDPInSock.recv(client.buf)
+                self._decoder.decode(packet)
+
+                # Drain the remaining packets without waiting
+                client.UDPInSock.settimeout(0.0)
+        except socket.error:
+            pass
+
+        self.message = self._decoder.message
+
         return
 
     def _keyboard_callback(self, key, x, y):
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+
+"""World Cache module
+
+Caches generated XODE world files. Each file is named by a hash of all
+generator inputs, so a world is only generated once and is shared by every
+later run and process with the same inputs.
+
+The hash covers the world class, its arguments, the system constants read
+by the world and model builders, and the source of the world and model
+modules. Any change to these generates a new file. Only the most recently
+used files are kept. Stale files are never used and may be deleted at any
+time.
+
+Author:
+    Evan Sneath - evansneath@gmail.com
+
+License:
+    Open Software License v3.0
+
+Functions:
+    get_world_file: Returns a cached XODE file, generating it if needed.
+    get_world_key: Returns the hash of the world generator inputs.
+"""
+
+import os
+import glob
+import uuid
+import inspect
+import hashlib
+
+import numpy as np
+
+import surgicalsim.lib.constants as constants
+import surgicalsim.lib.models as models
+
+
+# Increment to invalidate all cached worlds
+_CACHE_VERSION = 2
+
+# The system constants read by the world and model builders. Constants
+# which do not change the generated world are not part of the key
+_WORLD_CONSTANTS = (
+    'G_END_STICK_LENGTH',
+    'G_END_STICK_MASS',
+    'G_END_STICK_RADIUS',
+    'G_END_TOOLTIP_MASS',
+    'G_END_TOOLTIP_RADIUS',
+    'G_GATE_HEIGHT',
+    'G_GATE_HEIGHT_RAND',
+    'G_GATE_NORM_POS',
+    'G_GATE_NORM_ROT',
+    'G_GATE_POST_RADIUS',
+    'G_GATE_POS_RAND',
+    'G_GATE_ROT_RAND',
+    'G_GATE_WIDTH',
+    'G_NUM_GATES',
+    'G_PA10_JOINT_NAMES',
+    'G_PA10_X_OFFSET',
+    'G_PA10_Z_OFFSET',
+    'G_TABLE_HEIGHT',
+    'G_TABLE_LENGTH',
+    'G_TABLE_MASS',
+    'G_TABLE_Y_POS',
+)
+
+
+def get_world_file(world_class, cache_dir=constants.G_WORLD_CACHE_DIR,
+        max_files=constants.G_WORLD_CACHE_MAX_FILES, **kwargs):
+    """Get World File
+
+    Returns the cached XODE file of a world. The world is generated into the
+    cache if no file exists for its inputs. Generation writes to a unique
+    temporary file which is renamed into place, so concurrent processes
+    never read a partial file. The least recently used files beyond the
+    cache size are then deleted.
+
+    Arguments:
+        world_class: The XODEfile subclass which generates the world.
+        cache_dir: The cache directory. (Default: G_WORLD_CACHE_DIR)
+        max_files: The most files kept in the cache.
+            (Default: G_WORLD_CACHE_MAX_FILES)
+        kwargs: The keyword arguments of the world class. The world name is
+            given by the cache.
+
+    Returns:
+        The filename of the XODE file.
+    """
+    key = get_world_key(world_class, **kwargs)
+    filename = os.path.join(cache_dir, key + '.xode')
+
+    if os.path.exists(filename):
+        # Mark the file as recently used
+        try:
+            os.utime(filename, None)
+        except OSError:
+            pass
+        else:
+            return filename
+
+    if not os.path.isdir(cache_dir):
+        try:
+            os.makedirs(cache_dir)
+        except OSError:
+            # Another process created the directory first
+            if not os.path.isdir(cache_dir):
+                raise
+
+    # The world writer appends .xode to the file basename
+    temp_basename = os.path.join(cache_dir, '%s.%d.%s' %
+            (key, os.getpid(), uuid.uuid4().hex))
+
+    world = world_class(name=key, **kwargs)
+    world.generate(temp_basename)
+
+    # Replacing the file is atomic. A world generated concurrently by
+    # another process is identical
+    os.rename(temp_basename + '.xode', filename)
+
+    _evict_worlds(cache_dir, max_files)
+
+    return filename
+
+
+def get_world_key(world_class, **kwargs):
+    """Get World Key
+
+    Hashes all inputs of world generation.
+
+    Arguments:
+        world_class: The XODEfile subclass which generates the world.
+        kwargs: The keyword arguments of the world class.
+
+    Returns:
+        The hexadecimal hash string.
+    """
+    sha = hashlib.sha1()
+
+    sha.update(repr((_CACHE_VERSION, world_class.__module__,
+            world_class.__name__)).encode('utf-8'))
+
+    for name in sorted(kwargs):
+        sha.update(repr((name, kwargs[name])).encode('utf-8'))
+
+    for name in _WORLD_CONSTANTS:
+        value = getattr(constants, name)
+
+        if isinstance(value, np.ndarray):
+            value = (value.dtype.str, value.shape, value.tolist())
+
+        sha.update(repr((name, value)).encode('utf-8'))
+
+    # The generating source of the world and all models
+    source_files = [inspect.getsourcefile(world_class)]
+
+    models_dir = os.path.dirname(inspect.getsourcefile(models))
+    source_files += sorted(glob.glob(os.path.join(models_dir, '*.py')))
+
+    for source_file in source_files:
+        with open(source_file, 'rb') as f:
+            sha.update(f.read())
+
+    return sha.hexdigest()
+
+
+def _evict_worlds(cache_dir, max_files):
+    """Evict Worlds
+
+    Deletes the least recently used world files beyond the cache size.
+    Temporary files of worlds being generated are never deleted.
+
+    Arguments:
+        cache_dir: The cache directory.
+        max_files: The most files kept in the cache.
+    """
+    # Cached worlds are named by their 40 character hash
+    filenames = glob.glob(os.path.join(cache_dir, '?' * 40 + '.xode'))
+
+    if len(filenames) <= max_files:
+        return
+
+    last_used = []
+
+    for filename in filenames:
+        try:
+            last_used.append((os.path.getmtime(filename), filename))
+        except OSError:
+            # Evicted by another process
+            pass
+
+    last_used.sort(reverse=True)
+
+    for _, filename in last_used[max_files:]:
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+
+    return
+
+
+if __name__ == '__main__':
+    pass
@@ -13,6 +13,7 @@ License:
 
 Functions:
     parse_arguments: Parses incoming command line arguments.
+    write_timings: Prints and writes the simulation frame timings.
     main: Initializes all objects and begins the main event loop.
 """
 
@@ -25,6 +26,8 @@ from simulation import NeuralSimulation
 
 import surgicalsim.lib.constants as constants
 
+from surgicalsim.lib.disturbance import Disturbance
+
 
 def parse_arguments():
     """Parse Arguments
@@ -44,6 +47,10 @@ def parse_arguments():
             '-r', '--randomize', action='store_true',
             help='randomize test article gate position and orientation'
     )
+    parser.add_argument(
+            '-s', '--seed', action='store', type=int, default=None,
+            help='random seed of the randomized test article gates'
+    )
     parser.add_argument(
             '-f', '--fast', action='store_true',
             help='use fast simulation steps (for slower machines)'
@@ -54,11 +61,49 @@ def parse_arguments():
             default=None
     )
 
+    parser.add_argument(
+            '-d', '--disturbance', action='store', default=None,
+            help='move the test article table along recorded motion from a '
+                 'file of [time, x, y, z] rows'
+    )
+
+    parser.add_argument(
+            '-p', '--predictive', action='store_true',
+            help='correct the path for predicted gate motion'
+    )
+
+    parser.add_argument(
+            '-t', '--timings', action='store', default=None,
+            help='write per-frame phase timings to a file and print a summary'
+    )
+
     args = parser.parse_args()
 
     return args
 
 
+def write_timings(sim, filename):
+    """Write Timings
+
+    Prints the frame phase timing summary of the last simulation event loop
+    and dumps the per-frame timings to a file.
+
+    Arguments:
+        sim: The simulation object.
+        filename: The file to write the per-frame timings.
+    """
+    if sim is None or sim.profiler is None:
+        return
+
+    print sim.profiler.report()
+    print sim.scheduler.report()
+
+    print '>>> Writing frame timings to %s' % filename
+    sim.profiler.dump(filename)
+
+    return
+
+
 def main():
     """Main
 
@@ -72,7 +117,16 @@ def main():
     try:
         # Initialize all module of the simulation
         print '>>> Initializing...'
-        sim = NeuralSimulation(args.randomize, args.network, args.verbose)
+
+        disturbance = None
+
+        if args.disturbance is not None:
+            print '>>> Loading table motion from %s' % args.disturbance
+            disturbance = Disturbance.load(args.disturbance)
+
+        sim = NeuralSimulation(args.randomize, args.network, args.verbose,
+                seed=args.seed, disturbance=disturbance,
+                predictive=args.predictive)
 
         # Continue to execute the main simulation loop
         print '>>> Running... (ctrl+c or q to exit)'
@@ -80,9 +134,18 @@ def main():
         if args.fast:
             print '>>> Stepping fast!'
 
+        if args.predictive:
+            print '>>> Correcting for predicted gate motion'
+
         sim.start(fps=constants.G_ENVIRONMENT_FPS, fast_step=args.fast)
+
+        if args.timings is not None:
+            write_timings(sim, args.timings)
     except KeyboardInterrupt as e:
         # Except the keyboard interrupt as the valid way of leaving the loop
+        if args.timings is not None:
+            write_timings(sim, args.timings)
+
         print '>>> Cleaning up...'
         del sim
 
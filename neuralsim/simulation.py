@@ -17,8 +17,6 @@ Classes:
 
 
 # Import external modules
-import os
-import time
 
 import numpy as np
 
@@ -29,27 +27,19 @@ from world import NeuralSimWorld
 from surgicalsim.lib.environment import EnvironmentInterface
 from surgicalsim.lib.viewer import ViewerInterface
 from surgicalsim.lib.kinematics import PA10Kinematics
+from surgicalsim.lib.profiler import FrameProfiler
+from surgicalsim.lib.scheduler import FrameScheduler
+from surgicalsim.lib.pathdata import Path
+from surgicalsim.lib.disturbance import Disturbance, KinematicDriver
+from surgicalsim.lib.predictor import MotionPredictor
 
 import surgicalsim.lib.network as network
 import surgicalsim.lib.pathutils as pathutils
 import surgicalsim.lib.constants as constants
+import surgicalsim.lib.worldcache as worldcache
 import surgicalsim.lib.datastore as datastore
 
 
-def oscillation(t, amp, freq):
-    y = amp * np.sin(t * freq * 2.0 * np.pi)
-    return y
-
-def shaker_table(t, table_pos):
-    amplitude = constants.G_TABLE_OSCILLATION_AMP
-    frequency = constants.G_TABLE_OSCILLATION_FREQ
-
-    new_y = oscillation(t, amplitude, frequency)
-    new_pos = table_pos + np.array([0.0, new_y, 0.0])
-
-    return new_pos
-
-
 class NeuralSimulation(object):
     """NeuralSimulation class
 
@@ -60,16 +50,30 @@ class NeuralSimulation(object):
     Attributes:
         env: The Open Dynamics Engine environment.
         viewer: The OpenGL viewer for the ODE environment.
+        disturbance: The table motion disturbance. None if the table motion
+            is set by the test article constants.
+        predictive: Determines if the path correction aims for predicted
+            gate positions.
+        tracking: The tracking error summary of the most recent corrected
+            path (see evaluate_tracking()). None until a path is completed.
+        profiler: The frame profiler of the most recent event loop.
+        scheduler: The frame scheduler of the most recent event loop.
 
     Methods:
         start: Begins the main event loop.
     """
     env = None
     viewer = None
+    disturbance = None
+    predictive = False
+    tracking = None
     rnn = None
     kinematics = None
+    profiler = None
+    scheduler = None
 
-    def __init__(self, randomize=False, rnn_xml=None, verbose=False):
+    def __init__(self, randomize=False, rnn_xml=None, verbose=False,
+            seed=None, disturbance=None, predictive=False):
         """Initialize
 
         Creates the environment and viewer objects required to run the neural
@@ -83,19 +87,34 @@ class NeuralSimulation(object):
                 (Default: None)
             verbose: Determines the level out debug output generated.
                 (Default: False)
+            seed: The random seed of the randomized test article gates. If
+                None, a seed is chosen at random. (Default: None)
+            disturbance: A Disturbance object of the table motion. If None,
+                the table oscillates as set by G_TABLE_IS_OSCILLATING.
+                (Default: None)
+            predictive: If True, the path correction aims for the gate
+                positions predicted G_PREDICTOR_HORIZON frames ahead from
+                their recent motion. Otherwise, it aims for the current gate
+                positions. (Default: False)
         """
-        # Generate the XODE file
-        XODE_FILENAME = 'model' # .xode is appended automatically
-
+        # Generate the XODE file. Worlds with the same inputs are generated
+        # once and shared through the world cache
         print('>>> Generating world model')
-        if os.path.exists('./'+XODE_FILENAME+'.xode'):
-            os.remove('./'+XODE_FILENAME+'.xode')
 
-        xode_model = NeuralSimWorld(
-                name=XODE_FILENAME,
-                randomize_test_article=randomize
+        # A randomized test article is reproducible (and cached) by its seed
+        if randomize and seed is None:
+            seed = np.random.randint(0, 2**31 - 1)
+
+        if randomize:
+            print('>>> Test article seed: %d' % seed)
+        else:
+            seed = None
+
+        xode_filename = worldcache.get_world_file(
+                NeuralSimWorld,
+                randomize_test_article=randomize,
+                seed=seed
         )
-        xode_model.generate()
 
         print('>>> Generating RNN')
 
@@ -115,7 +134,7 @@ class NeuralSimulation(object):
         # Start environment
         print('>>> Starting environment')
         self.env = EnvironmentInterface(
-                xode_filename='./'+XODE_FILENAME+'.xode',
+                xode_filename=xode_filename,
                 realtime=False,
                 verbose=verbose,
                 gravity=constants.G_ENVIRONMENT_GRAVITY
@@ -131,6 +150,9 @@ class NeuralSimulation(object):
             'pointer': ['tooltip', 'stick'],
         }
 
+        self.disturbance = disturbance
+        self.predictive = predictive
+
         return
 
     def start(self, fps, fast_step=False):
@@ -152,13 +174,17 @@ class NeuralSimulation(object):
         # Define the total time for the tooltip traversal
         t_total = 20.0
 
-        # Define the simulation frame rate
-        t = 0.0 # [s]
-        dt = 1.0 / float(fps) # [s]
+        # Pace the frames against a monotonic clock. Each frame is divided
+        # into fixed physics sub-steps
+        self.scheduler = FrameScheduler(fps,
+                physics_fps=constants.G_PHYSICS_FPS)
+
+        dt = self.scheduler.frame_dt # [s]
+
+        self.env.set_dt(self.scheduler.physics_dt)
 
-        # Keep track of time overshoot in the case that simulation time must be
-        # increased in order to maintain real-time constraints
-        t_overshoot = 0.0
+        # Time spent paused before the path traversal begins
+        t_pause = 0.0 # [s]
 
         # Get the initial path position (center of gate7)
         pos_start = self.env.get_body_pos('gate7') # [m]
@@ -166,8 +192,12 @@ class NeuralSimulation(object):
         # Get the first position of the PA10 at rest
         pos_init = self.env.get_body_pos('tooltip') # [m]
 
-        # Calculate the new required joint angles of the PA10
-        #pa10_joint_angles = self.kinematics.calc_inverse_kinematics(pos_init, pos_start)
+        # Solve the PA10 inverse kinematics from its angles at rest
+        pa10_joint_names = constants.G_PA10_JOINT_NAMES
+        self.kinematics.reset(self.env.get_joint_angles(pa10_joint_names))
+
+        # The joint velocities which hold the PA10 still
+        pa10_joint_hold = np.zeros(len(pa10_joint_names))
 
         # TODO: Move the PA10 end-effector to the starting position along the path
 
@@ -196,17 +226,41 @@ class NeuralSimulation(object):
         gate_data = np.tile(gate_data, (len(rnn_path), 1))
 
         # Complete the rnn path data
-        rnn_path = np.hstack((t_input, gate_data, rnn_path))
+        rnn_path = Path(np.hstack((t_input, gate_data, rnn_path)))
 
         # Save generated path for later examination
-        datastore.store(rnn_path, constants.G_RNN_STATIC_PATH_OUT)
+        rnn_path.store(constants.G_RNN_STATIC_PATH_OUT)
 
         # Define a variable to hold the final path (with real-time correction)
         final_path = rnn_path[:-1].copy()
         path_saved = False
 
+        # Precompute the joint trajectory of the generated path. Each frame
+        # then only corrects the precomputed angles
+        print('>>> Precomputing PA10 joint trajectory')
+
+        pa10_path_angles = self.kinematics.calc_path_inverse_kinematics(
+                rnn_path.tooltip)
+
+        self.kinematics.reset(pa10_path_angles[0])
+
+        vel_exceeded, accel_exceeded = self.kinematics.check_joint_rates(
+                pa10_path_angles, dt)
+
+        if np.any(vel_exceeded) or np.any(accel_exceeded):
+            print('>>> Warning: PA10 joint velocity limits exceeded in %d ' \
+                    'frames, acceleration limits in %d frames' %
+                    (np.sum(np.any(vel_exceeded, axis=1)),
+                    np.sum(np.any(accel_exceeded, axis=1))))
+
         # Detect all path segments between gates in the generated path
-        segments = pathutils._detect_segments(rnn_path)
+        segments = pathutils.detect_segments(rnn_path.data)
+
+        # The current segment of each step (the first segment which ends at
+        # or after the step). The tracking error is measured against the
+        # same segments
+        segment_indices = pathutils.get_segment_indices(segments,
+                len(rnn_path))
 
         path_idx = 0
 
@@ -214,16 +268,41 @@ class NeuralSimulation(object):
         v_curr = np.array([0.0, 0.0, 0.0]) # [m/s]
         a_max = constants.G_MAX_ACCEL # [m/s^2]
 
-        # Get the static table position
-        x_table = self.env.get_body_pos('table')
+        # The table motion is precomputed for the whole traversal. The table
+        # is driven along it by velocity. The correction only sees the gate
+        # positions read from the physics engine
+        disturbance = self.disturbance
 
-        while not stopped:
-            t_start = time.time()
+        if disturbance is None:
+            if constants.G_TABLE_IS_OSCILLATING:
+                disturbance = Disturbance.sine(t_total)
+            else:
+                disturbance = Disturbance.static()
+
+        table_driver = KinematicDriver(self.env, 'table', disturbance)
+
+        gate_names = ['gate%d' % gate_idx
+                for gate_idx in range(constants.G_NUM_GATES)]
 
-            # If the last calculation took too long, catch up
-            dt_warped = dt + t_overshoot
+        # The gate positions are only read again once the gates move. The
+        # gates of a table which does not oscillate are then read once
+        gate_pos = np.empty((constants.G_NUM_GATES, constants.G_NUM_POS_DIMS))
+        gate_versions = np.empty(constants.G_NUM_GATES, dtype=int)
+        gate_versions.fill(-1)
 
-            self.env.set_dt(dt_warped)
+        # The predictive correction fits the gate motion online from the
+        # gate positions of each frame. Frames are of a varying number of
+        # physics steps, so each sample is given the time since the last
+        predictor = MotionPredictor(gate_pos.shape)
+        t_sample = 0.0 # [s]
+
+        # Time each phase of every frame against the frame time budget
+        self.profiler = FrameProfiler(budget=dt)
+
+        self.scheduler.start()
+
+        while not stopped:
+            self.profiler.start_frame()
 
             # Determine if the viewer is stopped. Then we can quit
             if self.viewer.is_dead:
@@ -236,120 +315,127 @@ class NeuralSimulation(object):
                 # If we have really hit the end of the simulation, save/plot the path
                 if not paused and not path_saved:
                     # Save the final data to a file
-                    datastore.store(final_path, constants.G_RNN_DYNAMIC_PATH_OUT)
+                    final_path.store(constants.G_RNN_DYNAMIC_PATH_OUT)
                     path_saved = True
 
+                    # Measure how closely the tooltip followed the gates
+                    _, self.tracking = pathutils.evaluate_tracking(
+                            rnn_path.data, final_path.tooltip,
+                            final_path.gate_pos, segments=segments)
+
+                    print('>>> Tracking error [mm]: mean %.4f, rms %.4f, ' \
+                            'p95 %.4f, max %.4f' %
+                            tuple(1.0e3 * self.tracking[key]
+                            for key in ('mean', 'rms', 'p95', 'max')))
+
+                self.profiler.mark('ode')
+                self.profiler.end_frame()
                 continue
 
             # Not a very elegant solution to pausing at the start, but it works
-            if t <= 1000.0:
+            if t_pause <= 1000.0:
                 self.env.step(paused=True, fast=fast_step)
-                t += dt_warped
-                continue
+                t_pause += dt
 
-            # Determine the current path segment
-            curr_segment_idx = 0
-
-            for segment_idx, segment_end in enumerate(segments):
-                if path_idx <= segment_end:
-                    curr_segment_idx = segment_idx
-                    break
-
-            x_curr = pathutils.get_path_tooltip_pos(rnn_path, path_idx) + x_path_offset
-            x_next = pathutils.get_path_tooltip_pos(rnn_path, path_idx+1) + x_path_offset
-
-            # Get the expected gate position
-            x_gate_expected = pathutils.get_path_gate_pos(
-                    rnn_path,
-                    segments[curr_segment_idx],
-                    curr_segment_idx
-            )
+                self.profiler.mark('ode')
+                self.profiler.end_frame()
 
-            # Get the actual gate position
-            x_gate_actual = self.env.get_body_pos('gate%d'%curr_segment_idx)
-
-            # Calculate the new position from change to new gate position
-            dx_gate = x_gate_actual - (x_gate_expected + x_path_offset)
-            x_new = x_next + dx_gate
+                # Restart the frame clock so the traversal begins on schedule
+                self.scheduler.start()
+                continue
 
-            # Calculate the new velocity
-            v_new = (x_new - x_curr) / dt_warped
+            # Hand out the physics steps due this frame. The table motion is
+            # timed from the start of the traversal
+            t_traversal = self.scheduler.t
+            t = t_pause + t_traversal
+            num_steps = self.scheduler.tick()
 
-            # Calculate the new acceleration
-            a_new = (v_new - v_curr) / dt_warped
+            # The correction must cover all steps of this frame
+            dt_frame = num_steps * self.scheduler.physics_dt
 
-            # Calculate the acceleration vector norm
-            a_new_norm = np.linalg.norm(a_new)
+            # Determine the current path segment
+            curr_segment_idx = segment_indices[path_idx]
 
-            # Limit the norm vector
-            a_new_norm_clipped = np.clip(a_new_norm, -a_max, a_max)
+            x_curr = rnn_path.tooltip[path_idx] + x_path_offset
 
-            # Determine the ratio of the clipped norm, protect against divide by zero
-            if a_new_norm != 0.0:
-                ratio_unclipped = a_new_norm_clipped / a_new_norm
+            # Get the expected gate position
+            x_gate_expected = rnn_path.gate_pos[segments[curr_segment_idx],
+                    curr_segment_idx]
+
+            # Get the actual gate positions. The gates are only read again
+            # once they move. Both correction modes aim from these positions
+            self.env.update_body_positions(gate_names, gate_pos,
+                    gate_versions)
+
+            if self.predictive:
+                # Aim for where the gates will be once the frame is stepped
+                predictor.update(gate_pos, t_traversal - t_sample)
+                t_sample = t_traversal
+
+                x_gate_actual = predictor.predict(
+                        constants.G_PREDICTOR_HORIZON,
+                        dt_frame)[curr_segment_idx]
             else:
-                ratio_unclipped = 0.0
-
-            # Scale the acceleration vector by this ratio
-            a_new = a_new * ratio_unclipped
-
-            # Calculate the new change in velocity
-            dv_new = a_new * dt_warped
-            v_new = v_curr + dv_new
+                x_gate_actual = gate_pos[curr_segment_idx]
+
+            self.profiler.mark('capture')
+
+            # Step along the path corrected for the gate motion
+            x_new, v_curr, x_path_offset = pathutils.correct_step(
+                    rnn_path.tooltip[path_idx],
+                    rnn_path.tooltip[path_idx+1],
+                    x_gate_expected,
+                    x_gate_actual,
+                    x_path_offset,
+                    v_curr,
+                    dt_frame,
+                    a_max=a_max
+            )
 
-            # Calculate the new change in position
-            dx_new = v_new * dt_warped
-            x_new = x_curr + dx_new
+            self.profiler.mark('correction')
 
             # Modify final path data with current tooltip and gate positions
-            pathutils.set_path_time(final_path, path_idx, t)
-            pathutils.set_path_tooltip_pos(final_path, path_idx, x_curr)
+            final_path.set_samples(path_idx, time=t, tooltip=x_curr,
+                    gate_pos=gate_pos)
 
-            for gate_idx in range(constants.G_NUM_GATES):
-                gate_name = 'gate%d' % gate_idx
-                x_gate = self.env.get_body_pos(gate_name)
-                pathutils.set_path_gate_pos(final_path, path_idx, gate_idx, x_gate)
+            self.profiler.mark('capture')
 
-            # Store this velocity for the next time step
-            v_curr = v_new
+            # Perform inverse kinematics to get joint angles. The correction
+            # of the previous frame is carried onto the precomputed angles,
+            # so a single iteration follows the corrected path
+            angles_init = pa10_path_angles[path_idx+1] + \
+                    (self.kinematics.angles - pa10_path_angles[path_idx])
 
-            # Recalculate the current offset
-            x_path_offset += x_new - x_next
+            self.kinematics.calc_inverse_kinematics(x_new, angles_init,
+                    max_iter=constants.G_PA10_IK_PATH_ITER)
 
-            # Perform inverse kinematics to get joint angles
-            pa10_joint_angles = self.kinematics.calc_inverse_kinematics(x_curr, x_new)
+            self.profiler.mark('ik')
 
             # TODO: TEMP - MOVE ONLY POINTER, NO PA10
             self.env.set_group_pos('pointer', x_new)
 
-            if constants.G_TABLE_IS_OSCILLATING:
-                # Move the table with y-axis oscillation
-                x_table_next = shaker_table(t, x_table)
-            else:
-                x_table_next = x_table
+            # Move the table to its next position over the frame
+            table_driver.update(t_traversal, dt_frame)
 
-            self.env.set_body_pos('table', x_table_next)
+            # Step through the world by 1 time frame. The PA10 does not carry
+            # the end effector yet, so its joints are held still
+            self.env.perform_action(pa10_joint_hold, fast=fast_step,
+                    update_viewer=False, substeps=num_steps)
 
-            # Step through the world by 1 time frame and actuate pa10 joints
-            self.env.performAction(pa10_joint_angles, fast=fast_step)
+            self.profiler.mark('ode')
+
+            self.env.update_viewer()
+
+            self.profiler.mark('viewer')
 
-            # Update current time after this step
-            t += dt_warped
             path_idx += 1
 
-            # Determine the difference in virtual vs actual time
-            t_warped = dt - (time.time() - t_start)
+            # Sleep until the frame deadline. Missed deadlines are caught up
+            # according to the scheduler policy
+            self.scheduler.wait()
 
-            # Attempt to enforce real-time constraints
-            if t_warped >= 0.0:
-                # The calculation took less time than the virtual time. Sleep
-                # the rest off
-                time.sleep(t_warped)
-                t_overshoot = 0.0
-            else:
-                # The calculation took more time than the virtual time. We need
-                # to catch up with the virtual time on the next time step
-                t_overshoot = -t_warped
+            self.profiler.mark('sleep')
+            self.profiler.end_frame()
 
         return
 
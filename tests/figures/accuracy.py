@@ -33,10 +33,7 @@ def main():
     # Calculate the closest point for each path to the markers
     generated_distances = calculate_closest_approaches(generated_path)
 
-    trained_distances = []
-    for path in trained_paths:
-        distances = calculate_closest_approaches(path)
-        trained_distances.append(distances)
+    trained_distances = pathutils.calc_closest_approaches(trained_paths)
 
 
     # Print out the individual distances in meters as well as the average
@@ -170,20 +167,10 @@ def calculate_closest_approaches(path):
         path: A SurgicalSim formatted path.
 
     Returns:
-        A list of distances of size N, where N is the number of markers.
+        A numpy array of distances of size N, where N is the number of
+        markers.
     """
-    segments = pathutils._detect_segments(path)
-
-    distances = []
-
-    for gate_idx in np.arange(constants.G_NUM_GATES):
-        x_gate = pathutils.get_path_gate_pos(path, segments[gate_idx], gate_idx)
-        x_tooltip = pathutils.get_path_tooltip_pos(path, segments[gate_idx])
-
-        dist = np.sqrt((x_gate[0] - x_tooltip[0]) ** 2 + (x_gate[1] - x_tooltip[1]) ** 2 + (x_gate[2] - x_tooltip[2]) ** 2)
-        distances.append(dist)
-
-    return distances
+    return pathutils.calc_closest_approaches(path)
 
 
 if __name__ == '__main__':
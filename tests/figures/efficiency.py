@@ -1,5 +1,8 @@
 #!/usr/bin/env python2.7
 
+import os
+import argparse
+
 import numpy as np
 
 import surgicalsim.lib.constants as constants
@@ -11,60 +14,49 @@ NOTE:
     This procedure was not used to calculate minimum possible traversal time.
     Instead, the time incrementally increased in the NeuralSim until the
     procedure passed. This was deemed the minimum feasible traversal time.
+
+    Any number of path files or directories of path files may be given. All
+    paths are analyzed at once, so a whole results directory takes seconds.
 """
 
 def main():
     """
     OUTPUT THE MINIMUM REQUIRED TIME FOR THE RNN PATH TO COMPLETE
     """
-    # Define generated data file name
-    generated_file = '../../results/generated/efficiency-test.dat'
-
-    # Collect path data from the file
-    generated_path = datastore.retrieve(generated_file)
-
-    # Calculate the indices of the end effector position columns
-    pos_start_col = constants.G_POS_IDX
-    pos_end_col = pos_start_col + constants.G_NUM_POS_DIMS
-
-    # Assume time to complete path is 1 second
-    dt = 1.0 / 60.0 # [s]
-    t_total = (1.0 / dt) * float(len(generated_path))
-
-    # Get the defined acceleration limit of the PA-10
-    a_limit_norm = constants.G_MAX_ACCEL
-    a_max_norm = 0.0
-
-    x_curr = np.array([0.0, 0.0, 0.0])
-    v_curr = np.array([0.0, 0.0, 0.0])
-
-    for idx in xrange(len(generated_path)-1):
-        # Get the tooltip position for this and the next sample
-        x_curr = pathutils.get_path_tooltip_pos(generated_path, idx)
-        x_next = pathutils.get_path_tooltip_pos(generated_path, idx+1)
-
-        # Calculate the velocity from current to next sample
-        v_next = (x_next - x_curr) / dt
-
-        # Calculate the acceleration from current to next sample
-        a = (v_next - v_curr) / dt
-        a_norm = np.linalg.norm(a)
-
-        # Store this acceleration if it's greater than the current max
-        if a_norm > a_max_norm:
-            a_max_norm = a_norm
-
-        # Set the current to the next velocity
-        v_curr = v_next.copy()
-
-    print('dt: %f [s]' % dt)
-    print('a_max: %f [m/s^2]' % a_max_norm)
-
-    # Calculate the gain factor needed to bring the max norm acceleration to
-    # the acceleration norm limit
-    a_gain = a_limit_norm / a_max_norm
-
-    print('gain_factor: %f' % a_gain)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('paths', nargs='*',
+            default=['../../results/generated/efficiency-test.dat'],
+            help='path data files or directories of path data files')
+    parser.add_argument('--dt', type=float,
+            default=1.0/constants.G_ENVIRONMENT_FPS,
+            help='time of each path step in [s]')
+    args = parser.parse_args()
+
+    # Collect path data from the files
+    path_files = []
+
+    for name in args.paths:
+        if os.path.isdir(name):
+            path_files.extend(sorted(pathutils.list_data_files(name)))
+        else:
+            path_files.append(name)
+
+    paths = [datastore.retrieve(path_file) for path_file in path_files]
+
+    # Each path starts from rest. The gain factor brings the max norm
+    # acceleration to the defined acceleration limit of the PA-10
+    summary = pathutils.analyze_paths(paths, dt=args.dt,
+            a_max=constants.G_MAX_ACCEL, from_rest=True)
+
+    print('dt: %f [s]' % args.dt)
+
+    for idx, path_file in enumerate(path_files):
+        print(path_file)
+        print('    a_max: %f [m/s^2]' % summary['a_max'][idx])
+        print('    gain_factor: %f' % summary['gain'][idx])
+        print('    length: %f [m], duration: %f [s], ' \
+                'min_duration: %f [s]' % (summary['length'][idx],
+                summary['duration'][idx], summary['min_duration'][idx]))
 
     return
 
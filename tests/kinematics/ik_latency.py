@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+import time
+import argparse
+
+import numpy as np
+
+import surgicalsim.lib.constants as constants
+
+from surgicalsim.lib.kinematics import PA10Kinematics
+
+"""
+NOTES:
+
+    This program measures the latency of PA10 inverse kinematics solves
+    as run by the NeuralSim event loop. A smooth flange path is generated
+    through forward kinematics of a slow joint motion, so every goal is
+    reachable. Each goal is solved starting from the previous solution.
+
+    The program exits with an error if the 99th percentile solve time
+    exceeds G_PA10_IK_BUDGET, which leaves most of each frame for the rest
+    of the event loop.
+"""
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--frames', type=int, default=2000,
+            help='number of frames to solve')
+    parser.add_argument('-b', '--budget', type=float,
+            default=constants.G_PA10_IK_BUDGET,
+            help='99th percentile solve time budget in [s]')
+    args = parser.parse_args()
+
+    kinematics = PA10Kinematics()
+
+    goals = generate_path(kinematics, args.frames)
+
+    # Start at rest at the first goal
+    kinematics.reset(generate_angles(kinematics, args.frames)[0])
+
+    latencies = np.zeros(len(goals))
+    errors = np.zeros(len(goals))
+
+    for idx, goal in enumerate(goals):
+        t_start = time.time()
+        angles = kinematics.calc_inverse_kinematics(goal)
+        latencies[idx] = time.time() - t_start
+
+        errors[idx] = np.linalg.norm(
+                kinematics.calc_forward_kinematics(angles) - goal)
+
+    p50, p99 = np.percentile(latencies, [50.0, 99.0])
+
+    print('Frames: %d' % len(goals))
+    print('Solve time p50: %f [ms], p99: %f [ms], max: %f [ms]' %
+            (p50 * 1000.0, p99 * 1000.0, np.max(latencies) * 1000.0))
+    print('Position error mean: %e [m], max: %e [m]' %
+            (np.mean(errors), np.max(errors)))
+
+    if p99 > args.budget:
+        print('>>> FAILED: p99 solve time exceeds %f [ms] budget' %
+                (args.budget * 1000.0))
+        raise SystemExit(1)
+
+    print('>>> PASSED: p99 solve time within %f [ms] budget' %
+            (args.budget * 1000.0))
+
+    return
+
+
+def generate_angles(kinematics, num_frames):
+    """Generate Angles
+
+    Generates a slow sinusoidal motion of every joint about a bent elbow
+    posture, sampled at the simulation frame rate. The flange sweeps the
+    workspace in front of the arm without passing through the stretched
+    (singular) posture.
+
+    Arguments:
+        kinematics: The PA10Kinematics object.
+        num_frames: The number of frames to generate.
+
+    Returns:
+        A numpy array of size (num_frames, 7) in [rad].
+    """
+    t = np.arange(num_frames) / constants.G_ENVIRONMENT_FPS
+
+    posture = np.array([0.0, 0.6, 0.0, 1.2, 0.0, 0.8, 0.0])
+    amps = np.array([0.8, 0.3, 0.5, 0.4, 0.5, 0.4, 0.5])
+    freqs = np.linspace(0.05, 0.2, len(posture))
+
+    return posture + amps * np.sin(2.0 * np.pi * np.outer(t, freqs))
+
+
+def generate_path(kinematics, num_frames):
+    """Generate Path
+
+    Generates a smooth, reachable flange path.
+
+    Arguments:
+        kinematics: The PA10Kinematics object.
+        num_frames: The number of frames to generate.
+
+    Returns:
+        A numpy array of size (num_frames, 3) in [m].
+    """
+    angles = generate_angles(kinematics, num_frames)
+
+    return np.array([kinematics.calc_forward_kinematics(q) for q in angles])
+
+
+if __name__ == '__main__':
+    main()
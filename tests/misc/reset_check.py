@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+
+import argparse
+
+import numpy as np
+
+import surgicalsim.lib.constants as constants
+import surgicalsim.lib.models as models
+import surgicalsim.lib.worldcache as worldcache
+
+from surgicalsim.lib.environment import EnvironmentInterface
+from surgicalsim.trainingsim.world import TrainingSimWorld
+
+"""
+NOTES:
+
+    This program checks that a test article reset in place matches a test
+    article built from the XODE file. Two worlds of randomized gates are
+    generated from different seeds. The gates of the first world are reset
+    to the layout of the second, and every gate body is then compared with
+    the built gate bodies of the second world.
+
+    The rotation of the reset gate bodies is calculated by
+    calc_gate_rotation(), while the built bodies are turned by the XODE
+    loader from their euler angles. A sign mix-up between the two would
+    leave reset gates mirrored from built gates.
+
+    The program exits with an error if any position or rotation differs by
+    more than the tolerance.
+"""
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-s', '--seeds', type=int, nargs=2, default=[1, 2],
+            help='test article seeds of the reset and built worlds')
+    parser.add_argument('-t', '--tolerance', type=float, default=1.0e-9,
+            help='largest position [m] or rotation matrix element error')
+    args = parser.parse_args()
+
+    seed_reset, seed_built = args.seeds
+
+    env_reset = load_environment(seed_reset)
+    env_built = load_environment(seed_built)
+
+    env_reset.reset_test_article(seed=seed_built)
+
+    top_table = models.calc_table_top()
+    layout = models.get_gate_layout(randomize=True, seed=seed_built)
+
+    pos_error = 0.0
+    rot_error = 0.0
+
+    for gate_idx in range(constants.G_NUM_GATES):
+        for body_args in models.calc_gate_bodies(gate_idx, top_table,
+                layout[gate_idx]):
+            name = body_args['bname']
+
+            body_reset = env_reset.get_body_by_name(name)
+            body_built = env_built.get_body_by_name(name)
+
+            pos_error = max(pos_error, np.max(np.abs(
+                    np.subtract(body_reset.getPosition(),
+                    body_built.getPosition()))))
+
+            rot_error = max(rot_error, np.max(np.abs(
+                    np.subtract(body_reset.getRotation(),
+                    body_built.getRotation()))))
+
+    print('Gates: %d, seeds: %d (reset), %d (built)' %
+            (constants.G_NUM_GATES, seed_reset, seed_built))
+    print('Position error max: %e [m], rotation error max: %e' %
+            (pos_error, rot_error))
+
+    if pos_error > args.tolerance or rot_error > args.tolerance:
+        print('>>> FAILED: reset gates differ from built gates')
+        raise SystemExit(1)
+
+    print('>>> PASSED: reset gates match built gates')
+
+    return
+
+
+def load_environment(seed):
+    """Load Environment
+
+    Loads a world of randomized test article gates without a viewer.
+
+    Arguments:
+        seed: The random seed of the test article gates.
+
+    Returns:
+        The EnvironmentInterface object of the world.
+    """
+    xode_filename = worldcache.get_world_file(TrainingSimWorld,
+            randomize_test_article=True, seed=seed)
+
+    return EnvironmentInterface(xode_filename=xode_filename, render=False,
+            realtime=False, gravity=constants.G_ENVIRONMENT_GRAVITY)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+import os
+import time
+import argparse
+
+import numpy as np
+
+import surgicalsim.lib.constants as constants
+import surgicalsim.lib.pathutils as pathutils
+
+"""
+NOTES:
+
+    This program checks the gate accuracy of generated paths against a
+    baseline. The closest approach of every path to every gate is evaluated
+    in parallel over all path files.
+
+    Save a baseline of the per-gate mean closest approach with --save after
+    a known good training run. Later runs fail if the mean closest approach
+    of any gate grows by more than the tolerance.
+"""
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('paths', nargs='+',
+            help='path data files or directories of path data files')
+    parser.add_argument('-b', '--baseline', default=None,
+            help='baseline file of per-gate mean closest approaches')
+    parser.add_argument('-s', '--save', action='store_true',
+            help='save the results as the new baseline')
+    parser.add_argument('-t', '--tolerance', type=float, default=0.005,
+            help='allowed growth of each gate mean in [m]')
+    parser.add_argument('-p', '--processes', type=int, default=None,
+            help='number of worker processes')
+    args = parser.parse_args()
+
+    path_files = []
+
+    for name in args.paths:
+        if os.path.isdir(name):
+            path_files.extend(sorted(pathutils.list_data_files(name)))
+        else:
+            path_files.append(name)
+
+    t_start = time.time()
+    distances, summary = pathutils.evaluate_accuracy(path_files,
+            processes=args.processes)
+    t_run = time.time() - t_start
+
+    print('Evaluated %d paths in %f [s]' % (len(path_files), t_run))
+
+    for gate_idx in range(constants.G_NUM_GATES):
+        print('Gate %d, Mean: %f [m], Std: %f [m], Max: %f [m]' %
+                (gate_idx, summary['gate_mean'][gate_idx],
+                summary['gate_std'][gate_idx], summary['gate_max'][gate_idx]))
+
+    print('Overall mean: %f [m]' % summary['mean'])
+
+    worst = np.argmax(summary['path_mean'])
+    print('Worst path: %s (%f [m])' % (path_files[worst],
+            summary['path_mean'][worst]))
+
+    if args.baseline is None:
+        return
+
+    if args.save:
+        np.savetxt(args.baseline, summary['gate_mean'])
+        print('>>> Saved baseline to %s' % args.baseline)
+        return
+
+    baseline = np.loadtxt(args.baseline)
+    growth = summary['gate_mean'] - baseline
+
+    failed = np.flatnonzero(growth > args.tolerance)
+
+    for gate_idx in failed:
+        print('>>> Gate %d mean grew by %f [m]' % (gate_idx, growth[gate_idx]))
+
+    if len(failed):
+        print('>>> FAILED: accuracy regression against %s' % args.baseline)
+        raise SystemExit(1)
+
+    print('>>> PASSED: no accuracy regression against %s' % args.baseline)
+
+    return
+
+
+if __name__ == '__main__':
+    main()
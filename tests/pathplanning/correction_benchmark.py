@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+
+import time
+import argparse
+
+import numpy as np
+
+import surgicalsim.lib.constants as constants
+import surgicalsim.lib.pathutils as pathutils
+
+"""
+NOTES:
+
+    This program benchmarks the path correction kernel on a long synthetic
+    path. The tooltip sweeps past each gate in turn while every gate
+    oscillates vertically.
+
+    The whole path is corrected offline with correct_path() and again step
+    by step with correct_step(), as done by the NeuralSim event loop. Both
+    must give the same corrected path. The segments of the synthetic path
+    are known, so segment detection is not part of the benchmark.
+"""
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--steps', type=int, default=100000,
+            help='number of path steps')
+    args = parser.parse_args()
+
+    dt = 1.0 / constants.G_ENVIRONMENT_FPS
+
+    path, gate_positions, segments = generate_path(args.steps, dt)
+
+    # Offline correction into a preallocated array
+    out = np.empty((len(path), constants.G_NUM_POS_DIMS))
+
+    t_start = time.time()
+    pathutils.correct_path(path, gate_positions, dt, segments=segments,
+            out=out)
+    t_offline = time.time() - t_start
+
+    # Streaming correction, one step at a time
+    t_start = time.time()
+    streamed = correct_streaming(path, gate_positions, segments, dt)
+    t_streaming = time.time() - t_start
+
+    print('Steps: %d' % args.steps)
+    print('Offline: %f [s] (%f [us/step])' %
+            (t_offline, 1.0e6 * t_offline / args.steps))
+    print('Streaming: %f [s] (%f [us/step])' %
+            (t_streaming, 1.0e6 * t_streaming / args.steps))
+    print('Max difference: %e [m]' % np.max(np.abs(out - streamed)))
+
+    return
+
+
+def generate_path(num_steps, dt):
+    """Generate Path
+
+    Generates a path of a tooltip sweeping past each gate and the motion of
+    the oscillating gates.
+
+    Arguments:
+        num_steps: The number of path steps.
+        dt: The time of each step in [s].
+
+    Returns:
+        A tuple of the path data of size (num_steps+1, columns), the gate
+        positions of size (num_steps+1, G_NUM_GATES, 3), and the segment
+        end indices.
+    """
+    num_cols = constants.G_TOTAL_NUM_INPUTS + constants.G_TOTAL_NUM_OUTPUTS
+    path = np.zeros((num_steps + 1, num_cols))
+
+    t = np.arange(num_steps + 1) * dt
+    path[:,constants.G_TIME_IDX] = t
+
+    # Gates are spread along the x-axis
+    num_gates = constants.G_NUM_GATES
+    gates = np.zeros((num_gates, 3))
+    gates[:,0] = np.linspace(-0.2, 0.2, num_gates)
+    gates[:,1] = 0.1
+
+    for gate_idx in range(num_gates):
+        pathutils.set_path_gate_pos(path, slice(None), gate_idx,
+                gates[gate_idx])
+
+    # The tooltip sweeps along the gates with a small weave
+    s = np.linspace(0.0, 1.0, num_steps + 1)
+    tooltip = np.zeros((num_steps + 1, 3))
+    tooltip[:,0] = -0.2 + 0.4 * s
+    tooltip[:,1] = 0.1 + 0.01 * np.sin(2.0 * np.pi * 50.0 * s)
+    tooltip[:,2] = 0.01 * np.cos(2.0 * np.pi * 50.0 * s)
+
+    pos_start_idx = constants.G_POS_IDX
+    path[:,pos_start_idx:pos_start_idx+constants.G_NUM_POS_DIMS] = tooltip
+
+    # Every gate oscillates vertically
+    gate_positions = np.tile(gates, (num_steps + 1, 1, 1))
+    gate_positions[:,:,1] += 0.02 * np.sin(2.0 * np.pi * 0.2 * t)[:, np.newaxis]
+
+    # The tooltip passes each gate at the end of its segment
+    segments = [int(np.argmin(np.abs(tooltip[:,0] - x))) for x in gates[:,0]]
+    segments[-1] = num_steps
+
+    return path, gate_positions, segments
+
+
+def correct_streaming(path, gate_positions, segments, dt):
+    """Correct Streaming
+
+    Corrects the path one step at a time with correct_step().
+
+    Arguments:
+        path: The path data.
+        gate_positions: The gate positions at each step.
+        segments: The segment end indices of the path.
+        dt: The time of each step in [s].
+
+    Returns:
+        A numpy array of size (T, 3) of the corrected tooltip positions.
+    """
+    out = np.empty((len(path), constants.G_NUM_POS_DIMS))
+    out[0] = pathutils.get_path_tooltip_pos(path, 0)
+
+    x_offset = np.zeros(3)
+    v_curr = np.zeros(3)
+
+    seg_idx = 0
+
+    for idx in range(len(path) - 1):
+        while idx > segments[seg_idx]:
+            seg_idx += 1
+
+        x_gate_expected = pathutils.get_path_gate_pos(path, segments[seg_idx],
+                seg_idx)
+
+        out[idx+1], v_curr, x_offset = pathutils.correct_step(
+                pathutils.get_path_tooltip_pos(path, idx),
+                pathutils.get_path_tooltip_pos(path, idx+1),
+                x_gate_expected,
+                gate_positions[idx, seg_idx],
+                x_offset,
+                v_curr,
+                dt
+        )
+
+    return out
+
+
+if __name__ == '__main__':
+    main()
@@ -14,88 +14,12 @@ def main():
     path_file = '../../neuralsim/generated.dat'#'../../results/sample5.dat'
     path = datastore.retrieve(path_file)
 
-    # A list of the the segments of the optimized path
-    segments = pathutils._detect_segments(path)
+    # Get the time of each step
+    t = path[:,constants.G_TIME_IDX] * t_total
+    dt = np.diff(t)
 
-    # The new path generated by original path and corrective algorithm
-    new_path = None
-
-    x_path_offset = np.array([0.0, 0.0, 0.0]) # [m]
-    v_curr = np.array([0.0, 0.0, 0.0]) # [m/s]
-    a_max = constants.G_MAX_ACCEL # [m/s^2]
-
-    for i, _ in enumerate(path):
-        if i == len(path) - 1:
-            continue
-
-        # Detect current segment
-        seg_idx = 0
-
-        for j in range(len(segments)):
-            if i <= segments[j]:
-                seg_idx = j
-                break
-
-        # Get current time and position
-        t_curr = pathutils.get_path_time(path, i) * t_total
-        t_next = pathutils.get_path_time(path, i+1) * t_total
-
-        dt = (t_next - t_curr)
-
-        x_curr = pathutils.get_path_tooltip_pos(path, i) + x_path_offset
-        x_next = pathutils.get_path_tooltip_pos(path, i+1) + x_path_offset
-
-        # Get the expected gate position at this timestep
-        x_gate_expected = pathutils.get_path_gate_pos(path, segments[seg_idx], seg_idx)
-
-        # Get current gate position
-        x_gate_actual = generate_gate_pos(t_curr, path, seg_idx)
-
-        dx_gate = x_gate_actual - (x_gate_expected + x_path_offset)
-
-        # Calculate the new position with positional change from target to gate
-        x_new = x_next + dx_gate
-
-        # Calculate the new velocity
-        v_new = (x_new - x_curr) / dt
-
-        # Calculate the new acceleration
-        a_new = (v_new - v_curr) / dt
-
-        # Calculate the acceleration vector norm
-        a_new_norm = np.linalg.norm(a_new)
-
-        # Limit the norm vector
-        a_new_norm_clipped = np.clip(a_new_norm, -a_max, a_max)
-
-        # Determine the ratio of the clipped norm
-        if a_new_norm != 0:
-            ratio_unclipped = a_new_norm_clipped / a_new_norm
-        else:
-            ratio_unclipped = 0.0
-
-        # Scale the acceleration vector by this ratio
-        a_new = a_new * ratio_unclipped
-
-        # Calculate the new change in velocity
-        dv_new = a_new * dt
-        v_new = v_curr + dv_new
-
-        # Calculate the new change in position
-        dx_new = v_new * dt
-        x_new = x_curr + dx_new
-
-        # Store the next movement for later
-        if new_path is None:
-            new_path = x_new
-        else:
-            new_path = np.vstack((new_path, x_new))
-
-        # Store this velocity for the next time step
-        v_curr = v_new
-
-        # Recalculate the current offset
-        x_path_offset += x_new - x_next 
+    # Correct the path for the moving gates
+    new_path = pathutils.correct_path(path, generate_gate_pos(t, path), dt)
 
     # Plot the inputted path
     fig = plt.figure(facecolor='white')
@@ -104,7 +28,7 @@ def main():
     pos_start_idx = constants.G_POS_IDX
     pos_end_idx = pos_start_idx + constants.G_NUM_POS_DIMS
 
-    full_path = path[:-1].copy()
+    full_path = path.copy()
     full_path[:,pos_start_idx:pos_end_idx] = new_path
 
     pathutils.display_path(axis, full_path, title='Path')
@@ -114,14 +38,27 @@ def main():
     return
 
 
-def generate_gate_pos(t, path, segment_num):
-    gate_start_col = constants.G_GATE_IDX+(constants.G_NUM_GATE_DIMS*segment_num)
-    gate_end_col = gate_start_col + constants.G_NUM_POS_DIMS
+def generate_gate_pos(t, path):
+    """Generate Gate Position
+
+    Oscillates every gate vertically about its position at the start of the
+    path.
+
+    Arguments:
+        t: A numpy array of size (T) of the time of each step in [s].
+        path: The path data.
+
+    Returns:
+        A numpy array of size (T, G_NUM_GATES, 3) of the gate positions.
+    """
+    gate_cols = (constants.G_GATE_IDX +
+            constants.G_NUM_GATE_DIMS * np.arange(constants.G_NUM_GATES)[:, np.newaxis] +
+            np.arange(constants.G_NUM_POS_DIMS))
 
-    gate_pos = path[0,gate_start_col:gate_end_col].copy()
+    gate_pos = np.tile(path[0,gate_cols], (len(t), 1, 1))
 
     f = 4.0
-    gate_pos += np.array([0.0, 0.02*np.sin(2.0*np.pi*f*t/t_total), 0.0])
+    gate_pos[:,:,1] += 0.02*np.sin(2.0*np.pi*f*t/t_total)[:, np.newaxis]
 
     return gate_pos
 
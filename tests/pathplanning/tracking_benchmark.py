@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+
+import argparse
+
+import numpy as np
+
+import surgicalsim.lib.constants as constants
+import surgicalsim.lib.pathutils as pathutils
+
+from surgicalsim.lib.disturbance import Disturbance
+from surgicalsim.lib.scheduler import FrameScheduler
+from surgicalsim.lib.predictor import predict_trajectory
+
+"""
+NOTES:
+
+    This program compares the tracking error of the reactive and predictive
+    path corrections on a synthetic path. The tooltip sweeps past each gate
+    in turn while the table (and every gate) moves along a disturbance.
+
+    The reactive correction aims each step at the gate positions of the
+    step before it, so it lags moving gates. The predictive correction aims
+    at the gate positions predicted online from the gate positions so far.
+    Both are limited to the same acceleration.
+
+    Each case is run with evenly spaced steps and with the frame timing of
+    the simulators, where each frame is a whole number of physics steps
+    (16 or 17 steps at 60 [Hz] frames and 1000 [Hz] physics).
+"""
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--steps', type=int, default=6000,
+            help='number of path steps')
+    parser.add_argument('-a', '--amp', type=float,
+            default=constants.G_TABLE_OSCILLATION_AMP,
+            help='disturbance amplitude [m]')
+    parser.add_argument('-f', '--freq', type=float, nargs='+',
+            default=[constants.G_TABLE_OSCILLATION_FREQ],
+            help='disturbance frequencies [Hz]')
+    parser.add_argument('--a-max', type=float, nargs='+',
+            default=[constants.G_MAX_ACCEL],
+            help='tooltip acceleration limits [m/s^2]')
+    args = parser.parse_args()
+
+    frame_dt = 1.0 / constants.G_ENVIRONMENT_FPS
+
+    timings = (
+        ('uniform', np.ones(args.steps) * frame_dt),
+        ('frames', get_frame_times(args.steps)),
+    )
+
+    # A vertical multi-sine of the given frequencies
+    disturbance = Disturbance.multi_sine(args.steps * frame_dt * 1.1,
+            [(args.amp / len(args.freq), freq, 0.0, 1) for freq in args.freq])
+
+    print('Steps: %d, frequencies: %s [Hz], amplitude: %f [m]' %
+            (args.steps, ', '.join('%g' % freq for freq in args.freq),
+            args.amp))
+    print('%-10s %-10s %-10s %12s %12s %12s %12s' % ('timing', 'a_max',
+            'mode', 'mean [mm]', 'rms [mm]', 'p95 [mm]', 'max [mm]'))
+
+    for timing, dt in timings:
+        path, gate_positions, segments = generate_path(dt, disturbance)
+
+        predicted = predict_trajectory(gate_positions,
+                steps=constants.G_PREDICTOR_HORIZON, dt=dt)
+
+        for a_max in args.a_max:
+            for mode, aims in (('reactive', gate_positions),
+                    ('predictive', predicted)):
+                corrected = pathutils.correct_path(path, aims, dt,
+                        a_max=a_max, segments=segments)
+
+                _, summary = pathutils.evaluate_tracking(path, corrected,
+                        gate_positions, segments=segments)
+
+                print('%-10s %-10g %-10s %12.4f %12.4f %12.4f %12.4f' %
+                        (timing, a_max, mode, 1.0e3 * summary['mean'],
+                        1.0e3 * summary['rms'], 1.0e3 * summary['p95'],
+                        1.0e3 * summary['max']))
+
+    return
+
+
+def get_frame_times(num_steps):
+    """Get Frame Times
+
+    Calculates the time of each frame as handed out by the frame scheduler
+    of the simulators, in whole physics steps.
+
+    Arguments:
+        num_steps: The number of frames.
+
+    Returns:
+        A numpy array of size (num_steps) of the frame times in [s].
+    """
+    scheduler = FrameScheduler(constants.G_ENVIRONMENT_FPS,
+            physics_fps=constants.G_PHYSICS_FPS)
+
+    return np.array([scheduler.tick() * scheduler.physics_dt
+            for _ in range(num_steps)])
+
+
+def generate_path(dt, disturbance):
+    """Generate Path
+
+    Generates a path of a tooltip sweeping past each gate and the motion of
+    the disturbed gates.
+
+    Arguments:
+        dt: The numpy array of size (num_steps) of the time of each step in
+            [s].
+        disturbance: The Disturbance object of the gate motion.
+
+    Returns:
+        A tuple of the path data of size (num_steps+1, columns), the gate
+        positions of size (num_steps+1, G_NUM_GATES, 3), and the segment
+        end indices.
+    """
+    num_steps = len(dt)
+
+    num_cols = constants.G_TOTAL_NUM_INPUTS + constants.G_TOTAL_NUM_OUTPUTS
+    path = np.zeros((num_steps + 1, num_cols))
+
+    t = np.concatenate(([0.0], np.cumsum(dt)))
+    path[:,constants.G_TIME_IDX] = t
+
+    # Gates are spread along the x-axis
+    num_gates = constants.G_NUM_GATES
+    gates = np.zeros((num_gates, 3))
+    gates[:,0] = np.linspace(-0.2, 0.2, num_gates)
+    gates[:,1] = 0.1
+
+    for gate_idx in range(num_gates):
+        pathutils.set_path_gate_pos(path, slice(None), gate_idx,
+                gates[gate_idx])
+
+    # The tooltip sweeps along the gates with a small weave
+    s = t / t[-1]
+    tooltip = np.zeros((num_steps + 1, 3))
+    tooltip[:,0] = -0.2 + 0.4 * s
+    tooltip[:,1] = 0.1 + 0.01 * np.sin(2.0 * np.pi * 5.0 * s)
+    tooltip[:,2] = 0.01 * np.cos(2.0 * np.pi * 5.0 * s)
+
+    pos_start_idx = constants.G_POS_IDX
+    path[:,pos_start_idx:pos_start_idx+constants.G_NUM_POS_DIMS] = tooltip
+
+    gate_positions = disturbance.displace(gates, t)
+
+    # The tooltip passes each gate at the end of its segment
+    segments = [int(np.argmin(np.abs(tooltip[:,0] - x))) for x in gates[:,0]]
+    segments[-1] = num_steps
+
+    return path, gate_positions, segments
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+import os
+import time
+import struct
+import argparse
+
+import numpy as np
+
+import surgicalsim.lib.constants as constants
+
+from surgicalsim.trainingsim.simulation import TrainingSimulation
+
+"""
+NOTES:
+
+    This program benchmarks the TrainingSim capture loop end-to-end. A
+    recorded Phantom Omni packet log is replayed headless and as fast as
+    possible, so each run processes exactly the same controller input.
+
+    Packet logs are recorded by running TrainingSim with the --record flag.
+    If no log is available, a sinusoidal log (matching oscillation_tcp_sim.py)
+    can be generated with the --generate flag.
+
+    The world model is generated on the first run and reused from the world
+    cache afterwards, so model generation is not part of the benchmark.
+"""
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('log', help='packet log to replay')
+    parser.add_argument('-g', '--generate', type=float, default=None,
+            help='generate a sinusoidal packet log of this many seconds')
+    parser.add_argument('-n', '--runs', type=int, default=3,
+            help='number of benchmark runs')
+    args = parser.parse_args()
+
+    if args.generate is not None:
+        generate_log(args.log, args.generate)
+
+    if not os.path.exists(args.log):
+        print('>>> Packet log %s does not exist' % args.log)
+        return
+
+    run_times = []
+
+    for run in range(args.runs):
+        sim = TrainingSimulation(replay=args.log, headless=True,
+                realtime=False)
+
+        t_start = time.time()
+        sim.start(fps=constants.G_ENVIRONMENT_FPS)
+        t_run = time.time() - t_start
+
+        num_frames = len(sim.saved_data)
+        run_times.append(t_run)
+
+        print('Run %d: %d frames in %f [s] (%f [ms/frame])' %
+                (run, num_frames, t_run, 1000.0 * t_run / num_frames))
+
+        del sim
+
+    print('Best run: %f [s]' % min(run_times))
+    print('Mean run: %f [s]' % np.mean(run_times))
+
+    return
+
+
+def generate_log(filename, duration):
+    """Generate Log
+
+    Writes a packet log containing a sinusoidal controller motion sampled at
+    the simulation frame rate.
+
+    Arguments:
+        filename: The packet log file to create.
+        duration: The length of the log in seconds.
+    """
+    dt = 1.0 / constants.G_ENVIRONMENT_FPS
+
+    with open(filename, 'wb') as f:
+        for t in np.arange(0.0, duration, dt):
+            pos = calc_oscillation(t)
+
+            f.write(struct.pack(constants.G_CONTROLLER_LOG_FMT, t))
+            f.write(struct.pack(
+                constants.G_CONTROLLER_MSG_FMT,
+                False,                  # docked
+                0,                      # buttons
+                pos[0], pos[1], pos[2], # positions
+                0.0, 0.0, 0.0,          # angles
+                dt                      # dt
+            ))
+
+    return
+
+
+def calc_oscillation(t):
+    """Calculate Oscillation
+
+    Given a time in seconds, the position of the cursor is given with
+    amplitude and frequency hardcoded for each x, y, and z positions.
+    """
+    amp = np.array([0.15, 0.0, 0.15])
+    freq = np.array([1.0, 0.0, 2.0])
+
+    return amp * np.sin(2.0 * np.pi * freq * t)
+
+
+if __name__ == '__main__':
+    main()
@@ -13,13 +13,20 @@ License:
 
 Functions:
     parse_arguments: Parses incoming command line arguments.
+    write_timings: Prints and writes the simulation frame timings.
     process_path: Trims and normalizes input path data.
+    auto_process_path: Trims, rates, and normalizes input path data without
+        prompting.
+    process_directory: Processes all raw path files of a directory in
+        parallel without prompting.
     main: Initializes all objects and begins the main event loop.
 """
 
 
 # Import external modules
+import os
 import argparse
+import multiprocessing
 
 # Import application modules
 from simulation import TrainingSimulation
@@ -47,6 +54,10 @@ def parse_arguments():
             '-r', '--randomize', action='store_true',
             help='randomize test article gate position and orientation'
     )
+    parser.add_argument(
+            '-s', '--seed', action='store', type=int, default=None,
+            help='random seed of the randomized test article gates'
+    )
     parser.add_argument(
             '-c', '--controller', action='store_true',
             help='controller is non-local. ip/port info will be prompted'
@@ -55,12 +66,70 @@ def parse_arguments():
             '-o', '--outfile', action='store', default='out.dat',
             help='target file for the captured path data'
     )
+    parser.add_argument(
+            '-p', '--replay', action='store', default=None,
+            help='replay controller packets from a recorded packet log'
+    )
+    parser.add_argument(
+            '-w', '--record', action='store', default=None,
+            help='record all controller packets to a packet log'
+    )
+    parser.add_argument(
+            '-l', '--headless', action='store_true',
+            help='run without the viewer'
+    )
+    parser.add_argument(
+            '-f', '--fast', action='store_true',
+            help='disable real-time constraints (replay as fast as possible)'
+    )
+
+    parser.add_argument(
+            '-t', '--timings', action='store', default=None,
+            help='write per-frame phase timings to a file and print a summary'
+    )
+
+    parser.add_argument(
+            '-b', '--batch', action='store', default=None,
+            help='process all raw path files of a directory without '
+                 'prompting, then exit'
+    )
+    parser.add_argument(
+            '-d', '--batch-out', action='store', default=None,
+            help='target directory of batch processed path files '
+                 '(default: <batch>/processed)'
+    )
+    parser.add_argument(
+            '-j', '--processes', action='store', type=int, default=None,
+            help='number of batch processes (default: one per cpu)'
+    )
 
     args = parser.parse_args()
 
     return args
 
 
+def write_timings(sim, filename):
+    """Write Timings
+
+    Prints the frame phase timing summary of the last simulation event loop
+    and dumps the per-frame timings to a file.
+
+    Arguments:
+        sim: The simulation object.
+        filename: The file to write the per-frame timings.
+    """
+    if sim is None or sim.profiler is None:
+        return
+
+    print(sim.profiler.report())
+    print(sim.scheduler.report())
+
+    print('>>> Writing frame timings to %s' % filename)
+    sim.profiler.dump(filename)
+
+    return
+
+
 def process_path(data):
     """Process Path
 
@@ -89,6 +158,160 @@ def process_path(data):
     return data
 
 
+def auto_process_path(data, ratings=None, scorer=pathutils.score_segments):
+    """Auto Process Path
+
+    Processes raw data from TrainingSim as process_path() does, without
+    prompting. The idle start and end of the path are trimmed by tooltip
+    velocity, and the segments are rated by the given ratings or else by
+    the scoring function.
+
+    Arguments:
+        data: Raw numpy data array from the TrainingSim application.
+        ratings: A list of segment ratings (1 to 5). If None, the segments
+            are scored. (Default: None)
+        scorer: The function of (data, segment ends) which returns the
+            segment ratings. (Default: pathutils.score_segments)
+
+    Returns:
+        Processed numpy data array that is trimmed and time-normalized.
+    """
+    # Trim the idle start and end of the path
+    data = pathutils.auto_trim_path(data)
+
+    # Zero out the trimmed time data
+    data = pathutils.zero_time(data)
+
+    # The segments are detected once for scoring and rating
+    segment_ends = pathutils.detect_segments(data)
+
+    if ratings is None:
+        ratings = scorer(data, segment_ends)
+
+    data = pathutils.apply_ratings(data, ratings, segment_ends)
+
+    # Snap the starting position to the starting marker
+    data = pathutils.fix_starting_pos(data)
+
+    return data
+
+
+def process_directory(in_dir, out_dir=None, processes=None,
+        scorer=pathutils.score_segments):
+    """Process Directory
+
+    Processes every raw path file of a directory without prompting. Files
+    are processed in parallel worker processes and reported as each one
+    finishes. Segment ratings are read from a ratings file beside the raw
+    file (named with the G_RATING_FILE_EXT extension) if one exists, else
+    the segments are scored. Files whose processed file is newer than both
+    the raw file and its ratings file are skipped.
+
+    Arguments:
+        in_dir: The directory of raw path files.
+        out_dir: The directory of processed path files. Must not be the
+            raw directory. (Default: <in_dir>/processed)
+        processes: The number of worker processes. If None, one per CPU is
+            used. (Default: None)
+        scorer: The segment scoring function. Must be a module level
+            function so it can be sent to the workers.
+            (Default: pathutils.score_segments)
+
+    Returns:
+        A tuple of the number of files processed, skipped, and failed.
+    """
+    if out_dir is None:
+        out_dir = os.path.join(in_dir, 'processed')
+
+    if os.path.abspath(out_dir) == os.path.abspath(in_dir):
+        raise ValueError('Processed files would replace the raw files')
+
+    if not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
+
+    jobs = []
+    num_skipped = 0
+
+    for raw_filename in sorted(pathutils.list_data_files(in_dir)):
+        out_filename = os.path.join(out_dir, os.path.basename(raw_filename))
+        ratings_filename = os.path.splitext(raw_filename)[0] + \
+                constants.G_RATING_FILE_EXT
+
+        if not os.path.exists(ratings_filename):
+            ratings_filename = None
+
+        inputs = [raw_filename]
+
+        if ratings_filename is not None:
+            inputs.append(ratings_filename)
+
+        if os.path.exists(out_filename) and os.path.getmtime(out_filename) >= \
+                max(os.path.getmtime(filename) for filename in inputs):
+            num_skipped += 1
+            continue
+
+        jobs.append((raw_filename, ratings_filename, out_filename, scorer))
+
+    num_processed = 0
+    num_failed = 0
+
+    if not len(jobs):
+        return num_processed, num_skipped, num_failed
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+
+    pool = multiprocessing.Pool(max(1, min(processes, len(jobs))))
+
+    try:
+        # Results are reported in order of completion
+        for raw_filename, error in pool.imap_unordered(_process_file, jobs):
+            if error is None:
+                print('>>> Processed %s' % raw_filename)
+                num_processed += 1
+            else:
+                print('>>> Failed %s: %s' % (raw_filename, error))
+                num_failed += 1
+    finally:
+        pool.close()
+        pool.join()
+
+    return num_processed, num_skipped, num_failed
+
+
+def _process_file(job):
+    """Process File
+
+    Worker of process_directory(). Loads, processes, and stores a single
+    raw path file.
+
+    Arguments:
+        job: A tuple of (raw filename, ratings filename or None, processed
+            filename, scorer).
+
+    Returns:
+        A tuple of the raw filename and the error message, or None if the
+        file was processed.
+    """
+    raw_filename, ratings_filename, out_filename, scorer = job
+
+    # A bad capture must not stop the rest of the batch
+    try:
+        ratings = None
+
+        if ratings_filename is not None:
+            ratings = pathutils.load_ratings(ratings_filename)
+
+        path = auto_process_path(datastore.retrieve(raw_filename),
+                ratings=ratings, scorer=scorer)
+
+        datastore.store(path, out_filename)
+    except Exception as e:
+        return raw_filename, str(e)
+
+    return raw_filename, None
+
+
 def main():
     """Main
 
@@ -97,18 +320,42 @@ def main():
     """
     args = parse_arguments()
 
+    if args.batch is not None:
+        print('>>> Processing raw path files in %s' % args.batch)
+        counts = process_directory(args.batch, out_dir=args.batch_out,
+                processes=args.processes)
+
+        print('>>> %d processed, %d up to date, %d failed' % counts)
+
+        return
+
     sim = None
     
     try:
         # Initialize all module of the simulation
         print('>>> Initializing...')
-        sim = TrainingSimulation(args.randomize, args.controller, args.verbose)
+        sim = TrainingSimulation(args.randomize, args.controller, args.verbose,
+                replay=args.replay, record=args.record,
+                headless=args.headless, realtime=not args.fast,
+                seed=args.seed)
 
         # Continue to execute the main simulation loop
         print('>>> Running... (ctrl+c or q to exit)')
         sim.start(fps=constants.G_ENVIRONMENT_FPS)
+
+        if args.timings is not None:
+            write_timings(sim, args.timings)
+
+        if args.replay is not None and len(sim.saved_data):
+            # The packet log is exhausted. Store the raw path data since the
+            # replay may be unattended
+            print('>>> Writing raw path data to %s' % args.outfile)
+            datastore.store(sim.saved_data, args.outfile)
     except KeyboardInterrupt as e:
         # Except the keyboard interrupt as the valid way of leaving the loop
+        if args.timings is not None:
+            write_timings(sim, args.timings)
+
         if sim is not None and len(sim.saved_data):
             print('\n>>> Processing path data...')
             path = process_path(sim.saved_data)
@@ -17,8 +17,6 @@ Classes:
 
 
 # Import external modules
-import os
-import time
 import numpy as np
 
 # Import application modules
@@ -26,10 +24,15 @@ from world import TrainingSimWorld
 
 # Import surgicalsim modules
 import surgicalsim.lib.constants as constants
+import surgicalsim.lib.worldcache as worldcache
 
 from surgicalsim.lib.environment import EnvironmentInterface
 from surgicalsim.lib.controller import PhantomOmniInterface
+from surgicalsim.lib.controller import PhantomOmniReplayInterface
 from surgicalsim.lib.viewer import ViewerInterface
+from surgicalsim.lib.profiler import FrameProfiler
+from surgicalsim.lib.scheduler import FrameScheduler
+from surgicalsim.lib.pathdata import Path, PathRecorder
 
 
 class TrainingSimulation(object):
@@ -42,8 +45,13 @@ class TrainingSimulation(object):
     Attributes:
         env: The Open Dynamics Engine environment.
         omni: The Phantom Omni robotic controller connection.
-        viewer: The OpenGL viewer for the ODE environment.
-        saved_data: A list of tuples containing data from the simulation.
+        viewer: The OpenGL viewer for the ODE environment. None if headless.
+        saved_data: The numpy array of the path data captured by the
+            simulation.
+        recorder: The path recorder of the captured data.
+        realtime: Determines if real-time constraints are enforced.
+        profiler: The frame profiler of the most recent event loop.
+        scheduler: The frame scheduler of the most recent event loop.
 
     Methods:
         start: Begins the main event loop.
@@ -51,9 +59,13 @@ class TrainingSimulation(object):
     env = None
     omni = None
     viewer = None
-    saved_data = None
+    recorder = None
+    profiler = None
+    scheduler = None
 
-    def __init__(self, randomize=False, network=False, verbose=False):
+    def __init__(self, randomize=False, network=False, verbose=False,
+            replay=None, record=None, headless=False, realtime=True,
+            seed=None):
         """Initialize
 
         Creates the environment, viewer, and (Phantom Omni) controller objects
@@ -66,24 +78,42 @@ class TrainingSimulation(object):
                 (Default: False)
             verbose: Determines the level out debug output generated.
                 (Default: False)
+            replay: A packet log filename to replay in place of a connected
+                Phantom Omni controller. (Default: None)
+            record: A packet log filename to which all controller packets
+                are recorded. (Default: None)
+            headless: If True, no viewer is started and no body information
+                is sent to viewer clients. (Default: False)
+            realtime: If False, real-time constraints are not enforced and
+                a replayed packet log is stepped through as fast as possible.
+                (Default: True)
+            seed: The random seed of the randomized test article gates. If
+                None, a seed is chosen at random. (Default: None)
         """
-        # Generate the XODE file
-        XODE_FILENAME = 'model' # .xode is appended automatically
-
+        # Generate the XODE file. Worlds with the same inputs are generated
+        # once and shared through the world cache
         print('>>> Generating world model')
-        if os.path.exists('./'+XODE_FILENAME+'.xode'):
-            os.remove('./'+XODE_FILENAME+'.xode')
 
-        xode_model = TrainingSimWorld(
-                name=XODE_FILENAME,
-                randomize_test_article=randomize
+        # A randomized test article is reproducible (and cached) by its seed
+        if randomize and seed is None:
+            seed = np.random.randint(0, 2**31 - 1)
+
+        if randomize:
+            print('>>> Test article seed: %d' % seed)
+        else:
+            seed = None
+
+        xode_filename = worldcache.get_world_file(
+                TrainingSimWorld,
+                randomize_test_article=randomize,
+                seed=seed
         )
-        xode_model.generate()
 
         # Start environment
         print('>>> Starting environment')
         self.env = EnvironmentInterface(
-                xode_filename='./'+XODE_FILENAME+'.xode',
+                xode_filename=xode_filename,
+                render=not headless,
                 realtime=False,
                 verbose=verbose,
                 gravity=constants.G_ENVIRONMENT_GRAVITY
@@ -95,34 +125,64 @@ class TrainingSimulation(object):
         }
 
         # Start viewer
-        print('>>> Starting viewer')
-        self.viewer = ViewerInterface(verbose=verbose)
-        self.viewer.start()
+        if not headless:
+            print('>>> Starting viewer')
+            self.viewer = ViewerInterface(verbose=verbose)
+            self.viewer.start()
+
+        self.realtime = realtime
 
         # Start controller
-        print('>>> Starting Phantom Omni interface')
-        self.omni = PhantomOmniInterface()
+        if replay is not None:
+            print('>>> Replaying Phantom Omni packets from %s' % replay)
+            self.omni = PhantomOmniReplayInterface(replay, realtime=realtime)
 
-        if network:
-            ip = raw_input('<<< Enter host ip: ')
-            port = int(raw_input('<<< Enter tcp port: '))
+            ip = None
+            port = None
         else:
-            ip = constants.G_IP_LOCAL_DEFAULT
-            port = constants.G_PORT_DEFAULT
+            print('>>> Starting Phantom Omni interface')
+            self.omni = PhantomOmniInterface()
+
+            if network:
+                ip = raw_input('<<< Enter host ip: ')
+                port = int(raw_input('<<< Enter tcp port: '))
+            else:
+                ip = constants.G_IP_LOCAL_DEFAULT
+                port = constants.G_PORT_DEFAULT
 
         # Try to connect to the Phantom Omni controller
         self.omni.connect(ip, port)
 
-        self.saved_data = np.array([])
+        if record is not None:
+            print('>>> Recording Phantom Omni packets to %s' % record)
+            self.omni.start_recording(record)
+
+        # The gates of the training test article are static, so their
+        # rotations are written once into every sample of the recorder
+        template = Path.empty(1, rating=False)
+        template.gates[0,:,constants.G_NUM_POS_DIMS] = \
+                constants.G_GATE_NORM_ROT
+
+        self.recorder = PathRecorder(template=template.data[0])
 
         return
 
+    @property
+    def saved_data(self):
+        """Saved Data
+
+        Returns:
+            The numpy array of the path data captured by the simulation.
+        """
+        return self.recorder.get_path().data
+
     def start(self, fps):
         """Start
 
         Begin the continuous event loop for the simulation. This event loop
-        can be exited using the ctrl+c keyboard interrupt. Real-time
-        constraints are enforced.
+        can be exited using the ctrl+c keyboard interrupt or ends when a
+        replayed packet log is exhausted. Real-time constraints are enforced
+        unless the simulation was created with realtime set to False.
 
         Arguments:
             fps: The value of frames per second of the simulation.
@@ -130,55 +190,74 @@ class TrainingSimulation(object):
         paused = False
         stopped = False
 
-        # Define the simulation frame rate
-        t = 0.0
-        dt = 1.0 / float(fps) # [s]
+        # Pace the frames against a monotonic clock. Each frame is divided
+        # into fixed physics sub-steps
+        self.scheduler = FrameScheduler(fps,
+                physics_fps=constants.G_PHYSICS_FPS)
 
-        # Keep track of time overshoot in the case that simulation time must be
-        # increased in order to maintain real-time constraints
-        t_overshoot = 0.0
+        self.env.set_dt(self.scheduler.physics_dt)
 
-        while not stopped:
-            t_start = time.time()
+        # Time each phase of every frame against the frame time budget
+        self.profiler = FrameProfiler(budget=self.scheduler.frame_dt)
+
+        gate_names = ['gate%d' % gate_idx
+                for gate_idx in range(constants.G_NUM_GATES)]
+        tooltip_name = ['tooltip']
+
+        # The gate positions are only read again once the gates move. Static
+        # gates are then read once
+        gate_pos = np.empty((constants.G_NUM_GATES, constants.G_NUM_POS_DIMS))
+        gate_versions = np.empty(constants.G_NUM_GATES, dtype=int)
+        gate_versions.fill(-1)
 
-            # If the last calculation took too long, catch up
-            dt_warped = dt + t_overshoot
+        self.scheduler.start()
 
-            self.env.set_dt(dt_warped)
-            self.omni.set_dt(dt_warped)
+        while not stopped:
+            self.profiler.start_frame()
 
             # Determine if the viewer is stopped. Then we can quit
-            if self.viewer.is_dead:
+            if self.viewer is not None and self.viewer.is_dead:
+                break
+
+            # A replayed controller has no more packets. Then we can quit
+            if self.omni.is_finished:
                 break
 
             if paused:
                 self.env.step(paused=True)
+
+                self.profiler.mark('ode')
+                self.profiler.end_frame()
                 continue
 
+            # Hand out the physics steps due this frame
+            t = self.scheduler.t
+            num_steps = self.scheduler.tick()
+
+            # The controller velocity must cover all steps of this frame
+            self.omni.set_dt(num_steps * self.scheduler.physics_dt)
+
             # Populate the controller with the most up-to-date data
             self.omni.update()
 
-            # Determine the input data to record
-            sample_input = np.array([
-                t,
-            ]).flatten()
+            self.profiler.mark('controller')
+
+            # Capture the time, gate positions, and tooltip position
+            # directly into the next recorded sample
+            sample_idx = self.recorder.next_index()
+            path = self.recorder.path
+
+            path.time[sample_idx] = t
 
-            # Capture the gate position at each time step
-            for gate_idx in range(constants.G_NUM_GATES):
-                gate_pos = np.array(self.env.get_body_pos('gate%d'%gate_idx)).flatten()
-                gate_rot = constants.G_GATE_NORM_ROT[gate_idx]
-                sample_input = np.hstack((sample_input, gate_pos, gate_rot))
+            self.env.update_body_positions(gate_names, gate_pos,
+                    gate_versions)
 
-            # Determine the output data to record
-            sample_output = np.array([
-                self.env.get_body_pos('tooltip'),
-            ]).flatten()
+            path.gate_pos[sample_idx] = gate_pos
 
-            # Join the sample input/output
-            data_sample = np.hstack((sample_input, sample_output))
+            self.env.get_body_positions(tooltip_name,
+                    out=path.tooltip[sample_idx:sample_idx+1])
 
-            # Save the data
-            self.save_data(data_sample)
+            self.profiler.mark('capture')
 
             # Get the updated linear/angular velocities of the tooltip
             linear_vel = self.omni.get_linear_vel()
@@ -188,39 +267,25 @@ class TrainingSimulation(object):
             self.env.set_group_linear_vel('pointer', linear_vel)
             self.env.set_group_angular_vel('pointer', angular_vel)
 
-            # Step through the world by 1 time frame
-            self.env.step()
+            self.profiler.mark('controller')
 
-            t += dt_warped
+            # Step through the world by 1 time frame
+            self.env.step(update_viewer=False, substeps=num_steps)
 
-            # Determine the difference in virtual vs actual time
-            t_warped = dt - (time.time() - t_start)
+            self.profiler.mark('ode')
 
-            # Attempt to enforce real-time constraints
-            if t_warped >= 0.0:
-                # The calculation took less time than the virtual time. Sleep
-                # the rest off
-                time.sleep(t_warped)
-                t_overshoot = 0.0
-            else:
-                # The calculation took more time than the virtual time. We need
-                # to catch up with the virtual time on the next time step
-                t_overshoot = -t_warped
+            self.env.update_viewer()
 
-        return
+            self.profiler.mark('viewer')
 
-    def save_data(self, data_sample):
-        """Save Data
+            if self.realtime:
+                # Sleep until the frame deadline. Missed deadlines are
+                # caught up according to the scheduler policy
+                self.scheduler.wait()
 
-        Saves a sample of data into the simulation's saved data array.
+                self.profiler.mark('sleep')
 
-        Arguments:
-            data_sample: A sample of input/output data from a single time step.
-        """
-        if len(self.saved_data):
-            self.saved_data = np.vstack((self.saved_data, data_sample))
-        else:
-            self.saved_data = data_sample.copy()
+            self.profiler.end_frame()
 
         return
 
@@ -36,7 +36,7 @@ class TrainingSimWorld(XODEfile):
     Methods:
         generate: Generates the xode model of the world.
     """
-    def __init__(self, name, randomize_test_article=False):
+    def __init__(self, name, randomize_test_article=False, seed=None):
         """Initialize
 
         Creates a new TrainingSimWorld object.
@@ -44,29 +44,38 @@ class TrainingSimWorld(XODEfile):
         Arguments:
             randomize_test_article: Determines if the test article to be
                 generated will have randomized gates. (Default: False)
+            seed: The random seed of the randomized gates. (Default: None)
         """
         super(TrainingSimWorld, self).__init__(name)
 
         self._name = name
         self._randomize_test_article = randomize_test_article
+        self._seed = seed
 
         return
 
-    def generate(self):
+    def generate(self, filename=None):
         """Generate
 
         Generates the xode model of the world.
+
+        Arguments:
+            filename: The basename of the file to write. The .xode extension
+                is appended. (Default: The world name)
         """
         self.insertFloor(y=0.0)
 
         # Build the test article with gates
         y_top_table = models.build_test_article(self,
-                self._randomize_test_article)
+                self._randomize_test_article, seed=self._seed)
 
         # Build the training tooltip
         models.build_end_effector(self, y_top_table)
 
-        self.writeXODE('./'+self._name)
+        if filename is None:
+            filename = './'+self._name
+
+        self.writeXODE(filename)
 
         return
 